@@ -14,9 +14,9 @@ __email__ = "shyuep@gmail.com"
 __date__ = "Oct 26, 2012"
 
 import collections
+import heapq
 import json
 import numpy as np
-import operator
 import os
 
 from math import exp, sqrt
@@ -24,6 +24,8 @@ from pymatgen.core.periodic_table import Element, Specie
 from pymatgen.core.structure import Structure
 from pymatgen.symmetry.finder import SymmetryFinder
 from pymatgen.core.periodic_table import get_el_sp
+from pymatgen.core.sites import Site
+from pymatgen.util.coord_utils import get_points_in_spheres_pbc
 
 #Let's initialize some module level properties.
 
@@ -126,6 +128,89 @@ def calculate_bv_sum_unordered(site, nn_list, scale_factor=1):
     return bvsum
 
 
+def _get_bv_pair_params(elements):
+    """
+    Returns the (R, sign) arrays of shape (n, n) of the bond valence
+    parameters for all pairs of a list of n elements. sign is +1 if the first
+    element is the less electronegative one, -1 otherwise and 0 for pairs
+    which do not contribute to the BV sum.
+    """
+    n = len(elements)
+    r = np.array([BV_PARAMS[el]["r"] for el in elements])
+    c = np.array([BV_PARAMS[el]["c"] for el in elements])
+    x = np.array([el.X for el in elements])
+    eneg = np.array([el in ELECTRONEG for el in elements])
+    r1, r2 = r[:, None], r[None, :]
+    c1, c2 = c[:, None], c[None, :]
+    R = r1 + r2 - r1 * r2 * (np.sqrt(c1) - np.sqrt(c2)) ** 2 / \
+        (c1 * r1 + c2 * r2)
+    sign = np.where(x[:, None] < x[None, :], 1, -1)
+    sign[~(eneg[:, None] | eneg[None, :])] = 0
+    sign[np.eye(n, dtype=bool)] = 0
+    return R, sign
+
+
+def calculate_bv_sums(structure, sites=None, max_radius=4, scale_factor=1.0):
+    """
+    Calculates the BV sums of several sites of a structure in a single
+    vectorized pass over the neighbor list of all the sites. Works for both
+    ordered and unordered structures, and gives the same results as
+    calculate_bv_sum and calculate_bv_sum_unordered using the neighbors
+    within max_radius.
+
+    Args:
+        structure:
+            The structure.
+        sites:
+            The sites for which the BV sums are calculated. Defaults to all
+            sites in the structure.
+        max_radius:
+            Maximum radius in Angstrom used to find nearest neighbors.
+        scale_factor:
+            A scale factor to be applied. This is useful for scaling distance,
+            esp in the case of calculation-relaxed structures which may tend
+            to under (GGA) or over bind (LDA).
+
+    Returns:
+        Array of BV sums of the sites.
+    """
+    sites = structure.sites if sites is None else list(sites)
+    elements = sorted(set(Element(sp.symbol) for site in structure
+                          for sp in site.species_and_occu))
+    el_index = {el: i for i, el in enumerate(elements)}
+
+    def get_occus(sites):
+        occus = np.zeros((len(sites), len(elements)))
+        for i, site in enumerate(sites):
+            for sp, occu in site.species_and_occu.items():
+                occus[i, el_index[Element(sp.symbol)]] += occu
+        return occus
+
+    occus = get_occus(structure)
+    centers = np.array([site.coords for site in sites]).reshape((-1, 3))
+    ic, ip, fcoords, dists = get_points_in_spheres_pbc(
+        structure.lattice, np.mod(structure.frac_coords, 1), centers,
+        max_radius)
+
+    #Exclude the sites themselves, as in get_neighbors.
+    cart = structure.lattice.get_cartesian_coords(fcoords)
+    keep = np.ones(len(dists), dtype=bool)
+    close = np.all(np.abs(cart - centers[ic]) <= Site.position_atol,
+                   axis=-1)
+    for k in np.nonzero(close)[0]:
+        site, nn = sites[ic[k]], structure[ip[k]]
+        if site.species_and_occu == nn.species_and_occu and \
+                site.properties == nn.properties:
+            keep[k] = False
+    ic, ip, dists = ic[keep], ip[keep], dists[keep]
+
+    R, sign = _get_bv_pair_params(elements)
+    vij = np.exp((R[None, :, :] - dists[:, None, None] * scale_factor) /
+                 0.31) * sign[None, :, :]
+    bonds = np.einsum("pa,pab,pb->p", get_occus(sites)[ic], vij, occus[ip])
+    return np.bincount(ic, weights=bonds, minlength=len(sites))
+
+
 class BVAnalyzer(object):
     """
     This class implements a maximum a posteriori (MAP) estimation method to
@@ -148,8 +233,9 @@ class BVAnalyzer(object):
             symmetrically equivalent. Set to 0 to turn off symmetry.
         max_radius (float): Maximum radius in Angstrom used to find nearest
             neighbors.
-        max_permutations (int): The maximum number of permutations of
-            oxidation states to test.
+        max_permutations (int): The maximum number of partial assignments of
+            oxidation states expanded in the best-first search of the most
+            probable charge balanced assignment.
         distance_scale_factor:
             A scale factor to be applied. This is useful for scaling
             distances, esp in the case of calculation-relaxed structures
@@ -171,7 +257,8 @@ class BVAnalyzer(object):
             max_radius:
                 Maximum radius in Angstrom used to find nearest neighbors.
             max_permutations:
-                The maximum number of permutations of oxidation states to test.
+                The maximum number of partial assignments of oxidation states
+                expanded in the best-first search.
             distance_scale_factor:
                 A scale factor to be applied. This is useful for scaling
                 distances, esp in the case of calculation-relaxed structures
@@ -199,10 +286,8 @@ class BVAnalyzer(object):
                              if not specie in forbidden_species} \
             if len(forbidden_species) > 0 else ICSD_BV_DATA
 
-    def _calc_site_probabilities(self, site, nn):
+    def _calc_site_probabilities(self, site, bv_sum):
         el = site.specie.symbol
-        bv_sum = calculate_bv_sum(site, nn,
-                                  scale_factor=self.dist_scale_factor)
         prob = {}
         for sp, data in self.icsd_bv_data.items():
             if sp.symbol == el and sp.oxi_state != 0 and data["std"] > 0:
@@ -220,9 +305,7 @@ class BVAnalyzer(object):
             prob = {k: 0.0 for k in prob}
         return prob
 
-    def _calc_site_probabilities_unordered(self, site, nn):
-        bv_sum = calculate_bv_sum_unordered(
-            site, nn, scale_factor=self.dist_scale_factor)
+    def _calc_site_probabilities_unordered(self, site, bv_sum):
         prob = {}
         for specie, occu in site.species_and_occu.iteritems():
             el = specie.symbol
@@ -284,13 +367,14 @@ class BVAnalyzer(object):
 
         #Get a list of valences and probabilities for each symmetrically
         #distinct site.
+        test_sites = [sites[0] for sites in equi_sites]
+        bv_sums = calculate_bv_sums(structure, test_sites, self.max_radius,
+                                    self.dist_scale_factor)
         valences = []
         all_prob = []
         if structure.is_ordered:
-            for sites in equi_sites:
-                test_site = sites[0]
-                nn = structure.get_neighbors(test_site, self.max_radius)
-                prob = self._calc_site_probabilities(test_site, nn)
+            for test_site, bv_sum in zip(test_sites, bv_sums):
+                prob = self._calc_site_probabilities(test_site, bv_sum)
                 all_prob.append(prob)
                 val = list(prob.keys())
                 #Sort valences in order of decreasing probability.
@@ -300,10 +384,9 @@ class BVAnalyzer(object):
                                        val))
         else:
             full_all_prob = []
-            for sites in equi_sites:
-                test_site = sites[0]
-                nn = structure.get_neighbors(test_site, self.max_radius)
-                prob = self._calc_site_probabilities_unordered(test_site, nn)
+            for test_site, bv_sum in zip(test_sites, bv_sums):
+                prob = self._calc_site_probabilities_unordered(test_site,
+                                                               bv_sum)
                 all_prob.append(prob)
                 full_all_prob.extend(prob.values())
                 vals = []
@@ -320,143 +403,38 @@ class BVAnalyzer(object):
                                val))
                 valences.append(vals)
 
-        #make variables needed for recursion
+        #Search for the most probable charge balanced assignment.
+        nsites = np.array(map(len, equi_sites))
         if structure.is_ordered:
-            nsites = np.array(map(len, equi_sites))
-            vmin = np.array(map(min, valences))
-            vmax = np.array(map(max, valences))
-
-            self._n = 0
-            self._best_score = 0
-            self._best_vset = None
-
-            def evaluate_assignment(v_set):
-                el_oxi = collections.defaultdict(list)
-                for i, sites in enumerate(equi_sites):
-                    el_oxi[sites[0].specie.symbol].append(v_set[i])
-                max_diff = max([max(v) - min(v) for v in el_oxi.values()])
-                if max_diff > 1:
-                    return
-                score = reduce(operator.mul, [all_prob[i][v]
-                                              for i, v in enumerate(v_set)])
-                if score > self._best_score:
-                    self._best_vset = v_set
-                    self._best_score = score
-
-            def _recurse(assigned=[]):
-                #recurses to find permutations of valences based on whether a
-                #charge balanced assignment can still be found
-                if self._n > self.max_permutations:
-                    return
-
-                i = len(assigned)
-                highest = vmax.copy()
-                highest[:i] = assigned
-                highest *= nsites
-                highest = np.sum(highest)
-
-                lowest = vmin.copy()
-                lowest[:i] = assigned
-                lowest *= nsites
-                lowest = np.sum(lowest)
-
-                if highest < 0 or lowest > 0:
-                    self._n += 1
-                    return
-
-                if i == len(valences):
-                    evaluate_assignment(assigned)
-                    self._n += 1
-                    return
-                else:
-                    for v in valences[i]:
-                        new_assigned = list(assigned)
-                        _recurse(new_assigned + [v])
+            best_vset = _get_best_assignment(
+                valences, [[all_prob[i][v] for v in vals]
+                           for i, vals in enumerate(valences)],
+                nsites, [sites[0].specie.symbol for sites in equi_sites],
+                1, 0, self.max_permutations)
         else:
-            nsites = np.array(map(len, equi_sites))
-            tmp = []
             attrib = []
-            for insite, nsite in enumerate(nsites):
-                for val in valences[insite]:
-                    tmp.append(nsite)
-                    attrib.append(insite)
-            new_nsites = np.array(tmp)
-            fractions = []
+            weights = []
             elements = []
-            for sites in equi_sites:
-                for sp, occu in get_z_ordered_elmap(sites[0].species_and_occu):
-                    elements.append(sp.symbol)
-                    fractions.append(occu)
-            fractions = np.array(fractions, np.float)
             new_valences = []
-            for vals in valences:
-                for val in vals:
-                    new_valences.append(val)
-            vmin = np.array(map(min, new_valences), np.float)
-            vmax = np.array(map(max, new_valences), np.float)
-
-            self._n = 0
-            self._best_score = 0
-            self._best_vset = None
-
-            def evaluate_assignment(v_set):
-                el_oxi = collections.defaultdict(list)
-                jj = 0
-                for i, sites in enumerate(equi_sites):
-                    for specie, occu in get_z_ordered_elmap(
-                            sites[0].species_and_occu):
-                        el_oxi[specie.symbol].append(v_set[jj])
-                        jj += 1
-                max_diff = max([max(v) - min(v) for v in el_oxi.values()])
-                if max_diff > 2:
-                    return
-
-                score = reduce(operator.mul,
-                                [all_prob[attrib[iv]][elements[iv]][vv]
-                                 for iv, vv in enumerate(v_set)])
-                if score > self._best_score:
-                    self._best_vset = v_set
-                    self._best_score = score
-
-            def _recurse(assigned=[]):
-                #recurses to find permutations of valences based on whether a
-                #charge balanced assignment can still be found
-                if self._n > self.max_permutations:
-                    return
-
-                i = len(assigned)
-                highest = vmax.copy()
-                highest[:i] = assigned
-                highest *= new_nsites
-                highest *= fractions
-                highest = np.sum(highest)
-
-                lowest = vmin.copy()
-                lowest[:i] = assigned
-                lowest *= new_nsites
-                lowest *= fractions
-                lowest = np.sum(lowest)
-
-                if (highest < -self.charge_neutrality_tolerance or
-                        lowest > self.charge_neutrality_tolerance):
-                    self._n += 1
-                    return
-
-                if i == len(new_valences):
-                    evaluate_assignment(assigned)
-                    self._n += 1
-                    return
-                else:
-                    for v in new_valences[i]:
-                        new_assigned = list(assigned)
-                        _recurse(new_assigned + [v])
-
-        _recurse()
-
-        if self._best_vset:
+            for i, sites in enumerate(equi_sites):
+                for (sp, occu), vals in zip(
+                        get_z_ordered_elmap(sites[0].species_and_occu),
+                        valences[i]):
+                    attrib.append(i)
+                    weights.append(nsites[i] * occu)
+                    elements.append(sp.symbol)
+                    new_valences.append(vals)
+            best_vset = _get_best_assignment(
+                new_valences, [[all_prob[attrib[i]][elements[i]][v]
+                                for v in vals]
+                               for i, vals in enumerate(new_valences)],
+                weights, elements, 2, self.charge_neutrality_tolerance,
+                self.max_permutations)
+
+        if best_vset:
             if structure.is_ordered:
                 assigned = {}
-                for val, sites in zip(self._best_vset, equi_sites):
+                for val, sites in zip(best_vset, equi_sites):
                     for site in sites:
                         assigned[site] = val
 
@@ -466,7 +444,7 @@ class BVAnalyzer(object):
                 new_best_vset = []
                 for ii in range(len(equi_sites)):
                     new_best_vset.append(list())
-                for ival, val in enumerate(self._best_vset):
+                for ival, val in enumerate(best_vset):
                     new_best_vset[attrib[ival]].append(val)
                 for val, sites in zip(new_best_vset, equi_sites):
                     for site in sites:
@@ -501,6 +479,70 @@ class BVAnalyzer(object):
         return s
 
 
+def _get_best_assignment(valences, probs, weights, labels, max_diff, tol,
+                         max_permutations):
+    """
+    Best-first search of the most probable charge balanced assignment of
+    valences.
+
+    Args:
+        valences: List of candidate valences for each position, sorted by
+            decreasing probability.
+        probs: Corresponding probabilities of the candidate valences.
+        weights: Weights of each position in the charge balance, i.e., the
+            number of sites times the occupancy.
+        labels: Element symbol of each position. Valences of the same element
+            can differ by at most max_diff.
+        max_diff: Maximum difference in valences of the same element.
+        tol: Tolerance on the charge neutrality.
+        max_permutations: Maximum number of partial assignments to expand.
+
+    Returns:
+        The list of valences with the highest product of probabilities, ties
+        being resolved in favor of the more probable valences of the first
+        positions. None if no assignment is found.
+    """
+    n = len(valences)
+    if n == 0 or not all(valences):
+        return None
+    weights = np.array(weights, dtype=np.float)
+    #Bounds on the charge and the probability of the unassigned positions.
+    low = np.append(np.cumsum((np.array(map(min, valences)) *
+                               weights)[::-1])[::-1], 0)
+    high = np.append(np.cumsum((np.array(map(max, valences)) *
+                                weights)[::-1])[::-1], 0)
+    best = np.append(np.cumprod(np.array(map(max, probs))[::-1])[::-1], 1)
+    #The bounds of partial assignments are slightly inflated to guard
+    #against rounding, so that they never fall below the exact score of
+    #their completions.
+    slack = 1 + 1e-10
+    same = [[j for j in xrange(i) if labels[j] == labels[i]]
+            for i in xrange(n)]
+
+    heap = [(-best[0] * slack, (), 0, 1.0)]
+    nexpanded = 0
+    while heap and nexpanded <= max_permutations:
+        bound, ranks, charge, score = heapq.heappop(heap)
+        i = len(ranks)
+        if i == n:
+            if score > 0:
+                return [valences[j][k] for j, k in enumerate(ranks)]
+            return None
+        nexpanded += 1
+        prev = [valences[j][ranks[j]] for j in same[i]]
+        for k, v in enumerate(valences[i]):
+            c = charge + v * weights[i]
+            #Prune on partial charge balance.
+            if c + high[i + 1] < -tol or c + low[i + 1] > tol:
+                continue
+            if prev and max(prev + [v]) - min(prev + [v]) > max_diff:
+                continue
+            new_score = score * probs[i][k]
+            bound = new_score * best[i + 1] * (slack if i + 1 < n else 1)
+            heapq.heappush(heap, (-bound, ranks + (k,), c, new_score))
+    return None
+
+
 def get_z_ordered_elmap(comp):
     """
     Arbitrary ordered elmap on the elements/species of a composition of a
@@ -514,7 +556,7 @@ def get_z_ordered_elmap(comp):
     Cr4+, Cr3+, Ni3+, Ni4+, Zn2+ ... or
     Cr4+, Cr3+, Ni4+, Ni3+, Zn2+
     """
-    return sorted([(elsp, comp.elmap[elsp]) for elsp in comp.elmap.keys()])
+    return sorted([(elsp, comp[elsp]) for elsp in comp.keys()])
 
 
 def add_oxidation_state_by_site_fraction(structure, oxidation_states):
@@ -26,15 +26,26 @@ __status__ = "Beta"
 __date__ = "5/2/13"
 
 import math
+import os
+import glob
+import json
+import hashlib
+import itertools
+import logging
 
 import numpy as np
 
-from pymatgen.core import Structure, get_el_sp
+from pymatgen.core import Structure, Composition, Trajectory, get_el_sp
 import pymatgen.core.physical_constants as phyc
 from pymatgen.serializers.json_coders import MSONable
 from pymatgen.io.vaspio.vasp_output import Vasprun
 from pymatgen.util.coord_utils import pbc_diff
 
+logger = logging.getLogger(__name__)
+
+#Maximum size in bytes of the temporary arrays used in the MSD calculation.
+MSD_MAX_MEMORY = 2 ** 28
+
 
 class DiffusionAnalyzer(MSONable):
     """
@@ -124,58 +135,57 @@ class DiffusionAnalyzer(MSONable):
             self.conductivity_components = np.array([0., 0., 0.])
             self.max_framework_displacement = 0
         else:
-            framework_disp = self.disp[self.framework_indices]
-            drift = np.average(framework_disp, axis=0)[None, :, :]
-
-            #drift corrected position
-            dc_x = self.disp[self.indices] - drift
-            dc_framework = self.disp[self.framework_indices] - drift
-            self.max_framework_displacement = \
-                np.max(np.sum(dc_framework ** 2, axis=-1) ** 0.5)
-            df_x = self.s.lattice.get_fractional_coords(dc_x)
+            #Drift of the framework and drift corrected framework positions.
+            #Displacements are processed in chunks of atoms to bound the
+            #memory of the temporaries.
+            nsteps = self.disp.shape[1]
+            chunk = max(1, MSD_MAX_MEMORY // (nsteps * 3 * 8 * 8))
+            drift = np.zeros((nsteps, 3))
+            for i in xrange(0, len(self.framework_indices), chunk):
+                inds = self.framework_indices[i:i + chunk]
+                drift += np.sum(self.disp[inds], axis=0)
+            drift /= len(self.framework_indices)
+            max_disp = 0
+            for i in xrange(0, len(self.framework_indices), chunk):
+                inds = self.framework_indices[i:i + chunk]
+                dc_framework = self.disp[inds] - drift[None, :, :]
+                max_disp = max(max_disp, np.max(
+                    np.sum(dc_framework ** 2, axis=-1) ** 0.5))
+            self.max_framework_displacement = max_disp
 
             #limit the number of sampled timesteps to 200
             min_dt = int(1000 / (self.step_skip * self.time_step))
-            max_dt = min(dc_x.shape[0] * dc_x.shape[1] // self.min_obs,
-                         dc_x.shape[1])
+            max_dt = min(len(self.indices) * nsteps // self.min_obs, nsteps)
             if min_dt >= max_dt:
                 raise ValueError('Not enough data to calculate diffusivity')
             timesteps = np.arange(min_dt, max_dt,
                                   max(int((max_dt - min_dt) / 200), 1))
             self.dt = timesteps * self.time_step * self.step_skip
+            self._timesteps = timesteps
+            self._drift = drift
 
-            #calculate the smoothed msd values
+            #calculate the smoothed msd values of the drift corrected
+            #positions, using the FFT algorithm.
             self.s_msd = np.zeros_like(self.dt, dtype=np.double)
             self.s_msd_components = np.zeros(self.dt.shape + (3,))
             lengths = np.array(self.s.lattice.abc)[None, None, :]
-            for i, n in enumerate(timesteps):
-                dx = dc_x[:, n:, :] - dc_x[:, :-n, :]
-                self.s_msd[i] = 3 * np.average(dx ** 2)
-                dcomponents = (df_x[:, n:, :] - df_x[:, :-n, :]) * lengths
-                self.s_msd_components[i] = np.average(
-                    np.average(dcomponents ** 2, axis=1), axis=0)
+            for i in xrange(0, len(self.indices), chunk):
+                inds = self.indices[i:i + chunk]
+                dc_x = self.disp[inds] - drift[None, :, :]
+                self.s_msd += np.sum(get_msd(dc_x, timesteps), axis=1)
+                df_x = self.s.lattice.get_fractional_coords(dc_x)
+                self.s_msd_components += get_msd(df_x * lengths, timesteps)
+            self.s_msd /= len(self.indices)
+            self.s_msd_components /= len(self.indices)
 
             #run the regression on the msd components
-            if weighted:
-                w = 1 / self.dt
-            else:
-                w = np.ones_like(self.dt)
-
-            #weighted least squares
-            def weighted_lstsq(a, b, w):
-                w_root = w ** 0.5
-                x, res, rank, s = np.linalg.lstsq(a * w_root[:, None],
-                                                  b * w_root)
-                return x
-
             m_components = np.zeros(3)
-            a = np.ones((len(self.dt), 2))
-            a[:, 0] = self.dt
             for i in range(3):
-                (m, c) = weighted_lstsq(a, self.s_msd_components[:, i], w)
+                (m, c) = _fit_msd(self.dt, self.s_msd_components[:, i],
+                                  weighted)
                 m_components[i] = max(m, 1e-15)
 
-            (m, c) = weighted_lstsq(a, self.s_msd, w)
+            (m, c) = _fit_msd(self.dt, self.s_msd, weighted)
             #m shouldn't be negative
             m = max(m, 1e-15)
 
@@ -190,6 +200,43 @@ class DiffusionAnalyzer(MSONable):
             self.conductivity_components = self.diffusivity_components * \
                 conv_factor
 
+    def get_bootstrap_diffusivities(self, nboot=1000, seed=None):
+        """
+        Bootstrap estimates of the diffusivity, obtained by resampling the
+        diffusing atoms with replacement and refitting the smoothed MSD. The
+        standard deviation of the estimates is a measure of the statistical
+        error of the diffusivity.
+
+        Args:
+            nboot (int): Number of bootstrap samples.
+            seed (int): Seed of the random number generator, for
+                reproducible estimates.
+
+        Returns:
+            Array of nboot diffusivities in cm^2 / s.
+        """
+        if self.disp.shape[1] < 2:
+            return np.zeros(nboot)
+        nsteps = self.disp.shape[1]
+        chunk = max(1, MSD_MAX_MEMORY // (nsteps * 3 * 8 * 8))
+        site_msd = []
+        for i in xrange(0, len(self.indices), chunk):
+            inds = self.indices[i:i + chunk]
+            dc_x = self.disp[inds] - self._drift[None, :, :]
+            site_msd.append(np.sum(get_msd(dc_x, self._timesteps,
+                                           sum_sites=False), axis=2))
+        site_msd = np.concatenate(site_msd)
+        nsites = len(site_msd)
+        rng = np.random.RandomState(seed)
+        #Number of times each atom is drawn in each bootstrap sample.
+        counts = np.zeros((nboot, nsites))
+        for i in xrange(nboot):
+            counts[i] = np.bincount(rng.randint(0, nsites, nsites),
+                                    minlength=nsites)
+        msd = np.dot(counts, site_msd) / nsites
+        m, c = _fit_msd(self.dt, msd.T, self.weighted)
+        return np.maximum(m, 1e-15) / 60
+
     def get_summary_dict(self, include_msd_t=False):
         """
         Provides a summary of diffusion information.
@@ -246,15 +293,19 @@ class DiffusionAnalyzer(MSONable):
 
     @classmethod
     def from_structures(cls, structures, specie, temperature,
-                        time_step, step_skip, min_obs=30, weighted=True):
+                        time_step, step_skip, min_obs=30, weighted=True,
+                        dtype=np.double):
         """
-        Convenient constructor that takes in a list of Structure objects to
-        perform diffusion analysis.
+        Convenient constructor that takes in a list of Structure objects or
+        a Trajectory to perform diffusion analysis.
 
         Args:
             structures [Structure]: list of Structure objects (must be
                 ordered in sequence of run). E.g., you may have performed
-                sequential VASP runs to obtain sufficient statistics.
+                sequential VASP runs to obtain sufficient statistics. A
+                Trajectory can be used directly, in which case its
+                fractional coordinates are used without creating any
+                Structure.
             specie (Element/Specie): Specie to calculate diffusivity for as a
                 String. E.g., "Li".
             temperature (float): Temperature of the diffusion run in Kelvin.
@@ -271,23 +322,78 @@ class DiffusionAnalyzer(MSONable):
                 MSD vs dt. Weights are proportional to 1/dt, since the
                 number of observations are also proportional to 1/dt (and
                 hence the variance is proportional to dt)
+            dtype: Numpy dtype used to store the displacements. Use
+                np.float32 to halve the memory of long runs.
             """
-        structure = structures[0]
+        if isinstance(structures, Trajectory):
+            frac_coords = structures.frac_coords
+        else:
+            frac_coords = (s.frac_coords for s in structures)
+        return cls.from_frac_coords(
+            structures[0], frac_coords, specie,
+            temperature, time_step, step_skip=step_skip, min_obs=min_obs,
+            weighted=weighted, dtype=dtype)
 
-        p = [np.array(s.frac_coords)[:, None] for s in structures]
-        p = np.concatenate(p, axis=1)
-        dp = p[:, 1:] - p[:, :-1]
-        dp = np.concatenate([np.zeros_like(dp[:, (0,)]), dp], axis=1)
-        dp = dp - np.round(dp)
-        f_disp = np.cumsum(dp, axis=1)
-        disp = structure.lattice.get_cartesian_coords(f_disp)
+    @classmethod
+    def from_frac_coords(cls, structure, frac_coords, specie, temperature,
+                         time_step, step_skip, min_obs=30, weighted=True,
+                         dtype=np.double):
+        """
+        Convenient constructor that takes in the fractional coordinates of
+        the sites along a run, e.g., read from a trajectory file. The
+        coordinates are consumed one step at a time, i.e., frac_coords can
+        be a generator, and only the displacements are stored.
+
+        Args:
+            structure (Structure): Initial structure.
+            frac_coords: Iterable of the fractional coordinates of all sites
+                at each step of the run, e.g., an array with shape [time
+                step, site, axis]. Coordinates can be wrapped into the unit
+                cell.
+            specie (Element/Specie): Specie to calculate diffusivity for as a
+                String. E.g., "Li".
+            temperature (float): Temperature of the diffusion run in Kelvin.
+            time_step (int): Time step between measurements.
+            step_skip (int): Sampling frequency of the displacements (
+                time_step is multiplied by this number to get the real time
+                between measurements)
+            min_obs (int): Minimum number of observations to have before
+                including in the MSD vs dt calculation.
+            weighted (bool): Uses a weighted least squares to fit the
+                MSD vs dt.
+            dtype: Numpy dtype used to store the displacements. Use
+                np.float32 to halve the memory of long runs.
+        """
+        #The displacements are stored step by step in a preallocated buffer,
+        #which is grown in place if the number of steps is not known, and
+        #passed on as a [site, time step, axis] view without copying.
+        nsteps = len(frac_coords) if hasattr(frac_coords, "__len__") else 16
+        disp = np.zeros((nsteps, len(structure), 3), dtype=dtype)
+        f_disp = None
+        n = 0
+        for fcoords in frac_coords:
+            fcoords = np.array(fcoords)
+            if f_disp is None:
+                f_disp = np.zeros_like(fcoords)
+            else:
+                dp = fcoords - prev
+                f_disp = f_disp + (dp - np.round(dp))
+            prev = fcoords
+            if n == len(disp):
+                disp.resize((2 * n,) + disp.shape[1:], refcheck=False)
+            disp[n] = structure.lattice.get_cartesian_coords(f_disp)
+            n += 1
+        if n < len(disp):
+            disp.resize((n,) + disp.shape[1:], refcheck=False)
+        disp = disp.transpose((1, 0, 2))
 
         return cls(structure, disp, specie, temperature,
                    time_step, step_skip=step_skip, min_obs=min_obs,
                    weighted=weighted)
 
     @classmethod
-    def from_vaspruns(cls, vaspruns, specie, min_obs=30, weighted=True):
+    def from_vaspruns(cls, vaspruns, specie, min_obs=30, weighted=True,
+                      dtype=np.double):
         """
         Convenient constructor that takes in a list of Vasprun objects to
         perform diffusion analysis.
@@ -307,11 +413,12 @@ class DiffusionAnalyzer(MSONable):
                 MSD vs dt. Weights are proportional to 1/dt, since the
                 number of observations are also proportional to 1/dt (and
                 hence the variance is proportional to dt)
+            dtype: Numpy dtype used to store the displacements. Use
+                np.float32 to halve the memory of long runs.
         """
         step_skip = vaspruns[0].ionic_step_skip or 1
 
         final_structure = vaspruns[0].initial_structure
-        structures = []
         for vr in vaspruns:
             #check that the runs are continuous
             fdist = pbc_diff(vr.initial_structure.frac_coords,
@@ -322,18 +429,20 @@ class DiffusionAnalyzer(MSONable):
             final_structure = vr.final_structure
 
             assert (vr.ionic_step_skip or 1) == step_skip
-            structures.extend([s['structure'] for s in vr.ionic_steps])
 
         temperature = vaspruns[0].parameters['TEEND']
         time_step = vaspruns[0].parameters['POTIM']
 
-        return cls.from_structures(structures, specie, temperature,
-                   time_step, step_skip=step_skip, min_obs=min_obs,
-                   weighted=weighted)
+        frac_coords = (s['structure'].frac_coords for vr in vaspruns
+                       for s in vr.ionic_steps)
+        return cls.from_frac_coords(
+            vaspruns[0].ionic_steps[0]['structure'], frac_coords, specie,
+            temperature, time_step, step_skip=step_skip, min_obs=min_obs,
+            weighted=weighted, dtype=dtype)
 
     @classmethod
     def from_files(cls, filepaths, specie, step_skip=10, min_obs=30,
-                   weighted=True, ncores=None):
+                   weighted=True, ncores=None, dtype=np.double):
         """
         Convenient constructor that takes in a list of vasprun.xml paths to
         perform diffusion analysis.
@@ -365,6 +474,8 @@ class DiffusionAnalyzer(MSONable):
                 .xml files should be a multiple of the ionic_step_skip.
                 Otherwise, inconsistent results may arise. Serial mode has no
                 such restrictions.
+            dtype: Numpy dtype used to store the displacements. Use
+                np.float32 to halve the memory of long runs.
         """
         if ncores is not None:
             import multiprocessing
@@ -380,7 +491,8 @@ class DiffusionAnalyzer(MSONable):
                 # Recompute offset.
                 offset = (- (v.nionic_steps - offset)) % step_skip
         return cls.from_vaspruns(vaspruns, min_obs=min_obs,
-                                 weighted=weighted, specie=specie)
+                                 weighted=weighted, specie=specie,
+                                 dtype=dtype)
 
     @property
     def to_dict(self):
@@ -406,6 +518,66 @@ class DiffusionAnalyzer(MSONable):
                    weighted=d["weighted"])
 
 
+def get_msd(x, lags, sum_sites=True):
+    """
+    Computes the mean square displacements of trajectories at several time
+    lags, averaged over all time origins, with the FFT algorithm, i.e., in
+    O(T log T) instead of O(T^2) operations for T time steps. The MSD at lag
+    n is obtained from the autocorrelation of the positions as
+
+    MSD(n) = (sum_{t=0}^{T-n-1} x(t)^2 + x(t+n)^2 - 2 sum_t x(t) x(t+n)) /
+    (T - n)
+
+    Args:
+        x (array): Positions with shape [site, time step, axis].
+        lags ([int]): Time lags, in number of time steps.
+        sum_sites (bool): Whether to sum the MSD over the sites.
+
+    Returns:
+        Array of the MSD along each axis summed over the sites, with shape
+        [lag, axis], or with shape [site, lag, axis] if sum_sites is False.
+    """
+    x = np.array(x, dtype=np.double)
+    #The MSD is invariant to a constant shift, which is removed to minimize
+    #the rounding errors.
+    x -= np.average(x, axis=1)[:, None, :]
+    nsteps = x.shape[1]
+    lags = np.array(lags, dtype=np.int)
+    nfft = 2 ** int(math.ceil(math.log(2 * nsteps, 2)))
+    power = np.abs(np.fft.rfft(x, n=nfft, axis=1)) ** 2
+    x2 = x ** 2
+    if sum_sites:
+        #Sum over the sites before the inverse transform, which is linear.
+        power = np.sum(power, axis=0)[None, :, :]
+        x2 = np.sum(x2, axis=0)[None, :, :]
+    autocorr = np.fft.irfft(power, n=nfft, axis=1)[:, lags]
+    zeros = np.zeros((len(x2), 1, x.shape[2]))
+    cum_x2 = np.concatenate([zeros, np.cumsum(x2, axis=1)], axis=1)
+    cum_x2_rev = np.concatenate([zeros, np.cumsum(x2[:, ::-1], axis=1)],
+                                axis=1)
+    sum_x2 = 2 * cum_x2[:, -1:] - cum_x2[:, lags] - cum_x2_rev[:, lags]
+    msd = (sum_x2 - 2 * autocorr) / (nsteps - lags)[None, :, None]
+    return msd[0] if sum_sites else msd
+
+
+def _fit_msd(dt, msd, weighted):
+    """
+    Linear regression of the MSD vs dt. Weights are proportional to 1/dt if
+    weighted is True. msd can have a second axis of several MSD curves,
+    which are fitted at once.
+
+    Returns:
+        (slope, intercept)
+    """
+    w = 1 / dt if weighted else np.ones_like(dt)
+    w_root = w ** 0.5
+    a = np.ones((len(dt), 2))
+    a[:, 0] = dt
+    b = msd * (w_root if msd.ndim == 1 else w_root[:, None])
+    x, res, rank, s = np.linalg.lstsq(a * w_root[:, None], b)
+    return x
+
+
 def get_conversion_factor(structure, species, temperature):
     """
     Conversion factor to convert between cm^2/s diffusivity measurements and
@@ -443,6 +615,150 @@ def _get_vasprun(args):
     return Vasprun(args[0], ionic_step_skip=args[1])
 
 
+def _get_cache_file(filename, cache_dir, step_skip, offset):
+    """
+    Returns the path of the cache of the run data of a vasprun.xml in
+    cache_dir. The name includes a hash of the absolute path of the
+    vasprun.xml, so that runs in different directories do not collide.
+    """
+    key = hashlib.md5(os.path.abspath(filename)).hexdigest()[:12]
+    return os.path.join(cache_dir, "{}.{}.{}_{}.npz".format(
+        os.path.basename(filename), key, step_skip, offset))
+
+
+def _get_run_data(filename, step_skip, offset, cache_dir=None):
+    """
+    Reads the data of a single MD run needed for diffusion analysis, i.e.,
+    the fractional coordinates of every step_skip-th ionic step starting at
+    offset. If cache_dir is set, the data is cached in a .npz file in it,
+    which is much faster to read than the xml. The cache is used if the
+    size and modification time of the vasprun.xml match those it was made
+    from, or if the vasprun.xml no longer exists. Failing to write the
+    cache only logs a warning.
+
+    Args:
+        filename (str): Path to a vasprun.xml or to a directory containing
+            one.
+        step_skip (int): Sampling frequency of the ionic steps.
+        offset (int): Index of the first sampled ionic step.
+        cache_dir (str): Directory of the cache. Defaults to None, i.e., no
+            caching.
+
+    Returns:
+        dict of numpy arrays with keys "frac_coords", "lattice", "species",
+        "initial_frac_coords", "final_frac_coords", "nionic_steps",
+        "temperature" and "time_step", and "source_size" and "source_mtime"
+        of the vasprun.xml.
+    """
+    if os.path.isdir(filename):
+        files = sorted(f for f in
+                       glob.glob(os.path.join(filename, "vasprun.xml*"))
+                       if not f.endswith(".npz"))
+        if not files:
+            raise ValueError("No vasprun.xml in {}".format(filename))
+        filename = files[0]
+    stat = os.stat(filename) if os.path.exists(filename) else None
+    cache_file = None
+    if cache_dir is not None:
+        cache_file = _get_cache_file(filename, cache_dir, step_skip, offset)
+        if os.path.exists(cache_file):
+            npz = np.load(cache_file)
+            try:
+                if stat is None or (
+                        "source_size" in npz.files and
+                        int(npz["source_size"]) == stat.st_size and
+                        float(npz["source_mtime"]) == stat.st_mtime):
+                    return dict(npz)
+            finally:
+                npz.close()
+            logger.info("Cache {} is out of date".format(cache_file))
+
+    #Densities of states and eigenvalues are not needed and are not parsed.
+    v = Vasprun(filename, ionic_step_offset=offset, ionic_step_skip=step_skip,
+                parse_dos=False, parse_eigen=False)
+    structure = v.ionic_steps[0]["structure"]
+    data = {
+        "frac_coords": np.array([step["structure"].frac_coords
+                                 for step in v.ionic_steps]),
+        "lattice": structure.lattice.matrix,
+        "species": json.dumps([sp.to_dict
+                               for sp in structure.species_and_occu]),
+        "initial_frac_coords": v.initial_structure.frac_coords,
+        "final_frac_coords": v.final_structure.frac_coords,
+        "nionic_steps": v.nionic_steps,
+        "temperature": v.parameters["TEEND"],
+        "time_step": v.parameters["POTIM"],
+        "source_size": stat.st_size,
+        "source_mtime": stat.st_mtime}
+    if cache_file is not None:
+        #Written to a temporary file first so that an interrupted write
+        #does not leave a corrupt cache.
+        tmp_file = cache_file + ".tmp"
+        try:
+            with open(tmp_file, "wb") as f:
+                np.savez(f, **data)
+            os.rename(tmp_file, cache_file)
+        except (IOError, OSError) as ex:
+            logger.warning("Unable to write cache {}: {}".format(cache_file,
+                                                                 ex))
+    return data
+
+
+def _analyze_temperature(args):
+    """
+    Diffusion analysis of the sequential runs at a single temperature.
+    Only Python primitives and numpy arrays are passed to support parallel
+    processing.
+
+    Args:
+        args: (temperature, filepaths, specie, step_skip, min_obs, weighted,
+            nboot, seed, cache_dir, dtype). See ArrheniusAnalyzer.from_runs.
+
+    Returns:
+        (diffusivity, bootstrap diffusivities, summary dict)
+    """
+    (temperature, filepaths, specie, step_skip, min_obs, weighted, nboot,
+     seed, cache_dir, dtype) = args
+
+    def get_data():
+        offset = 0
+        for p in filepaths:
+            data = _get_run_data(p, step_skip, offset, cache_dir=cache_dir)
+            yield data
+            offset = (-(int(data["nionic_steps"]) - offset)) % step_skip
+
+    runs = get_data()
+    first = next(runs)
+    if abs(float(first["temperature"]) - temperature) > 1e-3:
+        raise ValueError("Runs at {} K have TEEND = {} K in {}".format(
+            temperature, float(first["temperature"]), filepaths[0]))
+    structure = Structure(first["lattice"],
+                          [Composition(sp) for sp in
+                           json.loads(str(first["species"]))],
+                          first["frac_coords"][0])
+
+    def get_frac_coords():
+        final_fcoords = first["initial_frac_coords"]
+        #Only one run is held in memory at a time.
+        for data in itertools.chain([first], runs):
+            #check that the runs are continuous
+            fdist = pbc_diff(data["initial_frac_coords"], final_fcoords)
+            if np.any(fdist > 0.001):
+                raise ValueError('initial and final structures do not '
+                                 'match.')
+            final_fcoords = data["final_frac_coords"]
+            for fcoords in data["frac_coords"]:
+                yield fcoords
+
+    d = DiffusionAnalyzer.from_frac_coords(
+        structure, get_frac_coords(), specie, temperature,
+        float(first["time_step"]), step_skip=step_skip, min_obs=min_obs,
+        weighted=weighted, dtype=dtype)
+    boot = d.get_bootstrap_diffusivities(nboot=nboot, seed=seed) \
+        if nboot else np.zeros(0)
+    return d.diffusivity, boot, d.get_summary_dict()
+
+
 def get_extrapolated_diffusivity(temps, diffusivities, new_temp):
     """
     Returns (Arrhenius) extrapolated diffusivity at new_temp
@@ -519,3 +835,182 @@ def get_arrhenius_plot(temps, diffusivities, **kwargs):
     plt.xlabel("1000/T (K$^{-1}$)")
     plt.tight_layout()
     return plt
+
+
+class ArrheniusAnalyzer(MSONable):
+    """
+    Arrhenius fit of the diffusivities at several temperatures, i.e., a
+    least squares regression of log10(D) vs 1000/T, with error estimates
+    from bootstrap samples of the diffusivities.
+
+    .. attribute: activation_energy
+
+        Activation energy in eV.
+
+    .. attribute: log10_d0
+
+        Base 10 logarithm of the pre-exponential factor in cm^2 / s.
+
+    .. attribute: activation_energy_std
+
+        Standard deviation of the activation energy over the bootstrap
+        samples in eV. None if there are no bootstrap samples.
+
+    .. attribute: log10_d0_std
+
+        Standard deviation of log10_d0 over the bootstrap samples. None if
+        there are no bootstrap samples.
+    """
+
+    def __init__(self, temps, diffusivities, bootstrap_diffusivities=None,
+                 summaries=None):
+        """
+        Args:
+            temps ([float]): A sequence of temperatures. units: K
+            diffusivities ([float]): A sequence of diffusivities (e.g.,
+                from DiffusionAnalyzer.diffusivity). units: cm^2/s
+            bootstrap_diffusivities: Optional array with shape [temperature,
+                sample] of bootstrap samples of the diffusivities (e.g., from
+                DiffusionAnalyzer.get_bootstrap_diffusivities).
+            summaries ([dict]): Optional summary dicts of the diffusion
+                analyses at each temperature (e.g., from
+                DiffusionAnalyzer.get_summary_dict).
+        """
+        self.temps = np.array(temps, dtype=np.double)
+        self.diffusivities = np.array(diffusivities, dtype=np.double)
+        self.bootstrap_diffusivities = None \
+            if bootstrap_diffusivities is None \
+            else np.array(bootstrap_diffusivities, dtype=np.double)
+        self.summaries = summaries
+        (self.slope, self.log10_d0) = self._fit(self.diffusivities)
+        self.activation_energy = self._get_activation_energy(self.slope)
+        self.activation_energy_std = None
+        self.log10_d0_std = None
+        if self.bootstrap_diffusivities is not None and \
+                self.bootstrap_diffusivities.size:
+            w = self._fit(self.bootstrap_diffusivities)
+            self.activation_energy_std = np.std(
+                self._get_activation_energy(w[0]))
+            self.log10_d0_std = np.std(w[1])
+
+    def _fit(self, diffusivities):
+        """
+        Least squares regression of log10(D) vs 1000/T. diffusivities can
+        have a second axis of samples, which are fitted at once.
+        """
+        a = np.array([1000 / self.temps, np.ones(len(self.temps))]).T
+        return np.linalg.lstsq(a, np.log10(diffusivities))[0]
+
+    @staticmethod
+    def _get_activation_energy(slope):
+        return - slope * phyc.k_b / phyc.e * 1000 * math.log(10)
+
+    def get_extrapolated_diffusivity(self, new_temp):
+        """
+        Returns (Arrhenius) extrapolated diffusivity at new_temp in cm^2/s.
+
+        Args:
+            new_temp (float): desired temperature. units: K
+        """
+        return 10 ** (self.slope * 1000 / new_temp + self.log10_d0)
+
+    def get_extrapolated_diffusivity_std(self, new_temp):
+        """
+        Returns the standard deviation of the extrapolated diffusivity at
+        new_temp over the bootstrap samples in cm^2/s, or None if there are
+        no bootstrap samples.
+
+        Args:
+            new_temp (float): desired temperature. units: K
+        """
+        if self.activation_energy_std is None:
+            return None
+        w = self._fit(self.bootstrap_diffusivities)
+        return np.std(10 ** (w[0] * 1000 / new_temp + w[1]))
+
+    def get_arrhenius_plot(self, **kwargs):
+        """
+        Returns an Arrhenius plot. See get_arrhenius_plot.
+        """
+        return get_arrhenius_plot(self.temps, self.diffusivities, **kwargs)
+
+    @classmethod
+    def from_runs(cls, runs, specie, step_skip=10, min_obs=30, weighted=True,
+                  nboot=1000, seed=None, ncpus=None, cache_dir=None,
+                  dtype=np.double):
+        """
+        Performs the diffusion analyses of MD runs at several temperatures
+        and fits the diffusivities. The temperatures are analyzed in
+        parallel. The runs are read one at a time and only the
+        displacements of each temperature are held in memory. The sampled
+        ionic steps of each vasprun.xml can be cached in .npz files in
+        cache_dir, so that subsequent analyses, e.g., with a different
+        min_obs, do not parse the xml again.
+
+        Args:
+            runs (dict): {temperature: [paths]}, where paths are the
+                vasprun.xml files of the sequential runs at that temperature
+                (or directories containing them), ordered in sequence of MD
+                simulation. The temperatures (in K) must match TEEND of the
+                runs, otherwise a ValueError is raised.
+            specie (Element/Specie): Specie to calculate diffusivity for as a
+                String. E.g., "Li".
+            step_skip (int): Sampling frequency of the displacements (
+                time_step is multiplied by this number to get the real time
+                between measurements)
+            min_obs (int): Minimum number of observations to have before
+                including in the MSD vs dt calculation.
+            weighted (bool): Uses a weighted least squares to fit the
+                MSD vs dt.
+            nboot (int): Number of bootstrap samples of the diffusivity at
+                each temperature, obtained by resampling the diffusing
+                atoms. Use 0 for no error estimates.
+            seed (int): Seed of the random number generator, for
+                reproducible error estimates.
+            ncpus (int): Number of cpus to use. Default of None means
+                serial processing.
+            cache_dir (str): Directory in which the sampled ionic steps of
+                the runs are cached. Defaults to None, i.e., no caching.
+            dtype: Numpy dtype used to store the displacements. Use
+                np.float32 to halve the memory of long runs.
+
+        Returns:
+            ArrheniusAnalyzer
+        """
+        temps = sorted(runs.keys())
+        tasks = [(float(t), list(runs[t]), str(specie), step_skip, min_obs,
+                  weighted, nboot, seed, cache_dir, dtype) for t in temps]
+        if ncpus:
+            import multiprocessing as mp
+            logger.info("Using {} cpus".format(ncpus))
+            pool = mp.Pool(ncpus)
+            try:
+                results = pool.map(_analyze_temperature, tasks)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            results = map(_analyze_temperature, tasks)
+        diffusivities, boot, summaries = zip(*results)
+        return cls(temps, diffusivities,
+                   bootstrap_diffusivities=boot if nboot else None,
+                   summaries=list(summaries))
+
+    @property
+    def to_dict(self):
+        boot = self.bootstrap_diffusivities
+        return {
+            "@module": self.__class__.__module__,
+            "@class": self.__class__.__name__,
+            "temps": self.temps.tolist(),
+            "diffusivities": self.diffusivities.tolist(),
+            "bootstrap_diffusivities": None if boot is None
+            else boot.tolist(),
+            "summaries": self.summaries
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["temps"], d["diffusivities"],
+                   bootstrap_diffusivities=d.get("bootstrap_diffusivities"),
+                   summaries=d.get("summaries"))
@@ -21,15 +21,23 @@ import math
 import abc
 import itertools
 import copy
+import logging
+import collections
+
+import numpy as np
 
 from pymatgen.serializers.json_coders import MSONable
 from monty.dev import requires
+from pymatgen.core.structure import Molecule
 from pymatgen.io.babelio import BabelMolAdaptor
+from pymatgen.util.coord_utils import kabsch_rmsd_batch
 try:
     import openbabel as ob
 except ImportError:
     ob = None
 
+logger = logging.getLogger(__name__)
+
 
 class AbstractMolAtomMapper(MSONable):
     """
@@ -73,6 +81,22 @@ class AbstractMolAtomMapper(MSONable):
         """
         pass
 
+    def _get_mol_data(self, mol):
+        """
+        Per-molecule data used by _uniform_labels, which is computed once
+        per molecule when many molecules are compared. Always contains the
+        OpenBabel OBMol ("obmol") and the molecule hash ("hash").
+        """
+        obmol = BabelMolAdaptor(mol).openbabel_mol
+        return {"obmol": obmol, "hash": self.get_molecule_hash(obmol)}
+
+    def _uniform_labels(self, data1, data2):
+        """
+        Same as uniform_labels, but for the molecule data returned by
+        _get_mol_data.
+        """
+        return self.uniform_labels(data1["obmol"], data2["obmol"])
+
     @classmethod
     def from_dict(cls, d):
         for trans_modules in ['molecule_matcher']:
@@ -491,21 +515,34 @@ class InchiMolAtomMapper(AbstractMolAtomMapper):
                 return False
         return True
 
+    def _get_mol_data(self, mol):
+        """
+        Caches the OBMol, the inchi labels and the virtual molecule.
+        """
+        obmol = BabelMolAdaptor(mol).openbabel_mol
+        ilabel, iequal_atom, inchi = self._inchi_labels(obmol)
+        vmol = self._virtual_molecule(obmol, ilabel, iequal_atom)
+        return {"obmol": obmol, "hash": inchi, "ilabel": ilabel,
+                "iequal_atom": iequal_atom, "vmol": vmol}
+
     def uniform_labels(self, mol1, mol2):
-        obmol1 = BabelMolAdaptor(mol1).openbabel_mol
-        obmol2 = BabelMolAdaptor(mol2).openbabel_mol
+        return self._uniform_labels(self._get_mol_data(mol1),
+                                    self._get_mol_data(mol2))
 
-        ilabel1, iequal_atom1, inchi1 = self._inchi_labels(obmol1)
-        ilabel2, iequal_atom2, inchi2 = self._inchi_labels(obmol2)
+    def _uniform_labels(self, data1, data2):
+        obmol1, obmol2 = data1["obmol"], data2["obmol"]
+        ilabel1, iequal_atom1 = data1["ilabel"], data1["iequal_atom"]
+        ilabel2, iequal_atom2 = data2["ilabel"], data2["iequal_atom"]
 
-        if inchi1 != inchi2:
+        if data1["hash"] != data2["hash"]:
             return None, None  # Topoligically different
 
         if iequal_atom1 != iequal_atom2:
             raise Exception("Design Error! Equavilent atoms are inconsistent")
 
-        vmol1 = self._virtual_molecule(obmol1, ilabel1, iequal_atom1)
-        vmol2 = self._virtual_molecule(obmol2, ilabel2, iequal_atom2)
+        #The virtual molecules are modified by the alignment.
+        vmol1 = ob.OBMol(data1["vmol"])
+        vmol2 = ob.OBMol(data2["vmol"])
 
         if vmol1.NumAtoms() != vmol2.NumAtoms():
             return None, None
@@ -513,7 +550,8 @@ class InchiMolAtomMapper(AbstractMolAtomMapper):
         if vmol1.NumAtoms() < 3 or self._is_molecule_linear(vmol1) \
                 or self._is_molecule_linear(vmol2):
             # using isomorphism for difficult (actually simple) molecules
-            clabel1, clabel2 = self._assistant_mapper.uniform_labels(mol1, mol2)
+            clabel1, clabel2 = self._assistant_mapper.uniform_labels(obmol1,
+                                                                     obmol2)
         else:
             heavy_atom_indices2 = self._align_heavy_atoms(obmol1, obmol2,
                                                           vmol1, vmol2, ilabel1,
@@ -583,6 +621,120 @@ class MoleculeMatcher(MSONable):
             return float("Inf")
         return self._calc_rms(mol1, mol2, label1, label2)
 
+    def get_rmsds(self, mol, mol_list):
+        """
+        Get the RMSDs of many molecules with arbitrary atom order from a
+        reference molecule. The reference data are computed once and the
+        alignments of all molecules of the same size are done at once.
+
+        Args:
+            mol: Reference molecule. OpenBabel OBMol or pymatgen Molecule
+                object
+            mol_list: List of OpenBabel OBMol or pymatgen Molecule objects
+
+        Returns:
+            Array of RMSDs, which are infinite for molecules with a
+            different topology.
+        """
+        mol_data = [self._get_mol_data(m)
+                    for m in itertools.chain([mol], mol_list)]
+        return self._get_pair_rmsds(mol_data,
+                                    [(0, i + 1) for i in range(len(mol_list))])
+
+    def _get_mol_data(self, mol):
+        """
+        The mapper data of a molecule, along with its cartesian coordinates
+        ("coords").
+        """
+        data = self._mapper._get_mol_data(mol)
+        data["coords"] = self._get_coords(data["obmol"])
+        return data
+
+    def _get_pair_rmsds(self, mol_data, pairs, chunk_size=10000):
+        """
+        RMSDs of pairs of molecules given their data (see _get_mol_data).
+        The atoms of each pair are put in uniform order by the mapper, and
+        the pairs of the same size are then aligned at once with
+        kabsch_rmsd_batch, in chunks of chunk_size pairs.
+
+        Args:
+            mol_data: List of molecule data.
+            pairs: List of pairs of indices in mol_data.
+            chunk_size (int): Number of pairs processed at once.
+
+        Returns:
+            Array of RMSDs, which are infinite for pairs with a different
+            topology.
+        """
+        rmsds = np.empty(len(pairs))
+        rmsds.fill(float("inf"))
+        for start in range(0, len(pairs), chunk_size):
+            batches = collections.defaultdict(list)
+            for k in range(start, min(start + chunk_size, len(pairs))):
+                data1, data2 = mol_data[pairs[k][0]], mol_data[pairs[k][1]]
+                label1, label2 = self._mapper._uniform_labels(data1, data2)
+                if label1 is None or label2 is None:
+                    continue
+                batches[len(label1)].append(
+                    (k, data1["coords"][np.array(label1) - 1],
+                     data2["coords"][np.array(label2) - 1]))
+            for batch in batches.values():
+                inds, coords1, coords2 = zip(*batch)
+                rmsds[list(inds)] = kabsch_rmsd_batch(coords1, coords2)
+        return rmsds
+
+    @staticmethod
+    def _get_coords(obmol):
+        """
+        Cartesian coordinates of the atoms of an OpenBabel OBMol.
+        """
+        return np.array([[a.GetX(), a.GetY(), a.GetZ()]
+                         for a in ob.OBMolAtomIter(obmol)]).reshape((-1, 3))
+
+    @staticmethod
+    def _get_invariants(obmol):
+        """
+        Geometric invariants of a molecule, i.e., quantities that do not
+        depend on the atom order, position and orientation: the sorted
+        interatomic distances and the singular values of the centered
+        coordinates, which are the square roots of the principal moments
+        of inertia with unit masses times the number of atoms.
+
+        Args:
+            obmol: The molecule. OpenBabel OBMol object.
+
+        Returns:
+            (sorted distances, singular values)
+        """
+        coords = MoleculeMatcher._get_coords(obmol)
+        coords -= np.average(coords, axis=0)
+        n = len(coords)
+        i, j = np.triu_indices(n, 1)
+        dists = np.sort(np.sum((coords[i] - coords[j]) ** 2, axis=1) ** 0.5)
+        return dists, np.linalg.svd(coords, compute_uv=False)
+
+    def _may_fit(self, invariants1, invariants2):
+        """
+        Checks whether two molecules can have a RMSD below the tolerance
+        based on their geometric invariants. If the atoms of two molecules
+        of N atoms are at a RMSD r after the alignment, the singular values
+        of their centered coordinates differ by at most sqrt(N) r and their
+        sorted interatomic distances by at most sqrt(2N(N - 1)) r (both in
+        2-norm), whatever the atom mapping. Molecules failing either bound
+        cannot fit and do not need to be aligned.
+        """
+        dists1, sv1 = invariants1
+        dists2, sv2 = invariants2
+        if len(dists1) != len(dists2) or len(sv1) != len(sv2):
+            return False
+        #2N(N - 1) is four times the number of distances.
+        npairs = len(dists1)
+        natoms = (1 + (1 + 8 * npairs) ** 0.5) / 2
+        #Slack for the round-off of the RMSD.
+        tol = self._tolerance * (1 + 1e-6) + 1e-10
+        return np.linalg.norm(sv1 - sv2) <= natoms ** 0.5 * tol and \
+            np.linalg.norm(dists1 - dists2) <= 2 * npairs ** 0.5 * tol
+
     @staticmethod
     def _calc_rms(mol1, mol2, clabel1, clabel2):
         """
@@ -601,42 +753,39 @@ class MoleculeMatcher(MSONable):
         Returns:
             The RMSD.
         """
-        obmol1 = BabelMolAdaptor(mol1).openbabel_mol
-        obmol2 = BabelMolAdaptor(mol2).openbabel_mol
-
-        cmol1 = ob.OBMol()
-        for i in clabel1:
-            oa1 = obmol1.GetAtom(i)
-            a1 = cmol1.NewAtom()
-            a1.SetAtomicNum(oa1.GetAtomicNum())
-            a1.SetVector(oa1.GetVector())
-        cmol2 = ob.OBMol()
-        for i in clabel2:
-            oa2 = obmol2.GetAtom(i)
-            a2 = cmol2.NewAtom()
-            a2.SetAtomicNum(oa2.GetAtomicNum())
-            a2.SetVector(oa2.GetVector())
+        coords1 = MoleculeMatcher._get_coords(
+            BabelMolAdaptor(mol1).openbabel_mol)
+        coords2 = MoleculeMatcher._get_coords(
+            BabelMolAdaptor(mol2).openbabel_mol)
+        return kabsch_rmsd_batch(coords1[np.array(clabel1) - 1],
+                                 coords2[None, np.array(clabel2) - 1])[0]
 
-        aligner = ob.OBAlign(True, False)
-        aligner.SetRefMol(cmol1)
-        aligner.SetTargetMol(cmol2)
-        aligner.Align()
-        return aligner.GetRMSD()
-
-    def group_molecules(self, mol_list):
+    def group_molecules(self, mol_list, ncpus=None):
         """
         Group molecules by structural equality.
 
+        The InChI labels and virtual molecules of each molecule are computed
+        only once. Molecules are pre-grouped by the molecular hash of the
+        mapper, and pairs whose geometric invariants (sorted interatomic
+        distances and principal moments) show that they cannot fit within
+        the tolerance are not aligned.
+
         Args:
             mol_list: List of OpenBabel OBMol or pymatgen objects
+            ncpus (int): Number of cpus to use for the alignment of the
+                remaining pairs. Default of None means serial processing.
+                Molecules are passed to the worker processes as pymatgen
+                Molecules.
 
         Returns:
             A list of lists of matched molecules
             Assumption: if s1=s2 and s2=s3, then s1=s3
             This may not be true for small tolerances.
         """
-        mol_hash = [(i, self._mapper.get_molecule_hash(m))
-                    for i, m in enumerate(mol_list)]
+        mol_data = [self._get_mol_data(m) for m in mol_list]
+        invariants = [self._get_invariants(d["obmol"]) for d in mol_data]
+        mol_hash = [(i, d["hash"]) for i, d in enumerate(mol_data)]
+        mol_hash_dict = dict(mol_hash)
         mol_hash.sort(key=lambda x: x[1])
 
         #Use molecular hash to pre-group molecules.
@@ -644,12 +793,36 @@ class MoleculeMatcher(MSONable):
                             in itertools.groupby(mol_hash,
                                                  key=lambda x: x[1])])
 
+        pairs = [p for rg in raw_groups
+                 for p in itertools.combinations(sorted(rg), 2)
+                 if self._may_fit(invariants[p[0]], invariants[p[1]])]
+        logger.debug("Aligning {} pairs of molecules".format(len(pairs)))
+        if ncpus and pairs:
+            import multiprocessing as mp
+            chunk = int(math.ceil(len(pairs) / (4.0 * ncpus)))
+            tasks = []
+            for i in range(0, len(pairs), chunk):
+                chunk_pairs = pairs[i:i + chunk]
+                mols = {j: mol_list[j] if isinstance(mol_list[j], Molecule)
+                        else BabelMolAdaptor(mol_list[j]).pymatgen_mol
+                        for j in set(itertools.chain(*chunk_pairs))}
+                tasks.append((self, mols, chunk_pairs))
+            pool = mp.Pool(ncpus)
+            try:
+                fits = list(itertools.chain(*pool.map(_fit_pairs, tasks)))
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            fits = self._get_pair_rmsds(mol_data, pairs) < self._tolerance
+        group_mol_eq = collections.defaultdict(set)
+        for p, fit in zip(pairs, fits):
+            if fit:
+                group_mol_eq[mol_hash_dict[p[0]]].add(p)
+
         group_indices = []
         for rg in raw_groups:
-            mol_eq_test = [(p[0], p[1], self.fit(mol_list[p[0]],
-                                                 mol_list[p[1]]))
-                           for p in itertools.combinations(sorted(rg), 2)]
-            mol_eq = set([(p[0], p[1]) for p in mol_eq_test if p[2]])
+            mol_eq = group_mol_eq[mol_hash_dict[rg[0]]]
             not_alone_mols = set(itertools.chain.from_iterable(mol_eq))
             alone_mols = set(rg) - not_alone_mols
             group_indices.extend([[m] for m in alone_mols])
@@ -683,3 +856,20 @@ class MoleculeMatcher(MSONable):
         return MoleculeMatcher(
             tolerance=d["tolerance"],
             mapper=AbstractMolAtomMapper.from_dict(d["mapper"]))
+
+
+def _fit_pairs(args):
+    """
+    Fits pairs of molecules. Supports parallel processing in
+    MoleculeMatcher.group_molecules.
+
+    Args:
+        args: (matcher, mols, pairs), where mols is a dict of {index:
+            molecule} of all molecules in the pairs of indices.
+
+    Returns:
+        List of booleans indicating whether the pairs of molecules fit.
+    """
+    matcher, mols, pairs = args
+    mol_data = {i: matcher._get_mol_data(m) for i, m in mols.items()}
+    return list(matcher._get_pair_rmsds(mol_data, pairs) < matcher._tolerance)
@@ -9,8 +9,10 @@ This module is supposed to perform rough comparisons with the atom order
 correspondence prerequisite, while molecule_matcher is supposed to do exact
 comparisons without the atom order correspondence prerequisite.
 """
-import itertools
+import numpy as np
+
 from pymatgen.serializers.json_coders import MSONable
+from pymatgen.core.bonds import BondGraph
 
 __author__ = "Xiaohui Qu"
 __copyright__ = "Copyright 2011, The Materials Project"
@@ -108,26 +110,34 @@ class MoleculeStructureComparator(MSONable):
             List of tuple. Each tuple correspond to a bond represented by the
             id of the two end atoms.
         """
-        num_atoms = len(mol)
-        # index starting from 0
-        all_pairs = list(itertools.combinations(range(num_atoms), 2))
-        pair_dists = [mol.get_distance(*p) for p in all_pairs]
         elements = mol.composition.to_dict.keys()
         unavailable_elements = list(set(elements) -
                                     set(self.covalent_radius.keys()))
         if len(unavailable_elements) > 0:
             raise ValueError("The covalent radius for element {} is not "
                              "available".format(unavailable_elements))
-        max_length = [(self.covalent_radius[mol.sites[p[0]].specie.symbol] +
-                       self.covalent_radius[mol.sites[p[1]].specie.symbol]) *
-                      (1 + (self.priority_cap
-                            if p in self.priority_bonds
-                            else self.bond_length_cap))
-                      for p in all_pairs]
-        bonds = [bond
-                 for bond, dist, cap in zip(all_pairs, pair_dists, max_length)
-                 if dist <= cap]
-        return bonds
+        symbols = [site.specie.symbol for site in mol.sites]
+        unique = sorted(set(symbols))
+        radii = np.array([self.covalent_radius[sym] for sym in unique])
+        max_lengths = (radii[:, None] + radii[None, :]) * \
+            (1 + self.bond_length_cap)
+        index = {sym: i for i, sym in enumerate(unique)}
+        graph = BondGraph.from_max_lengths(
+            mol.cart_coords, [index[sym] for sym in symbols], max_lengths)
+        # index starting from 0
+        bonds = set([tuple(b) for b in graph.bonds.tolist()])
+        #The priority bonds have their own caps.
+        for p in self.priority_bonds:
+            if max(p) >= len(mol):
+                continue
+            cap = (self.covalent_radius[symbols[p[0]]] +
+                   self.covalent_radius[symbols[p[1]]]) * \
+                (1 + self.priority_cap)
+            if mol.get_distance(*p) <= cap:
+                bonds.add(p)
+            else:
+                bonds.discard(p)
+        return sorted(bonds)
 
     @property
     def to_dict(self):
@@ -461,6 +461,110 @@ def smart_float_gcd(list_of_floats):
     return 1 / mult_factor
 
 
+def get_composition_matrix(compositions):
+    """
+    Returns the amounts of the elements in compositions as a matrix, for use
+    with balance_reactions.
+
+    Args:
+        compositions ([Composition]): List of compositions.
+
+    Returns:
+        (matrix, elements), where matrix has shape (len(compositions),
+        len(elements)) and elements is the sorted list of all elements.
+    """
+    elements = sorted(set(itertools.chain.from_iterable(
+        c.elements for c in compositions)))
+    matrix = np.array([[c[el] for el in elements] for c in compositions],
+                      dtype=np.float64).reshape((-1, len(elements)))
+    return matrix, elements
+
+
+def balance_reactions(comp_matrix, reactions, energies=None,
+                      tol=Reaction.TOLERANCE, chunk_size=100000):
+    """
+    Balances many reactions between compositions at once. Each reaction is
+    given by the indices of its reactants and products in a shared
+    composition matrix, and its coefficients are the least squares solution
+    of the element balance, i.e., the right singular vector of the element
+    matrix of the reaction with the smallest singular value. Reactions with
+    the same number of compositions are solved with a single stacked SVD.
+
+    The coefficients follow the conventions of Reaction: they are in the
+    order of the reactants followed by the products, and are normalized so
+    that the last nonzero coefficient is 1, i.e., reactants usually have
+    negative coefficients. Reactions are balanced only if the balance is
+    unique, i.e., if the element matrix has a one-dimensional null space.
+    Compositions that do not take part in such a balance have a zero
+    coefficient. Reactions with several independent balances are not
+    balanced, and can be handled with Reaction.
+
+    Args:
+        comp_matrix: Amounts of the elements in each composition, with shape
+            (number of compositions, number of elements). See
+            get_composition_matrix.
+        reactions: List of (reactant indices, product indices).
+        energies: Optional energies of the compositions, e.g., of a formula
+            unit of each composition of comp_matrix.
+        tol (float): Relative tolerance for the rank of the element matrix
+            and for zero coefficients.
+        chunk_size (int): Number of reactions solved at once.
+
+    Returns:
+        (coeffs, reaction_energies, balanced). coeffs is an array with shape
+        (number of reactions, largest number of compositions in a reaction)
+        padded with zeros. reaction_energies is an array of the reaction
+        energies, or None if energies is None. balanced is a boolean array
+        indicating whether each reaction was balanced. The coefficients and
+        energies of the other reactions are nan.
+    """
+    comp_matrix = np.array(comp_matrix, dtype=np.float64)
+    #Elements absent from all compositions do not constrain the balances.
+    comp_matrix = comp_matrix[:, np.any(comp_matrix != 0, axis=0)]
+    indices = [list(rcts) + list(prods) for rcts, prods in reactions]
+    sizes = np.array([len(inds) for inds in indices], dtype=np.int)
+    kmax = np.max(sizes) if len(sizes) else 0
+    coeffs = np.zeros((len(indices), kmax))
+    coeffs.fill(np.nan)
+    balanced = np.zeros(len(indices), dtype=bool)
+    for k in np.unique(sizes):
+        if k < 2:
+            continue
+        rxns = np.where(sizes == k)[0]
+        for start in xrange(0, len(rxns), chunk_size):
+            chunk = rxns[start:start + chunk_size]
+            inds = np.array([indices[i] for i in chunk], dtype=np.int)
+            #Stacked (k, elements) matrices, whose left singular vectors are
+            #the right singular vectors of the element matrices.
+            u, sv, vt = np.linalg.svd(comp_matrix[inds])
+            rank = np.sum(sv > tol * np.max(sv, axis=1)[:, None], axis=1)
+            ok = rank == k - 1
+            c = u[:, :, k - 1]
+            #Normalize to the last nonzero coefficient.
+            nonzero = np.abs(c) > tol * np.max(np.abs(c), axis=1)[:, None]
+            last = k - 1 - np.argmax(nonzero[:, ::-1], axis=1)
+            c /= c[np.arange(len(c)), last][:, None]
+            c[~nonzero] = 0
+            coeffs[chunk, :k] = np.where(ok[:, None], c, np.nan)
+            balanced[chunk] = ok
+    #Zero padding of the balanced reactions.
+    coeffs[balanced[:, None] &
+           (np.arange(kmax)[None, :] >= sizes[:, None])] = 0
+
+    reaction_energies = None
+    if energies is not None:
+        energies = np.array(energies, dtype=np.float64)
+        reaction_energies = np.zeros(len(indices))
+        for k in np.unique(sizes):
+            rxns = np.where(sizes == k)[0]
+            inds = np.array([indices[i] for i in rxns],
+                            dtype=np.int).reshape((len(rxns), k))
+            reaction_energies[rxns] = np.sum(
+                coeffs[rxns, :k] * energies[inds], axis=1)
+        reaction_energies[~balanced] = np.nan
+    return coeffs, reaction_energies, balanced
+
+
 class ReactionError(Exception):
     """
     Exception class for Reactions. Allows more information in exception
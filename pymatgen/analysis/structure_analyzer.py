@@ -29,23 +29,36 @@ from pymatgen import Element, Specie, Composition
 class VoronoiCoordFinder(object):
     """
     Uses a Voronoi algorithm to determine the coordination for each site in a
-    structure.
+    structure. The polyhedra are cached on the finder, i.e., the structure
+    should not be modified after the finder is created.
 
     Args:
         structure (Structure): Input structure
         target ([Element/Specie]): A list of target species to determine
             coordination for.
+        full_tessellation (bool): If True, the Voronoi polyhedra of all
+            sites are obtained from a single tessellation of the sites in the
+            unit cell and the minimal shell of periodic images needed to
+            bound them, instead of one tessellation of the neighbors within
+            default_cutoff per site. This is much faster if the
+            coordination of many sites is needed.
     """
 
     # Radius in Angstrom cutoff to look for coordinating atoms
     default_cutoff = 10.0
 
-    def __init__(self, structure, target=None):
+    # Initial thickness in Angstrom of the shell of periodic images used in
+    # the full tessellation
+    default_shell = 6.0
+
+    def __init__(self, structure, target=None, full_tessellation=False):
         self._structure = structure
         if target is None:
             self._target = structure.composition.elements
         else:
             self._target = target
+        self.full_tessellation = full_tessellation
+        self._polyhedra = {}
 
     def get_voronoi_polyhedra(self, n):
         """
@@ -61,7 +74,22 @@ class VoronoiCoordFinder(object):
             A dict of sites sharing a common Voronoi facet with the site
             n and their solid angle weights
         """
+        return dict(self._get_cached_polyhedra(n))
 
+    def _get_cached_polyhedra(self, n):
+        """
+        Returns the weighted polyhedra of site n as a list of (site, weight).
+        """
+        n %= len(self._structure)
+        if n not in self._polyhedra:
+            if self.full_tessellation:
+                self._polyhedra.update(self._get_all_voronoi_polyhedra())
+            else:
+                self._polyhedra[n] = \
+                    self._get_site_voronoi_polyhedra(n).items()
+        return self._polyhedra[n]
+
+    def _get_site_voronoi_polyhedra(self, n):
         localtarget = self._target
         center = self._structure[n]
         neighbors = self._structure.get_sites_in_sphere(
@@ -91,6 +119,27 @@ class VoronoiCoordFinder(object):
 
         return resultweighted
 
+    def _get_all_voronoi_polyhedra(self):
+        """
+        Computes the weighted polyhedra of all sites from a single
+        tessellation.
+        """
+        structure = self._structure
+        centers, neighbors, images, angles = get_voronoi_facets(
+            structure, VoronoiCoordFinder.default_shell)
+        fcoords = structure.frac_coords
+        maxangles = np.zeros(len(structure))
+        np.maximum.at(maxangles, centers, angles)
+        polyhedra = {n: [] for n in xrange(len(structure))}
+        for i, j, image, angle in zip(centers, neighbors, images, angles):
+            site = structure[j]
+            if site.specie in self._target:
+                nn = PeriodicSite(site.species_and_occu, fcoords[j] + image,
+                                  structure.lattice,
+                                  properties=site.properties)
+                polyhedra[i].append((nn, angle / maxangles[i]))
+        return polyhedra
+
     def get_coordination_number(self, n):
         """
         Returns the coordination number of site with index n.
@@ -98,7 +147,7 @@ class VoronoiCoordFinder(object):
         Args:
             n (int): Site index
         """
-        return sum(self.get_voronoi_polyhedra(n).values())
+        return sum(weight for site, weight in self._get_cached_polyhedra(n))
 
     def get_coordinated_sites(self, n, tol=0, target=None):
         """
@@ -115,7 +164,7 @@ class VoronoiCoordFinder(object):
             Sites coordinating input site.
         """
         coordinated_sites = []
-        for site, weight in self.get_voronoi_polyhedra(n).items():
+        for site, weight in self._get_cached_polyhedra(n):
             if weight > tol and (target is None or site.specie == target):
                 coordinated_sites.append(site)
         return coordinated_sites
@@ -202,9 +251,14 @@ class VoronoiConnectivity(object):
     Computes the solid angles swept out by the shared face of the voronoi
     polyhedron between two sites.
 
+    Only the sites in the unit cell and the shell of periodic images needed
+    to bound their polyhedra are tessellated, and the connectivity is stored
+    in a sparse form. The dense connectivity_array is only built on request.
+
     Args:
         structure (Structure): Input structure
-        cutoff (float) Cutoff distance.
+        cutoff (float) Cutoff distance. Determines the range of the periodic
+            images that can be indexed.
     """
 
     # Radius in Angstrom cutoff to look for coordinating atoms
@@ -218,6 +272,34 @@ class VoronoiConnectivity(object):
         self.offsets = np.reshape(offsets, (-1, 3))
         #shape = [image, axis]
         self.cart_offsets = self.s.lattice.get_cartesian_coords(self.offsets)
+        self._sparse = None
+
+    @property
+    def sparse_connectivity(self):
+        """
+        Provides the connectivity in coordinate (COO) format.
+
+        Returns:
+            (atomi, atomj, imagej, angle) arrays with one entry per pair of
+            sites sharing a Voronoi facet. atomi is the index of the atom in
+            the input structure, atomj and imagej the index of the atom and
+            of its periodic image (an index into offsets) and angle the solid
+            angle of the polygon between atomi and imagej of atomj. This is
+            the nonzero data of connectivity_array.
+        """
+        if self._sparse is None:
+            atomi, atomj, images, angles = get_voronoi_facets(self.s)
+            image_indices = {tuple(o): k
+                             for k, o in enumerate(self.offsets.astype(int))}
+            imagej = np.array([image_indices.get(tuple(image), -1)
+                               for image in images], dtype=np.int)
+            if np.any(imagej < 0):
+                warn('Found connectivity with images outside the cutoff. '
+                     'Cutoff is too low, and results may be incorrect')
+            keep = imagej >= 0
+            self._sparse = (atomi[keep], atomj[keep], imagej[keep],
+                            angles[keep])
+        return self._sparse
 
     @property
     def connectivity_array(self):
@@ -231,39 +313,10 @@ class VoronoiConnectivity(object):
             by both an atom index and an image index. Array data is the
             solid angle of polygon between atomi and imagej of atomj
         """
-        #shape = [site, axis]
-        cart_coords = np.array(self.s.cart_coords)
-        #shape = [site, image, axis]
-        all_sites = cart_coords[:, None, :] + self.cart_offsets[None, :, :]
-        vt = VoronoiTess(all_sites.reshape((-1, 3)))
-        n_images = all_sites.shape[1]
+        atomi, atomj, imagej, angles = self.sparse_connectivity
         cs = (len(self.s), len(self.s), len(self.cart_offsets))
         connectivity = np.zeros(cs)
-        vts = np.array(vt.vertices)
-        for (ki, kj), v in vt.ridges.items():
-            atomi = ki // n_images
-            atomj = kj // n_images
-
-            imagei = ki % n_images
-            imagej = kj % n_images
-
-            if imagei != n_images // 2 and imagej != n_images // 2:
-                continue
-
-            if imagei == n_images // 2:
-                #atomi is in original cell
-                val = solid_angle(vt.points[ki], vts[v])
-                connectivity[atomi, atomj, imagej] = val
-
-            if imagej == n_images // 2:
-                #atomj is in original cell
-                val = solid_angle(vt.points[kj], vts[v])
-                connectivity[atomj, atomi, imagei] = val
-
-            if -10.101 in vts[v]:
-                warn('Found connectivity with infinite vertex. '
-                     'Cutoff is too low, and results may be '
-                     'incorrect')
+        connectivity[atomi, atomj, imagej] = angles
         return connectivity
 
     @property
@@ -273,21 +326,20 @@ class VoronoiConnectivity(object):
         the maximum connectivity of site i to any periodic
         image of site j
         """
-        return np.max(self.connectivity_array, axis=2)
+        atomi, atomj, imagej, angles = self.sparse_connectivity
+        maxconn = np.zeros((len(self.s), len(self.s)))
+        np.maximum.at(maxconn, (atomi, atomj), angles)
+        return maxconn
 
     def get_connections(self):
         """
         Returns a list of site pairs that are Voronoi Neighbors, along
         with their real-space distances.
         """
-        con = []
-        maxconn = self.max_connectivity
-        for ii in range(0, maxconn.shape[0]):
-            for jj in range(0, maxconn.shape[1]):
-                if maxconn[ii][jj] != 0:
-                    dist = self.s.get_distance(ii, jj)
-                    con.append([ii, jj, dist])
-        return con
+        atomi, atomj, imagej, angles = self.sparse_connectivity
+        pairs = sorted(set(zip(atomi[angles != 0].tolist(),
+                               atomj[angles != 0].tolist())))
+        return [[ii, jj, self.s.get_distance(ii, jj)] for ii, jj in pairs]
 
     def get_sitej(self, site_index, image_index):
         """
@@ -305,6 +357,73 @@ class VoronoiConnectivity(object):
         return PeriodicSite(atoms_n_occu, coords, lattice)
 
 
+def get_voronoi_facets(structure, shell=6.0):
+    """
+    Computes the Voronoi facets of all sites of a periodic structure from a
+    single tessellation of the sites and the minimal shell of periodic images
+    needed to bound their polyhedra. The shell is thickened until all Voronoi
+    vertices of the sites are closer to their site than half the shell
+    thickness, which guarantees that no image outside the shell can modify
+    the polyhedra.
+
+    Args:
+        structure (Structure): Input structure.
+        shell (float): Initial thickness in Angstrom of the shell of images
+            around the sites.
+
+    Returns:
+        (centers, neighbors, images, angles) arrays with one entry per facet.
+        The facet is shared by site centers and the periodic image images of
+        site neighbors, and sweeps out a solid angle angles from the site.
+        Images are relative to the fractional coordinates of the structure,
+        i.e., they are not wrapped into the unit cell.
+    """
+    latt = structure.lattice
+    nsites = len(structure)
+    fcoords = structure.frac_coords
+    recp_len = np.array(latt.reciprocal_lattice.abc)
+    lo, hi = np.min(fcoords, axis=0), np.max(fcoords, axis=0)
+    while True:
+        #Fractional thickness of the shell along each axis.
+        f = shell * recp_len / (2 * math.pi)
+        nmax = np.ceil(f + hi - lo).astype(np.int)
+        images = [[0, 0, 0]]
+        images.extend(image for image in itertools.product(
+            *[xrange(-i, i + 1) for i in nmax]) if any(image))
+        images = np.array(images)
+        shifted = images[:, None, :] + fcoords[None, :, :]
+        inds = np.nonzero(np.all((shifted >= lo - f) & (shifted <= hi + f),
+                                 axis=-1))
+        #The sites themselves are the first nsites points.
+        points = latt.get_cartesian_coords(shifted[inds])
+        voro = VoronoiTess(points)
+        vertices = np.array(voro.vertices)
+        centers, others, facets = [], [], []
+        for (i, j), vind in voro.ridges.items():
+            for ki, kj in ((i, j), (j, i)):
+                if ki < nsites:
+                    centers.append(ki)
+                    others.append(kj)
+                    facets.append(vind)
+        if all(0 not in vind for vind in facets):
+            dists = [np.max(np.sum((vertices[vind] - points[k]) ** 2,
+                                   axis=1))
+                     for k, vind in zip(centers, facets)]
+            if np.sqrt(np.max(dists)) < shell / 2:
+                break
+        if shell > 1000:
+            raise RuntimeError("This structure is pathological,"
+                               " infinite vertex in the voronoi "
+                               "construction")
+        shell *= 1.5
+
+    centers = np.array(centers, dtype=np.int)
+    others = np.array(others, dtype=np.int)
+    angles = solid_angles(points[centers], [vertices[vind]
+                                            for vind in facets])
+    return centers, inds[1][others], images[inds[0][others]], angles
+
+
 def solid_angle(center, coords):
     """
     Helper method to calculate the solid angle of a set of coords from the
@@ -328,6 +447,43 @@ def solid_angle(center, coords):
     return phi + (3 - len(r)) * math.pi
 
 
+def solid_angles(centers, facets):
+    """
+    Vectorized calculation of the solid angles of several convex polygons.
+    Each polygon is split into a fan of triangles, whose solid angles are
+    obtained with the formula of Van Oosterom and Strackee.
+
+    Args:
+        centers (Nx3 array): Centers to measure the solid angles from.
+        facets ([Mx3 array]): List of N polygons given as their vertices in
+            order.
+
+    Returns:
+        Array of the N solid angles.
+    """
+    centers = np.array(centers, dtype=np.float).reshape((-1, 3))
+    inds, a, b, c = [], [], [], []
+    for i, facet in enumerate(facets):
+        facet = np.array(facet, dtype=np.float)
+        ntri = len(facet) - 2
+        inds.extend([i] * ntri)
+        a.extend([facet[0]] * ntri)
+        b.extend(facet[1:-1])
+        c.extend(facet[2:])
+    if not inds:
+        return np.zeros(len(centers))
+    inds = np.array(inds)
+    a = np.array(a) - centers[inds]
+    b = np.array(b) - centers[inds]
+    c = np.array(c) - centers[inds]
+    la, lb, lc = [np.sqrt(np.sum(v ** 2, axis=1)) for v in (a, b, c)]
+    num = np.abs(np.sum(a * np.cross(b, c), axis=1))
+    den = la * lb * lc + np.sum(a * b, axis=1) * lc + \
+        np.sum(a * c, axis=1) * lb + np.sum(b * c, axis=1) * la
+    return np.bincount(inds, weights=2 * np.arctan2(num, den),
+                       minlength=len(centers))
+
+
 def contains_peroxide(structure, relative_cutoff=1.1):
     """
     Determines if a structure contains peroxide anions.
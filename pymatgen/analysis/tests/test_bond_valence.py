@@ -21,7 +21,8 @@ import os
 
 from pymatgen.io.cifio import CifParser
 from pymatgen.core.periodic_table import Specie
-from pymatgen.analysis.bond_valence import BVAnalyzer
+from pymatgen.analysis.bond_valence import BVAnalyzer, calculate_bv_sum, \
+    calculate_bv_sums
 
 
 test_dir = os.path.join(os.path.dirname(__file__), "..", "..", "..",
@@ -67,6 +68,35 @@ class BVAnalyzerTest(unittest.TestCase):
         self.assertIn(Specie("Mn", 3), news.composition.elements)
         self.assertIn(Specie("Mn", 4), news.composition.elements)
 
+    def test_get_valence_unordered(self):
+        parser = CifParser(os.path.join(test_dir, "LiFePO4.cif"))
+        s = parser.get_structures()[0]
+        s.replace_species({"Li": {"Li": 0.5, "Na": 0.5}})
+        valences = self.analyzer.get_valences(s)
+        self.assertEqual(valences[:4], [[1, 1]] * 4)
+        self.assertEqual(valences[4:12], [[2]] * 4 + [[5]] * 4)
+        self.assertEqual(valences[12:], [[-2]] * 16)
+
+    def test_max_permutations(self):
+        parser = CifParser(os.path.join(test_dir, "LiMn2O4.cif"))
+        s = parser.get_structures()[0]
+        self.assertRaises(ValueError, BVAnalyzer(max_permutations=0)
+                          .get_valences, s)
+
+
+class FuncTest(unittest.TestCase):
+
+    def test_calculate_bv_sums(self):
+        parser = CifParser(os.path.join(test_dir, "LiFePO4.cif"))
+        s = parser.get_structures()[0]
+        bv_sums = calculate_bv_sums(s, max_radius=4, scale_factor=1.015)
+        for site, bv_sum in zip(s, bv_sums):
+            self.assertAlmostEqual(
+                bv_sum, calculate_bv_sum(site, s.get_neighbors(site, 4),
+                                         scale_factor=1.015))
+        self.assertEqual(len(calculate_bv_sums(s, s[:3])), 3)
+
+
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
     unittest.main()
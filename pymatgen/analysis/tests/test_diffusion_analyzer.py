@@ -16,12 +16,16 @@ __date__ = "5/2/13"
 import unittest
 import os
 import json
+import shutil
+import tempfile
 
 import numpy as np
 
 from pymatgen.analysis.diffusion_analyzer import DiffusionAnalyzer,\
-    get_conversion_factor
+    ArrheniusAnalyzer, get_conversion_factor, get_msd, \
+    get_extrapolated_diffusivity, _get_run_data, _get_cache_file
 from pymatgen.io.smartio import read_structure
+from pymatgen.core.trajectory import Trajectory
 
 test_dir = os.path.join(os.path.dirname(__file__), "..", "..", "..",
                         'test_files')
@@ -35,6 +39,16 @@ class FuncTest(unittest.TestCase):
         self.assertAlmostEqual(41370704.1173,
                                get_conversion_factor(s, "Li", 600), 4)
 
+    def test_get_msd(self):
+        x = np.cumsum(np.random.randn(4, 50, 3), axis=1)
+        lags = [1, 7, 49]
+        msd = get_msd(x, lags)
+        for i, n in enumerate(lags):
+            dx = x[:, n:, :] - x[:, :-n, :]
+            self.assertTrue(np.allclose(msd[i],
+                                        np.sum(np.average(dx ** 2, axis=1),
+                                               axis=0)))
+
 
 class DiffusionAnalyzerTest(unittest.TestCase):
 
@@ -60,6 +74,167 @@ class DiffusionAnalyzerTest(unittest.TestCase):
             #Ensure summary dict is json serializable.
             json.dumps(d.get_summary_dict(include_msd_t=True))
 
+    def test_from_frac_coords(self):
+        with open(os.path.join(test_dir, "DiffusionAnalyzer.json")) as f:
+            d = DiffusionAnalyzer.from_dict(json.load(f))
+        f_disp = d.s.lattice.get_fractional_coords(d.disp)
+        frac_coords = np.mod(d.s.frac_coords[:, None, :] + f_disp, 1)
+        for dtype in (np.double, np.float32):
+            d2 = DiffusionAnalyzer.from_frac_coords(
+                d.s, frac_coords.transpose((1, 0, 2)), "Li", d.temperature,
+                d.time_step, d.step_skip, min_obs=d.min_obs,
+                weighted=d.weighted, dtype=dtype)
+            self.assertEqual(d2.disp.dtype, dtype)
+            self.assertAlmostEqual(d2.diffusivity / d.diffusivity, 1, 6)
+            self.assertTrue(np.allclose(d2.s_msd, d.s_msd, rtol=1e-5))
+            self.assertAlmostEqual(d2.max_framework_displacement,
+                                   d.max_framework_displacement, 4)
+        #Without a known number of steps, the buffer is grown as needed.
+        d4 = DiffusionAnalyzer.from_frac_coords(
+            d.s, iter(frac_coords.transpose((1, 0, 2))), "Li", d.temperature,
+            d.time_step, d.step_skip, min_obs=d.min_obs, weighted=d.weighted)
+        self.assertEqual(d4.disp.shape, d.disp.shape)
+        self.assertTrue(np.allclose(d4.disp, d.disp))
+
+        traj = Trajectory(d.s.lattice, d.s.species,
+                          frac_coords.transpose((1, 0, 2)))
+        d3 = DiffusionAnalyzer.from_structures(
+            traj, "Li", d.temperature, d.time_step, d.step_skip,
+            min_obs=d.min_obs, weighted=d.weighted)
+        self.assertAlmostEqual(d3.diffusivity / d.diffusivity, 1, 6)
+        self.assertTrue(np.allclose(traj.get_displacements(), d.disp))
+
+    def test_get_bootstrap_diffusivities(self):
+        with open(os.path.join(test_dir, "DiffusionAnalyzer.json")) as f:
+            d = DiffusionAnalyzer.from_dict(json.load(f))
+        boot = d.get_bootstrap_diffusivities(nboot=200, seed=0)
+        self.assertEqual(boot.shape, (200,))
+        self.assertTrue(np.all(boot > 0))
+        self.assertAlmostEqual(np.mean(boot) / d.diffusivity, 1, 0)
+        self.assertTrue(np.allclose(
+            boot, d.get_bootstrap_diffusivities(nboot=200, seed=0)))
+
+
+class ArrheniusAnalyzerTest(unittest.TestCase):
+
+    def setUp(self):
+        with open(os.path.join(test_dir, "DiffusionAnalyzer.json")) as f:
+            self.d = DiffusionAnalyzer.from_dict(json.load(f))
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _write_runs(self):
+        #Fakes cached vasprun.xml files of two sequential runs at each
+        #temperature, with the displacements of the test data scaled.
+        d = self.d
+        runs = {}
+        self.analyzers = []
+        for temp, scale in [(600, 0.8), (800, 1), (1000, 1.3)]:
+            disp = d.disp * scale
+            f_disp = d.s.lattice.get_fractional_coords(disp)
+            frac_coords = np.mod(d.s.frac_coords[:, None, :] + f_disp, 1)
+            frac_coords = frac_coords.transpose((1, 0, 2))
+            self.analyzers.append(DiffusionAnalyzer(
+                d.s, disp, "Li", temp, d.time_step, d.step_skip,
+                min_obs=d.min_obs, weighted=d.weighted))
+            n = len(frac_coords) // 2
+            paths = []
+            for i, fcoords in enumerate([frac_coords[:n],
+                                         frac_coords[n:]]):
+                path = os.path.join(self.tmp_dir,
+                                    "{}_{}.vasprun.xml".format(temp, i))
+                np.savez(
+                    _get_cache_file(path, self.tmp_dir, d.step_skip, 0),
+                    frac_coords=fcoords, lattice=d.s.lattice.matrix,
+                    species=json.dumps([sp.to_dict for sp in
+                                        d.s.species_and_occu]),
+                    initial_frac_coords=frac_coords[max(i * n - 1, 0)],
+                    final_frac_coords=fcoords[-1],
+                    nionic_steps=len(fcoords) * d.step_skip,
+                    temperature=temp, time_step=d.time_step)
+                paths.append(path)
+            runs[temp] = paths
+        return runs
+
+    def test_from_runs(self):
+        runs = self._write_runs()
+        d = self.d
+        temps = [600, 800, 1000]
+        diffusivities = [a.diffusivity for a in self.analyzers]
+        for ncpus in (None, 2):
+            aa = ArrheniusAnalyzer.from_runs(
+                runs, "Li", step_skip=d.step_skip, min_obs=d.min_obs,
+                weighted=d.weighted, nboot=100, seed=0, ncpus=ncpus,
+                cache_dir=self.tmp_dir)
+            self.assertTrue(np.allclose(aa.temps, temps))
+            self.assertTrue(np.allclose(aa.diffusivities, diffusivities))
+            self.assertEqual(aa.bootstrap_diffusivities.shape, (3, 100))
+            self.assertGreater(aa.activation_energy_std, 0)
+            self.assertGreater(aa.log10_d0_std, 0)
+            self.assertAlmostEqual(
+                aa.get_extrapolated_diffusivity(300),
+                get_extrapolated_diffusivity(temps, diffusivities, 300))
+            self.assertAlmostEqual(aa.summaries[1]["D"], diffusivities[1])
+        slope = np.polyfit(1000 / np.array(temps), np.log10(diffusivities),
+                           1)[0]
+        self.assertAlmostEqual(aa.activation_energy,
+                               -slope * 8.6173324e-5 * 1000 * np.log(10), 6)
+
+        self.assertRaises(ValueError, ArrheniusAnalyzer.from_runs,
+                          {600: runs[600][::-1]}, "Li",
+                          step_skip=d.step_skip, nboot=0,
+                          cache_dir=self.tmp_dir)
+        #The temperatures must match those of the runs.
+        self.assertRaises(ValueError, ArrheniusAnalyzer.from_runs,
+                          {700: runs[600], 800: runs[800]}, "Li",
+                          step_skip=d.step_skip, nboot=0,
+                          cache_dir=self.tmp_dir)
+
+        aa2 = ArrheniusAnalyzer.from_dict(json.loads(json.dumps(aa.to_dict)))
+        self.assertAlmostEqual(aa2.activation_energy_std,
+                               aa.activation_energy_std)
+
+    def test_get_run_data(self):
+        run_dir = os.path.join(self.tmp_dir, "run")
+        cache_dir = os.path.join(self.tmp_dir, "cache")
+        os.mkdir(run_dir)
+        os.mkdir(cache_dir)
+        xml = os.path.join(run_dir, "vasprun.xml")
+        shutil.copy(os.path.join(test_dir, "vasprun.xml.unconverged"), xml)
+        cache_file = _get_cache_file(xml, cache_dir, 2, 1)
+
+        data = _get_run_data(run_dir, 2, 1)
+        self.assertEqual(data["frac_coords"].shape, (2, 14, 3))
+        self.assertEqual(data["nionic_steps"], 5)
+        self.assertFalse(os.path.exists(cache_file))
+        #An unwritable cache only logs a warning.
+        data2 = _get_run_data(run_dir, 2, 1,
+                              cache_dir=os.path.join(self.tmp_dir, "none"))
+        self.assertTrue(np.allclose(data2["frac_coords"],
+                                    data["frac_coords"]))
+
+        _get_run_data(run_dir, 2, 1, cache_dir=cache_dir)
+        self.assertEqual(os.listdir(cache_dir),
+                         [os.path.basename(cache_file)])
+        #The cache is read once the xml is gone.
+        os.rename(xml, xml + ".bak")
+        cached = _get_run_data(xml, 2, 1, cache_dir=cache_dir)
+        self.assertEqual(set(cached.keys()), set(data.keys()))
+        for k in ["frac_coords", "lattice", "initial_frac_coords",
+                  "final_frac_coords", "temperature", "time_step"]:
+            self.assertTrue(np.allclose(cached[k], data[k]))
+        self.assertEqual(str(cached["species"]), data["species"])
+        #A modified xml invalidates the cache.
+        os.rename(xml + ".bak", xml)
+        os.utime(xml, (0, 0))
+        data = _get_run_data(xml, 2, 1, cache_dir=cache_dir)
+        self.assertEqual(data["source_mtime"], 0)
+        npz = np.load(cache_file)
+        self.assertEqual(float(npz["source_mtime"]), 0)
+        npz.close()
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -17,11 +17,14 @@ __date__ = "6/9/13"
 import unittest
 import os
 
+import numpy as np
+
 from pymatgen.analysis.molecule_matcher import MoleculeMatcher
 from pymatgen.analysis.molecule_matcher import IsomorphismMolAtomMapper
 from pymatgen.analysis.molecule_matcher import InchiMolAtomMapper
 from pymatgen.core.operations import SymmOp
 from pymatgen.core.structure import Molecule
+from pymatgen.io.babelio import BabelMolAdaptor
 import openbabel as ob
 
 
@@ -47,6 +50,16 @@ class MoleculeMatcherTest(unittest.TestCase):
         mol2 = read_mol(os.path.join(test_dir, "t4.xyz"))
         self.assertEqual('{0:7.3}'.format(mm.get_rmsd(mol1, mol2)), "0.00488")
 
+    def test_get_rmsds(self):
+        mm = MoleculeMatcher()
+        mol1 = read_mol(os.path.join(test_dir, "t3.xyz"))
+        mol2 = read_mol(os.path.join(test_dir, "t4.xyz"))
+        mol3 = read_mol(os.path.join(test_dir, "thiane1.sdf"))
+        rmsds = mm.get_rmsds(mol1, [mol2, mol1, mol3])
+        self.assertAlmostEqual(rmsds[0], mm.get_rmsd(mol1, mol2))
+        self.assertAlmostEqual(rmsds[1], 0)
+        self.assertEqual(rmsds[2], float("inf"))
+
     def test_group_molecules(self):
         mm = MoleculeMatcher(tolerance=0.001)
         with open(os.path.join(test_dir, "mol_list.txt")) as f:
@@ -60,6 +73,26 @@ class MoleculeMatcherTest(unittest.TestCase):
             grouped_text = f.read().strip()
         self.assertEqual(str(filename_groups), grouped_text)
 
+        mol_groups = mm.group_molecules(mol_list, ncpus=2)
+        filename_groups = [[filename_list[mol_list.index(m)] for m in g]
+                           for g in mol_groups]
+        self.assertEqual(str(filename_groups), grouped_text)
+
+    def test_may_fit(self):
+        mm = MoleculeMatcher(tolerance=0.01)
+        mol1 = read_mol(os.path.join(test_dir, "t3.xyz"))
+        mol2 = read_mol(os.path.join(test_dir, "t4.xyz"))
+        inv1 = mm._get_invariants(BabelMolAdaptor(mol1).openbabel_mol)
+        inv2 = mm._get_invariants(BabelMolAdaptor(mol2).openbabel_mol)
+        self.assertTrue(mm._may_fit(inv1, inv2))
+        op = SymmOp.from_origin_axis_angle([1, 2, 3], [1, 1, 0], 30)
+        mol3 = Molecule(mol1.species, op.operate_multi(mol1.cart_coords))
+        inv3 = mm._get_invariants(BabelMolAdaptor(mol3).openbabel_mol)
+        self.assertTrue(np.allclose(inv1[0], inv3[0]))
+        self.assertTrue(np.allclose(inv1[1], inv3[1]))
+        mm = MoleculeMatcher(tolerance=0.0001)
+        self.assertFalse(mm._may_fit(inv1, inv2))
+
     def test_to_and_from_dict(self):
         mm = MoleculeMatcher(tolerance=0.5,
                              mapper=InchiMolAtomMapper(angle_tolerance=50.0))
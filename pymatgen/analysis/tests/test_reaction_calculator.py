@@ -1,8 +1,11 @@
 import unittest
 
+import numpy as np
+
 from pymatgen import Composition
 from pymatgen.analysis.reaction_calculator import Reaction, BalancedReaction,\
-    ReactionError, ComputedReaction
+    ReactionError, ComputedReaction, balance_reactions, \
+    get_composition_matrix
 from pymatgen.entries.computed_entries import ComputedEntry
 
 
@@ -154,6 +157,43 @@ class ReactionTest(unittest.TestCase):
         self.assertEquals(rxn.normalized_repr, "4 Fe + 3 O2 -> 2 Fe2O3")
 
 
+class FuncTest(unittest.TestCase):
+
+    def test_balance_reactions(self):
+        comps = [Composition(f) for f in ["MgO", "Al2O3", "MgAl2O4", "Fe",
+                                          "O2", "Fe2O3", "Li", "Li2O",
+                                          "Li2O2"]]
+        matrix, elements = get_composition_matrix(comps)
+        self.assertEqual([el.symbol for el in elements],
+                         ["Li", "Mg", "Al", "Fe", "O"])
+        self.assertEqual(matrix[2].tolist(), [0, 1, 2, 0, 4])
+        energies = np.linspace(-1, -0.2, len(comps))
+        reactions = [([0, 1], [2]), ([3, 4], [5]), ([5], [3, 4]),
+                     ([6, 4], [7, 8]), ([0], [3]), ([6, 7], [4, 0])]
+        coeffs, rxn_energies, balanced = balance_reactions(matrix, reactions,
+                                                           energies)
+        self.assertEqual(coeffs.shape, (6, 4))
+        self.assertEqual(balanced.tolist(),
+                         [True, True, True, False, False, True])
+        for i in (0, 1, 2):
+            rcts, prods = reactions[i]
+            rxn = Reaction([comps[j] for j in rcts],
+                           [comps[j] for j in prods])
+            n = len(rcts) + len(prods)
+            self.assertTrue(np.allclose(coeffs[i, :n], rxn.coeffs))
+            self.assertTrue(np.all(coeffs[i, n:] == 0))
+            self.assertAlmostEqual(rxn_energies[i], rxn.calculate_energy(
+                {comps[j]: energies[j] for j in rcts + prods}))
+        #Li + Li2O -> O2 + MgO only balances with no MgO.
+        self.assertTrue(np.allclose(coeffs[5], [4, -2, 1, 0]))
+        self.assertTrue(np.all(np.isnan(coeffs[3])))
+        self.assertTrue(np.isnan(rxn_energies[4]))
+        coeffs2, rxn_energies2, balanced2 = balance_reactions(
+            matrix, reactions, chunk_size=1)
+        self.assertIsNone(rxn_energies2)
+        self.assertTrue(np.allclose(coeffs2[balanced], coeffs[balanced]))
+
+
 class BalancedReactionTest(unittest.TestCase):
     def test_init(self):
         rct = {Composition('K2SO4'): 3, Composition('Na2S'): 1,
@@ -3,7 +3,8 @@ import unittest
 import os
 
 from pymatgen.analysis.structure_analyzer import VoronoiCoordFinder, \
-    solid_angle, contains_peroxide, RelaxationAnalyzer, VoronoiConnectivity, oxide_type
+    solid_angle, contains_peroxide, RelaxationAnalyzer, VoronoiConnectivity, oxide_type, \
+    solid_angles
 from pymatgen.io.cifio import CifParser
 from pymatgen.io.vaspio.vasp_input import Poscar
 from pymatgen import Element
@@ -20,6 +21,8 @@ class VoronoiCoordFinderTest(unittest.TestCase):
         parser = CifParser(filepath)
         s = parser.get_structures()[0]
         self.finder = VoronoiCoordFinder(s, [Element("O")])
+        self.full_finder = VoronoiCoordFinder(s, [Element("O")],
+                                              full_tessellation=True)
 
     def test_get_voronoi_polyhedra(self):
         self.assertEqual(len(self.finder.get_voronoi_polyhedra(0).items()), 8,
@@ -33,6 +36,17 @@ class VoronoiCoordFinderTest(unittest.TestCase):
     def test_get_coordinated_sites(self):
         self.assertEqual(len(self.finder.get_coordinated_sites(0)), 8)
 
+    def test_full_tessellation(self):
+        self.assertAlmostEqual(self.full_finder.get_coordination_number(0),
+                               5.809265748999465, 7)
+        for n in [0, 4, 8, 27, -1]:
+            poly = self.finder.get_voronoi_polyhedra(n)
+            full_poly = self.full_finder.get_voronoi_polyhedra(n)
+            self.assertEqual(set(poly.keys()), set(full_poly.keys()))
+            for site, weight in poly.items():
+                self.assertAlmostEqual(full_poly[site], weight)
+        self.assertEqual(len(self.full_finder._polyhedra), 28)
+
 
 class RelaxationAnalyzerTest(unittest.TestCase):
 
@@ -85,6 +99,29 @@ class VoronoiConnectivityTest(unittest.TestCase):
         expected = np.array([-0.29158, 0.74889, 0.95684])
         self.assertTrue(np.allclose(site.frac_coords, expected))
 
+    def test_sparse_connectivity(self):
+        #Sites displaced off their symmetric positions, with reference solid
+        #angles from the dense tessellation of all images.
+        n = len(self.s)
+        s = Structure(self.s.lattice, self.s.species, self.s.frac_coords +
+                      0.01 * np.sin(np.arange(3 * n)).reshape((n, 3)))
+        vc = VoronoiConnectivity(s)
+        atomi, atomj, imagej, angles = vc.sparse_connectivity
+        self.assertEqual(len(angles), 488)
+        self.assertAlmostEqual(np.sum(angles), 351.858377202, 6)
+        angles = dict(zip(zip(atomi, atomj, imagej), angles))
+        self.assertAlmostEqual(angles[0, 1, 86], 0.0635090877562)
+        self.assertAlmostEqual(angles[0, 1, 93], 0.150603419703)
+        self.assertAlmostEqual(angles[15, 1, 52], 1.82900686)
+        self.assertAlmostEqual(angles[15, 3, 52], 0.136926900834)
+        self.assertNotIn((7, 20, 0), angles)
+        self.assertAlmostEqual(vc.max_connectivity[0, 1], 0.150603419703)
+        self.assertAlmostEqual(vc.max_connectivity[0, 12], 2.27714851)
+        connections = vc.get_connections()
+        self.assertEqual(len(connections), 380)
+        self.assertEqual(connections[0][:2], [0, 1])
+        self.assertAlmostEqual(connections[0][2], 2.944123250215954)
+
 
 class MiscFunctionTest(unittest.TestCase):
 
@@ -97,6 +134,11 @@ class MiscFunctionTest(unittest.TestCase):
                   [2.055778446743566, 4.437449313863041, 4.061046832034642]]
         self.assertAlmostEqual(solid_angle(center, coords), 1.83570965938, 7,
                                "Wrong result returned by solid_angle")
+        self.assertAlmostEqual(solid_angles([center, center],
+                                            [coords, coords[:3]])[0],
+                               1.83570965938, 7)
+        self.assertAlmostEqual(solid_angles([center], [coords[:3]])[0],
+                               solid_angle(center, coords[:3]))
 
     def test_contains_peroxide(self):
 
@@ -10,6 +10,7 @@ from .periodic_table import Element, Specie, DummySpecie, \
     get_el_sp
 from .composition import Composition
 from .structure import Structure, IStructure, Molecule, IMolecule
+from .trajectory import Trajectory
 from .bonds import CovalentBond, get_bond_length
 from .lattice import Lattice
 from .sites import Site, PeriodicSite
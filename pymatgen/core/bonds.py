@@ -19,7 +19,10 @@ import os
 import json
 import collections
 
+import numpy as np
+
 from pymatgen.core.periodic_table import get_el_sp
+from pymatgen.util.coord_utils import get_close_pairs
 
 
 def _load_bond_length_data():
@@ -98,6 +101,127 @@ class CovalentBond(object):
         return self.__repr__()
 
 
+class BondGraph(object):
+    """
+    Graph of the bonds between sites, stored in compressed sparse row (CSR)
+    form, i.e., the neighbors of site i are
+    indices[indptr[i]:indptr[i + 1]], in increasing order.
+    """
+
+    def __init__(self, num_sites, bonds):
+        """
+        Args:
+            num_sites (int): Number of sites.
+            bonds: Sequence of pairs of site indices.
+        """
+        bonds = np.sort(np.array(bonds, dtype=np.int).reshape((-1, 2)),
+                        axis=1)
+        if len(bonds):
+            #Sorted unique bonds.
+            bonds = bonds[np.lexsort((bonds[:, 1], bonds[:, 0]))]
+            bonds = bonds[np.concatenate(
+                [[True], np.any(np.diff(bonds, axis=0) != 0, axis=1)])]
+        self.num_sites = num_sites
+        self.bonds = bonds
+        rows = np.concatenate([bonds[:, 0], bonds[:, 1]])
+        cols = np.concatenate([bonds[:, 1], bonds[:, 0]])
+        order = np.lexsort((cols, rows))
+        self.indices = cols[order]
+        self.indptr = np.concatenate(
+            [[0], np.cumsum(np.bincount(rows, minlength=num_sites))])
+
+    def get_neighbors(self, i):
+        """
+        Returns the array of the indices of the sites bonded to site i.
+        """
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def get_connected_components(self):
+        """
+        Returns the connected components of the graph, e.g., the fragments
+        of a molecule, as a list of sorted lists of site indices, ordered by
+        their lowest index.
+        """
+        labels = -np.ones(self.num_sites, dtype=np.int)
+        components = []
+        for start in xrange(self.num_sites):
+            if labels[start] >= 0:
+                continue
+            labels[start] = len(components)
+            component = [start]
+            stack = [start]
+            while stack:
+                i = stack.pop()
+                for j in self.indices[self.indptr[i]:self.indptr[i + 1]]:
+                    if labels[j] < 0:
+                        labels[j] = len(components)
+                        component.append(j)
+                        stack.append(j)
+            components.append(sorted(int(i) for i in component))
+        return components
+
+    @classmethod
+    def from_max_lengths(cls, coords, types, max_lengths, strict=False):
+        """
+        Creates the graph of the pairs of sites closer than a maximum bond
+        length that depends on the types of both sites, e.g., their
+        elements. Candidate pairs are found with a spatial grid with a cell
+        size of the largest maximum bond length (see get_close_pairs), so
+        that large systems can be handled.
+
+        Args:
+            coords: Cartesian coordinates of the sites with shape (N, 3).
+            types: Integer type of each site, an index in max_lengths.
+            max_lengths: Symmetric matrix of the maximum bond lengths
+                between types.
+            strict (bool): Whether bonds must be strictly shorter than the
+                maximum lengths. Defaults to False, i.e., shorter or equal.
+
+        Returns:
+            BondGraph
+        """
+        types = np.array(types, dtype=np.int)
+        max_lengths = np.array(max_lengths, dtype=np.float64)
+        cutoff = np.max(max_lengths) if max_lengths.size else 0
+        i, j, dists = get_close_pairs(coords, cutoff)
+        lengths = max_lengths[types[i], types[j]]
+        mask = dists < lengths if strict else dists <= lengths
+        return cls(len(types), np.array([i[mask], j[mask]]).T)
+
+    @classmethod
+    def from_sites(cls, sites, tol=0.2):
+        """
+        Creates the graph of the covalent bonds between sites, as determined
+        by CovalentBond.is_bonded.
+
+        Args:
+            sites ([Site]): Sites.
+            tol (float): Relative tolerance to test. See
+                CovalentBond.is_bonded.
+
+        Returns:
+            BondGraph
+        """
+        symbols = [site.species_and_occu.keys()[0].symbol for site in sites]
+        counts = collections.Counter(symbols)
+        unique = sorted(counts.keys())
+        max_lengths = np.zeros((len(unique), len(unique)))
+        for a, sym1 in enumerate(unique):
+            for b, sym2 in enumerate(unique[a:], a):
+                if sym1 == sym2 and counts[sym1] < 2:
+                    continue
+                syms = (sym1, sym2)
+                if syms not in bond_lengths:
+                    raise ValueError("No bond data for elements {} - {}"
+                                     .format(*syms))
+                max_lengths[a, b] = max_lengths[b, a] = \
+                    (1 + tol) * max(bond_lengths[syms].values())
+        index = {sym: a for a, sym in enumerate(unique)}
+        return cls.from_max_lengths([site.coords for site in sites],
+                                    [index[sym] for sym in symbols],
+                                    max_lengths, strict=True)
+
+
 def get_bond_length(sp1, sp2, bond_order=1):
     """
     Get the bond length between two species.
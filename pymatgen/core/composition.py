@@ -19,10 +19,14 @@ import collections
 import string
 from fractions import gcd
 from itertools import chain
+
+import numpy as np
+
 from pymatgen.core.periodic_table import get_el_sp, Element
 from pymatgen.util.string_utils import formula_double_format
 from pymatgen.serializers.json_coders import MSONable
 from pymatgen.core.units import unitized
+from pymatgen.util.decorators import lru_cache
 
 
 class Composition(collections.Mapping, collections.Hashable, MSONable):
@@ -391,32 +395,9 @@ class Composition(collections.Mapping, collections.Hashable, MSONable):
             formula (str): A string formula, e.g. Fe2O3, Li3Fe2(PO4)3
 
         Returns:
-            Composition with that formula.
-        """
-        def get_sym_dict(f, factor):
-            sym_dict = collections.defaultdict(float)
-            for m in re.finditer(r"([A-Z][a-z]*)([\.\d]*)", f):
-                el = m.group(1)
-                amt = 1
-                if m.group(2).strip() != "":
-                    amt = float(m.group(2))
-                sym_dict[el] += amt * factor
-                f = f.replace(m.group(), "", 1)
-            if f.strip():
-                raise CompositionError("{} is an invalid formula!".format(f))
-            return sym_dict
-
-        m = re.search(r"\(([^\(\)]+)\)([\.\d]*)", formula)
-        if m:
-            factor = 1
-            if m.group(2) != "":
-                factor = float(m.group(2))
-            unit_sym_dict = get_sym_dict(m.group(1), factor)
-            expanded_sym = "".join(["{}{}".format(el, amt)
-                                    for el, amt in unit_sym_dict.items()])
-            expanded_formula = formula.replace(m.group(), expanded_sym)
-            return self._parse_formula(expanded_formula)
-        return get_sym_dict(formula, 1)
+            {symbol: amount} dict for that formula.
+        """
+        return dict(_parse_formula(formula))
 
     @staticmethod
     def from_formula(formula):
@@ -427,6 +408,61 @@ class Composition(collections.Mapping, collections.Hashable, MSONable):
         """
         return Composition(formula)
 
+    @staticmethod
+    def from_formulas(formulas, elements=None, as_matrix=False):
+        """
+        Bulk constructor for Compositions from a sequence of formula strings.
+        Parsed formulas are cached, so formulas that recur (e.g., in database
+        exports) are only parsed once.
+
+        Args:
+            formulas ([str]): Sequence of formula strings, e.g.,
+                ["Fe2O3", "Li3Fe2(PO4)3"].
+            elements ([Element]): Elements defining the columns of the
+                composition matrix. Only used if as_matrix is True. Defaults
+                to all elements present in the formulas, sorted by
+                electronegativity.
+            as_matrix (bool): If True, a composition matrix is returned
+                instead of a list of Compositions. No Composition objects
+                are created in that case.
+
+        Returns:
+            List of Compositions if as_matrix is False. Otherwise, a tuple of
+            (elements, matrix), where matrix is a numpy array of shape
+            (len(formulas), len(elements)) containing the amount of each
+            element in each formula.
+
+        Raises:
+            CompositionError if as_matrix is True and a formula contains an
+            element not in elements.
+        """
+        if not as_matrix:
+            return [Composition(f) for f in formulas]
+
+        parsed = [_parse_formula(f) for f in formulas]
+        sym_el = {sym: get_el_sp(sym)
+                  for sym in set(chain.from_iterable(parsed))}
+        if elements is None:
+            elements = sorted(set(sym_el.values()))
+        else:
+            elements = [get_el_sp(el) for el in elements]
+        el_col = {el: i for i, el in enumerate(elements)}
+        try:
+            sym_col = {sym: el_col[el] for sym, el in sym_el.items()}
+        except KeyError as ex:
+            raise CompositionError("{} is not in the list of elements!"
+                                   .format(ex.args[0]))
+
+        rows, cols, amts = [], [], []
+        for i, sym_amt in enumerate(parsed):
+            for sym, amt in sym_amt.items():
+                rows.append(i)
+                cols.append(sym_col[sym])
+                amts.append(amt)
+        matrix = np.zeros((len(parsed), len(elements)))
+        matrix[rows, cols] = amts
+        return elements, matrix
+
     @property
     def anonymized_formula(self):
         """
@@ -711,6 +747,53 @@ class Composition(collections.Mapping, collections.Hashable, MSONable):
                         yield match
 
 
+_formula_token = re.compile(r"\s*(?:([A-Z][a-z]*)|(\()|(\)))([\.\d]*)")
+
+
+@lru_cache(maxsize=100000)
+def _parse_formula(formula):
+    """
+    Single-pass parser for formula strings. Parentheses are handled with a
+    stack of {symbol: amount} dicts rather than by repeated expansion of the
+    formula string. Results are cached, and should not be modified.
+
+    Args:
+        formula (str): A string formula, e.g. Fe2O3, Li3Fe2(PO4)3
+
+    Returns:
+        {symbol: amount} dict for that formula.
+    """
+    stack = [(-1, collections.defaultdict(float))]
+    pos = 0
+    while pos < len(formula):
+        m = _formula_token.match(formula, pos)
+        if not m:
+            if formula[pos:].strip():
+                raise CompositionError("{} is an invalid formula!"
+                                       .format(formula))
+            break
+        sym, opening, closing, amt = m.groups()
+        if sym:
+            stack[-1][1][sym] += float(amt) if amt else 1
+        elif opening:
+            if amt:
+                raise CompositionError("{} is an invalid formula!"
+                                       .format(formula))
+            stack.append((m.end(), collections.defaultdict(float)))
+        else:
+            start, group = stack.pop()
+            if not stack or start == m.start(3):
+                raise CompositionError("{} is an invalid formula!"
+                                       .format(formula))
+            factor = float(amt) if amt else 1
+            for k, v in group.items():
+                stack[-1][1][k] += v * factor
+        pos = m.end()
+    if len(stack) > 1:
+        raise CompositionError("{} is an invalid formula!".format(formula))
+    return dict(stack[0][1])
+
+
 def reduce_formula(sym_amt):
     """
     Helper method to reduce a sym_amt dict to a reduced formula and factor.
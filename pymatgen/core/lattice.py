@@ -58,27 +58,55 @@ class Lattice(MSONable):
             angles[i] = dot(m[j], m[k]) / (lengths[j] * lengths[k])
 
         angles = np.arccos(angles) * 180. / pi
+        # Lattice is immutable. The underlying arrays are made read-only so
+        # that they can be handed out without copying, and all derived
+        # quantities can be safely memoized.
+        for arr in (m, lengths, angles):
+            arr.setflags(write=False)
         self._angles = angles
         self._lengths = lengths
         self._matrix = m
-        # The inverse matrix is lazily generated for efficiency.
+        self._lengths_and_angles = (tuple(lengths), tuple(angles))
+        # Derived quantities are lazily generated for efficiency.
         self._inv_matrix = None
+        self._metric_tensor = None
+        self._niggli_lattices = {}
+        self._lll_lattices = {}
+        self._wigner_seitz_cell = None
 
     def copy(self):
         """Deep copy of self."""
-        return self.__class__(self.matrix.copy())
+        return self.__class__(self._matrix.copy())
 
     @property
     def matrix(self):
-        """Copy of matrix representing the Lattice"""
-        return np.copy(self._matrix)
+        """
+        Matrix representing the Lattice. This is a read-only view of the
+        internal array, i.e., no copy is made. Use np.array(lattice.matrix)
+        to obtain a modifiable copy.
+        """
+        return self._matrix
 
     @property
     def inv_matrix(self):
+        """
+        Inverse of the lattice matrix (read-only).
+        """
         if self._inv_matrix is None:
             self._inv_matrix = inv(self._matrix)
+            self._inv_matrix.setflags(write=False)
         return self._inv_matrix
 
+    @property
+    def metric_tensor(self):
+        """
+        The metric tensor G = M.M^T of the lattice (read-only).
+        """
+        if self._metric_tensor is None:
+            self._metric_tensor = dot(self._matrix, self._matrix.T)
+            self._metric_tensor.setflags(write=False)
+        return self._metric_tensor
+
     def get_cartesian_coords(self, fractional_coords):
         """
         Returns the cartesian coordinates given fractional coordinates.
@@ -255,7 +283,7 @@ class Lattice(MSONable):
         """
         Returns the angles (alpha, beta, gamma) of the lattice.
         """
-        return tuple(self._angles)
+        return self._lengths_and_angles[1]
 
     @property
     def a(self):
@@ -283,7 +311,7 @@ class Lattice(MSONable):
         """
         Lengths of the lattice vectors, i.e. (a, b, c)
         """
-        return tuple(self._lengths)
+        return self._lengths_and_angles[0]
 
     @property
     def alpha(self):
@@ -319,7 +347,7 @@ class Lattice(MSONable):
         """
         Returns (lattice lengths, lattice angles).
         """
-        return tuple(self._lengths), tuple(self._angles)
+        return self._lengths_and_angles
 
     @property
     def reciprocal_lattice(self):
@@ -381,6 +409,59 @@ class Lattice(MSONable):
                 "gamma": float(self.gamma),
                 "volume": float(self.volume)}
 
+    def find_all_mappings(self, other_lattice, ltol=1e-5, atol=1):
+        """
+        Finds all mappings between current lattice and another lattice.
+        Candidate lattice vectors are matched by length, and the angles
+        between all candidate pairs are computed and screened as matrices.
+        Mappings are generated lazily, in the same order as they would be
+        found by a brute force search over all candidate triples.
+
+        Args:
+            other_lattice (Lattice): Another lattice that is equivalent to
+                this one.
+            ltol (float): Tolerance for matching lengths. Defaults to 1e-5.
+            atol (float): Tolerance for matching angles. Defaults to 1.
+
+        Yields:
+            (aligned_lattice, rotation_matrix, scale_matrix) for each
+            mapping found. See find_mapping for the definitions.
+        """
+        (lengths, angles) = other_lattice.lengths_and_angles
+        (alpha, beta, gamma) = angles
+
+        points = get_points_in_sphere_pbc(self, [[0, 0, 0]], [0, 0, 0],
+                                          max(lengths) + 0.1)
+        if len(points) == 0:
+            return
+        frac = np.array(points[:, 0].tolist())
+        dist = points[:, 1].astype(float)
+        cart = self.get_cartesian_coords(frac)
+        inds = [np.where(np.abs(dist - l) < ltol)[0] for l in lengths]
+        (c_a, c_b, c_c) = [cart[i] for i in inds]
+        (l_a, l_b, l_c) = [dist[i] for i in inds]
+
+        def get_angles(v1, l1, v2, l2):
+            x = dot(v1, v2.T) / l1[:, None] / l2[None, :]
+            return np.arccos(np.clip(x, -1, 1)) * 180. / pi
+
+        gamma_mask = np.abs(get_angles(c_a, l_a, c_b, l_b) - gamma) < atol
+        beta_mask = np.abs(get_angles(c_a, l_a, c_c, l_c) - beta) < atol
+        alpha_mask = np.abs(get_angles(c_b, l_b, c_c, l_c) - alpha) < atol
+
+        other_matrix = other_lattice.matrix
+        for i in xrange(len(c_a)):
+            j_inds = np.where(gamma_mask[i])[0]
+            if len(j_inds) == 0:
+                continue
+            valid = alpha_mask[j_inds] & beta_mask[i][None, :]
+            for j, k in np.argwhere(valid):
+                aligned_m = np.array([c_a[i], c_b[j_inds[j]], c_c[k]])
+                rotation_matrix = np.linalg.solve(other_matrix.T,
+                                                  aligned_m.T).T
+                scale_matrix = np.linalg.solve(aligned_m.T, self._matrix.T).T
+                yield Lattice(aligned_m), rotation_matrix, scale_matrix
+
     def find_mapping(self, other_lattice, ltol=1e-5, atol=1):
         """
         Finds a mapping between current lattice and another lattice. There
@@ -408,35 +489,8 @@ class Lattice(MSONable):
 
             None is returned if no matches are found.
         """
-        (lengths, angles) = other_lattice.lengths_and_angles
-        (alpha, beta, gamma) = angles
-
-        points = get_points_in_sphere_pbc(self, [[0, 0, 0]], [0, 0, 0],
-                                          max(lengths) + 0.1)
-        all_frac = [p[0] for p in points]
-        dist = [p[1] for p in points]
-        cart = self.get_cartesian_coords(all_frac)
-        data = zip(cart, dist)
-        candidates = [filter(lambda d: abs(d[1] - l) < ltol, data)
-                      for l in lengths]
-
-        def get_angle(v1, v2):
-            x = dot(v1[0], v2[0]) / v1[1] / v2[1]
-            x = min(1, x)
-            x = max(-1, x)
-            angle = np.arccos(x) * 180. / pi
-            return angle
-
-        for m1, m2, m3 in itertools.product(*candidates):
-            if abs(get_angle(m1, m2) - gamma) < atol and\
-                    abs(get_angle(m2, m3) - alpha) < atol and\
-                    abs(get_angle(m1, m3) - beta) < atol:
-                aligned_m = np.array([m1[0], m2[0], m3[0]])
-                rotation_matrix = np.linalg.solve(other_lattice.matrix.T,
-                                                  aligned_m.T).T
-                scale_matrix = np.linalg.solve(aligned_m.T, self._matrix.T).T
-                return Lattice(aligned_m), rotation_matrix, scale_matrix
-
+        for x in self.find_all_mappings(other_lattice, ltol, atol):
+            return x
         return None
 
     def get_most_compact_basis_on_lattice(self):
@@ -509,9 +563,18 @@ class Lattice(MSONable):
         Returns:
             Reduced lattice.
         """
+        if delta not in self._lll_lattices:
+            self._lll_lattices[delta] = self._calculate_lll(delta)
+        return self._lll_lattices[delta]
+
+    def _calculate_lll(self, delta=0.75):
+        """
+        Performs a Lenstra-Lenstra-Lovasz lattice basis reduction. See
+        get_lll_reduced_lattice.
+        """
         # Transpose the lattice matrix first so that basis vectors are columns.
         # Makes life easier.
-        a = self._matrix.T
+        a = self._matrix.T.copy()
 
         b = np.zeros((3, 3))  # Vectors after the Gram-Schmidt process
         u = np.zeros((3, 3))  # Gram-Schmidt coeffieicnts
@@ -583,16 +646,20 @@ class Lattice(MSONable):
         Returns:
             Niggli-reduced lattice.
         """
+        if tol not in self._niggli_lattices:
+            self._niggli_lattices[tol] = self._calculate_niggli(tol)
+        return self._niggli_lattices[tol]
+
+    def _calculate_niggli(self, tol=1e-5):
+        """
+        Calculates the Niggli reduced lattice. See get_niggli_reduced_lattice.
+        """
         a = self._matrix[0]
         b = self._matrix[1]
         c = self._matrix[2]
         e = tol * self.volume ** (1 / 3)
 
-        #Define metric tensor
-        G = [[dot(a, a), dot(a, b), dot(a, c)],
-             [dot(a, b), dot(b, b), dot(b, c)],
-             [dot(a, c), dot(b, c), dot(c, c)]]
-        G = np.array(G)
+        G = self.metric_tensor
 
         #This sets an upper limit on the number of iterations.
         for count in xrange(100):
@@ -723,10 +790,15 @@ class Lattice(MSONable):
             Wigner Seitz cell. For instance, a list of four coordinates will
             represent a square facet.
         """
+        if self._wigner_seitz_cell is None:
+            self._wigner_seitz_cell = self._calculate_wigner_seitz_cell()
+        return [[list(v) for v in facet] for facet in self._wigner_seitz_cell]
+
+    def _calculate_wigner_seitz_cell(self):
         from pyhull.voronoi import VoronoiTess
-        vec1 = self.matrix[0]
-        vec2 = self.matrix[1]
-        vec3 = self.matrix[2]
+        vec1 = self._matrix[0]
+        vec2 = self._matrix[1]
+        vec3 = self._matrix[2]
 
         list_k_points = []
         for i, j, k in itertools.product([-1, 0, 1], [-1, 0, 1], [-1, 0, 1]):
@@ -14,13 +14,15 @@ __email__ = "shyuep@gmail.com"
 __date__ = "Jul 17, 2012"
 
 import collections
+import math
+
 import numpy as np
 
 from pymatgen.core.lattice import Lattice
 from pymatgen.core.periodic_table import Element, Specie, DummySpecie,\
     get_el_sp
 from pymatgen.serializers.json_coders import MSONable
-from pymatgen.util.coord_utils import pbc_diff
+from pymatgen.util.coord_utils import pbc_diff, get_min_image_data
 from pymatgen.core.composition import Composition
 
 
@@ -418,29 +420,16 @@ class PeriodicSite(Site, MSONable):
             of the other site for which the distance applies.
         """
         if jimage is None:
-            #The following code is heavily vectorized to maximize speed.
-            #Get the image adjustment necessary to bring coords to unit_cell.
-            adj1 = np.floor(self._fcoords)
-            adj2 = np.floor(fcoords)
-            #Shift coords to unitcell
-            coord1 = self._fcoords - adj1
-            coord2 = fcoords - adj2
-            # Generate set of images required for testing.
-            # This is a cheat to create an 8x3 array of all length 3
-            # combinations of 0,1
-            test_set = np.unpackbits(np.array([5, 57, 119],
-                                              dtype=np.uint8)).reshape(8, 3)
-            images = np.copysign(test_set, coord1 - coord2)
-            # Create tiled cartesian coords for computing distances.
-            vec = np.tile(coord2 - coord1, (8, 1)) + images
-            vec = self._lattice.get_cartesian_coords(vec)
-            # Compute distances manually.
-            dist = np.sqrt(np.sum(vec ** 2, 1)).tolist()
-            # Return the minimum distance and the adjusted image corresponding
-            # to the min distance.
-            mindist = min(dist)
-            ind = dist.index(mindist)
-            return mindist, adj1 - adj2 + images[ind]
+            #Exact minimum image search, using the image set precomputed
+            #for the lattice. See pymatgen.util.coord_utils.
+            (matrix, transform, inv_transform, images, cart_images) = \
+                get_min_image_data(self._lattice)
+            fdiff = np.dot(np.subtract(fcoords, self._fcoords), inv_transform)
+            shift = -np.round(fdiff)
+            vecs = np.dot(fdiff + shift, matrix) + cart_images
+            d_2 = np.sum(vecs ** 2, axis=1)
+            ind = np.argmin(d_2)
+            return math.sqrt(d_2[ind]), np.dot(shift + images[ind], transform)
 
         mapped_vec = self._lattice.get_cartesian_coords(jimage + fcoords
                                                         - self._fcoords)
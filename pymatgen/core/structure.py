@@ -32,7 +32,7 @@ from pymatgen.core.lattice import Lattice
 from pymatgen.core.periodic_table import Element, Specie, get_el_sp
 from pymatgen.serializers.json_coders import MSONable
 from pymatgen.core.sites import Site, PeriodicSite
-from pymatgen.core.bonds import CovalentBond, get_bond_length
+from pymatgen.core.bonds import CovalentBond, BondGraph, get_bond_length
 from pymatgen.core.composition import Composition
 from pymatgen.util.coord_utils import get_points_in_sphere_pbc, get_angle, \
     pbc_all_distances, all_distances
@@ -838,7 +838,7 @@ class IStructure(SiteCollection, MSONable):
         for v, repl_pos in itertools.product(possible_vectors, xrange(3)):
             #Try combinations of new lattice vectors with existing lattice
             #vectors.
-            latt = self._lattice.matrix
+            latt = self._lattice.matrix.copy()
             latt[repl_pos] = v
 
             #Exclude coplanar lattices from consideration.
@@ -1146,36 +1146,49 @@ class IMolecule(SiteCollection, MSONable):
             Two Molecule objects representing the two clusters formed from
             breaking the bond.
         """
-        sites = self._sites
-        clusters = [[sites[ind1]], [sites[ind2]]]
+        graph = self.get_bond_graph(tol=tol)
+        clusters = [[ind1], [ind2]]
+        members = [set([ind1]), set([ind2])]
 
-        sites = [site for i, site in enumerate(sites) if i not in (ind1, ind2)]
-
-        def belongs_to_cluster(site, cluster):
-            for test_site in cluster:
-                if CovalentBond.is_bonded(site, test_site, tol=tol):
-                    return True
-            return False
+        sites = [i for i in range(len(self)) if i not in (ind1, ind2)]
 
         while len(sites) > 0:
             unmatched = []
-            for site in sites:
+            for i in sites:
                 found = False
-                for cluster in clusters:
-                    if belongs_to_cluster(site, cluster):
-                        cluster.append(site)
+                neighbors = graph.get_neighbors(i)
+                for cluster, cluster_members in zip(clusters, members):
+                    if any(j in cluster_members for j in neighbors):
+                        cluster.append(i)
+                        cluster_members.add(i)
                         found = True
                         break
                 if not found:
-                    unmatched.append(site)
+                    unmatched.append(i)
 
             if len(unmatched) == len(sites):
                 raise ValueError("Not all sites are matched!")
             sites = unmatched
 
-        return (self.__class__.from_sites(cluster)
+        return (self.__class__.from_sites([self._sites[i] for i in cluster])
                 for cluster in clusters)
 
+    def get_bond_graph(self, tol=0.2):
+        """
+        Determines the graph of the covalent bonds in a molecule. Only the
+        sites within the longest possible bond length of each other are
+        compared, so that large molecules and clusters can be handled.
+
+        Args:
+            tol (float): The tol to determine bonds in a structure. See
+                CovalentBond.is_bonded.
+
+        Returns:
+            BondGraph, which gives, e.g., the fragments of the molecule with
+            get_connected_components.
+        """
+        return BondGraph.from_sites(self._sites, tol=tol)
+
     def get_covalent_bonds(self, tol=0.2):
         """
         Determines the covalent bonds in a molecule.
@@ -1187,11 +1200,8 @@ class IMolecule(SiteCollection, MSONable):
         Returns:
             List of bonds
         """
-        bonds = []
-        for site1, site2 in itertools.combinations(self._sites, 2):
-            if CovalentBond.is_bonded(site1, site2, tol):
-                bonds.append(CovalentBond(site1, site2))
-        return bonds
+        return [CovalentBond(self._sites[i], self._sites[j])
+                for i, j in self.get_bond_graph(tol=tol).bonds]
 
     def __eq__(self, other):
         if other is None:
@@ -15,7 +15,7 @@ __date__ = "Jul 26, 2012"
 
 import unittest
 
-from pymatgen.core.bonds import CovalentBond, get_bond_length
+from pymatgen.core.bonds import CovalentBond, BondGraph, get_bond_length
 from pymatgen.core.sites import Site
 
 
@@ -40,6 +40,39 @@ class CovalentBondTest(unittest.TestCase):
         self.assertIsNotNone(CovalentBond(site1, site2))
 
 
+class BondGraphTest(unittest.TestCase):
+
+    def test_init(self):
+        graph = BondGraph(5, [[3, 1], [0, 1], [1, 3], [4, 2]])
+        self.assertEqual(graph.bonds.tolist(), [[0, 1], [1, 3], [2, 4]])
+        self.assertEqual(graph.indptr.tolist(), [0, 1, 3, 4, 5, 6])
+        self.assertEqual(graph.indices.tolist(), [1, 0, 3, 4, 1, 2])
+        self.assertEqual(graph.get_neighbors(1).tolist(), [0, 3])
+        self.assertEqual(graph.get_connected_components(),
+                         [[0, 1, 3], [2, 4]])
+        self.assertEqual(BondGraph(2, []).get_connected_components(),
+                         [[0], [1]])
+
+    def test_from_sites(self):
+        sites = [Site("C", [0, 0, 0]), Site("H", [0, 0, 1]),
+                 Site("H", [0, 0, -1.5]), Site("C", [0, 1.5, 0]),
+                 Site("O", [5, 5, 5])]
+        graph = BondGraph.from_sites(sites)
+        self.assertEqual(graph.bonds.tolist(), [[0, 1], [0, 3]])
+        self.assertEqual(graph.get_connected_components(),
+                         [[0, 1, 3], [2], [4]])
+        graph = BondGraph.from_max_lengths([site.coords for site in sites],
+                                           [0, 1, 1, 0, 0],
+                                           [[1.5, 1], [1, 0]])
+        self.assertEqual(graph.bonds.tolist(), [[0, 1], [0, 3]])
+        graph = BondGraph.from_max_lengths([site.coords for site in sites],
+                                           [0, 1, 1, 0, 0],
+                                           [[1.5, 1], [1, 0]], strict=True)
+        self.assertEqual(graph.bonds.tolist(), [])
+        sites.append(Site("Cl", [10, 10, 10]))
+        self.assertRaises(ValueError, BondGraph.from_sites, sites)
+
+
 class FuncTest(unittest.TestCase):
 
     def test_get_bond_length(self):
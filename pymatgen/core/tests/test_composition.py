@@ -92,6 +92,31 @@ class CompositionTest(unittest.TestCase):
         self.assertRaises(CompositionError, Composition.from_formula,
                           "(co2)(po4)2")
 
+    def test_parse_formula(self):
+        self.assertEqual(Composition("Ca(OH)2").formula, "Ca1 H2 O2")
+        self.assertEqual(Composition("K4(Fe(CN)6)").formula, "K4 Fe1 C6 N6")
+        self.assertEqual(Composition(" Li2 O ").formula, "Li2 O1")
+        for f in ["()", "(Li", "Li)", "(2Li)", "Li 2", "2Li", "(PO4) 3"]:
+            self.assertRaises(CompositionError, Composition, f)
+
+    def test_from_formulas(self):
+        formulas = ["Li3Fe2(PO4)3", "Fe2O3", "Li3Fe2(PO4)3"]
+        comps = Composition.from_formulas(formulas)
+        self.assertEqual(comps, [Composition(f) for f in formulas])
+        els, m = Composition.from_formulas(formulas, as_matrix=True)
+        self.assertEqual(els, [Element("Li"), Element("Fe"), Element("P"),
+                               Element("O")])
+        self.assertEqual(m.tolist(), [[3, 2, 3, 12], [0, 2, 0, 3],
+                                      [3, 2, 3, 12]])
+        els, m = Composition.from_formulas(formulas, elements=["O", "Fe",
+                                                               "P", "Li",
+                                                               "Mn"],
+                                           as_matrix=True)
+        self.assertEqual(m.tolist(), [[12, 2, 3, 3, 0], [3, 2, 0, 0, 0],
+                                      [12, 2, 3, 3, 0]])
+        self.assertRaises(CompositionError, Composition.from_formulas,
+                          formulas, elements=["Fe", "O"], as_matrix=True)
+
     def test_mixed_valence(self):
         comp = Composition({"Fe2+": 2, "Fe3+": 4, "Li+": 8})
         self.assertEqual(comp.reduced_formula, "Li4Fe3")
@@ -42,6 +42,26 @@ class LatticeTestCase(PymatgenTest):
         self.assertTrue(cubic_copy == self.cubic)
         self.assertFalse(cubic_copy._matrix is self.cubic._matrix)
 
+    def test_immutability(self):
+        m = self.monoclinic.matrix
+        self.assertIs(m, self.monoclinic.matrix)
+        self.assertRaises(ValueError, m.__setitem__, (0, 0), 1)
+        self.assertRaises(ValueError, self.monoclinic.inv_matrix.__setitem__,
+                          (0, 0), 1)
+        self.assertIs(self.monoclinic.reciprocal_lattice,
+                      self.monoclinic.reciprocal_lattice)
+        self.assertIs(self.monoclinic.get_niggli_reduced_lattice(),
+                      self.monoclinic.get_niggli_reduced_lattice())
+        self.assertIs(self.monoclinic.get_lll_reduced_lattice(),
+                      self.monoclinic.get_lll_reduced_lattice())
+
+    def test_metric_tensor(self):
+        for lattice in self.families.values():
+            m = lattice.matrix
+            self.assertArrayAlmostEqual(lattice.metric_tensor, np.dot(m, m.T))
+        self.assertArrayAlmostEqual(self.tetragonal.metric_tensor,
+                                    np.diag([100, 100, 400]))
+
     def test_get_cartesian_or_frac_coord(self):
         coord = self.lattice.get_cartesian_coords([0.15, 0.3, 0.4])
         self.assertArrayAlmostEqual(coord, [1.5, 3., 4.])
@@ -202,6 +222,28 @@ class LatticeTestCase(PymatgenTest):
         self.assertTrue(np.allclose(scale2, scale) or
                         np.allclose(scale2, -scale))
 
+    def test_find_all_mappings(self):
+        m = np.array([[0.1, 0.2, 0.3], [-0.1, 0.2, 0.7], [0.6, 0.9, 0.2]])
+        latt = Lattice(m)
+
+        op = SymmOp.from_origin_axis_angle([0, 0, 0], [2, 3, 3], 35)
+        rot = op.rotation_matrix
+        scale = np.array([[1, 1, 0], [0, 1, 0], [0, 0, 1]])
+
+        latt2 = Lattice(np.dot(rot, np.dot(scale, m).T).T)
+        for (aligned_out, rot_out, scale_out) in latt.find_all_mappings(latt2):
+            self.assertArrayAlmostEqual(np.dot(rot_out, latt2.matrix),
+                                        aligned_out.matrix, 5)
+            self.assertArrayAlmostEqual(np.dot(scale_out, aligned_out.matrix),
+                                        latt.matrix)
+            self.assertArrayAlmostEqual(aligned_out.lengths_and_angles,
+                                        latt2.lengths_and_angles)
+
+        # Cubic lattices have 48 equivalent choices of basis.
+        cubic = Lattice.cubic(3)
+        self.assertEqual(len(list(cubic.find_all_mappings(cubic))), 48)
+        self.assertIsNone(cubic.find_mapping(Lattice.cubic(4)))
+
     def test_to_from_dict(self):
         d = self.tetragonal.to_dict
         t = Lattice.from_dict(d)
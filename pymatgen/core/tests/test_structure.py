@@ -9,6 +9,8 @@ from pymatgen.core.structure import IStructure, Structure, IMolecule, \
 from pymatgen.core.lattice import Lattice
 import random
 
+import numpy as np
+
 
 class IStructureTest(PymatgenTest):
 
@@ -504,6 +506,20 @@ class IMoleculeTest(PymatgenTest):
     def test_get_covalent_bonds(self):
         self.assertEqual(len(self.mol.get_covalent_bonds()), 4)
 
+    def test_get_bond_graph(self):
+        graph = self.mol.get_bond_graph()
+        self.assertEqual(graph.bonds.tolist(), [[0, 1], [0, 2], [0, 3],
+                                                [0, 4]])
+        self.assertEqual(graph.get_neighbors(0).tolist(), [1, 2, 3, 4])
+        self.assertEqual(graph.get_connected_components(), [[0, 1, 2, 3, 4]])
+        #Two methane molecules far apart.
+        coords = np.concatenate([self.mol.cart_coords,
+                                 self.mol.cart_coords + 5])
+        mol = Molecule(self.mol.species * 2, coords)
+        self.assertEqual(mol.get_bond_graph().get_connected_components(),
+                         [[0, 1, 2, 3, 4], [5, 6, 7, 8, 9]])
+        self.assertEqual(len(mol.get_covalent_bonds()), 8)
+
     def test_properties(self):
         self.assertEqual(len(self.mol), 5)
         self.assertTrue(self.mol.is_ordered)
@@ -0,0 +1,92 @@
+#!/usr/bin/python
+
+from __future__ import division
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from pymatgen.core.trajectory import Trajectory
+from pymatgen.core.structure import Structure
+from pymatgen.core.lattice import Lattice
+from pymatgen.core.periodic_table import Specie
+from pymatgen.util.testing import PymatgenTest
+
+
+class TrajectoryTest(PymatgenTest):
+
+    def setUp(self):
+        lattice = Lattice.cubic(4)
+        self.s = Structure(lattice, [Specie("Li", 1), Specie("O", -2)],
+                           [[0, 0, 0], [0.5, 0.5, 0.5]],
+                           site_properties={"magmom": [0, 1]})
+        #Li hops across the boundary of the cell.
+        fcoords = [[[0.9, 0, 0], [0.5, 0.5, 0.5]],
+                   [[0.95, 0, 0], [0.5, 0.5, 0.5]],
+                   [[0.02, 0, 0], [0.5, 0.51, 0.5]],
+                   [[0.1, 0, 0], [0.5, 0.5, 0.5]]]
+        self.structures = [Structure(lattice, self.s.species, f,
+                                     site_properties={"magmom": [0, 1]})
+                           for f in fcoords]
+        self.traj = Trajectory.from_structures(self.structures)
+
+    def test_sequence(self):
+        self.assertEqual(len(self.traj), 4)
+        self.assertEqual(self.traj.num_sites, 2)
+        self.assertTrue(self.traj.constant_lattice)
+        for s1, s2 in zip(self.traj, self.structures):
+            self.assertEqual(s1, s2)
+        self.assertEqual(self.traj[-1], self.structures[-1])
+        self.assertEqual(self.traj[2].site_properties["magmom"], [0, 1])
+        sliced = self.traj[1::2]
+        self.assertIsInstance(sliced, Trajectory)
+        self.assertEqual(len(sliced), 2)
+        self.assertEqual(sliced[1], self.structures[3])
+        self.assertEqual(self.traj.lattice_matrices.shape, (4, 3, 3))
+
+    def test_unwrap(self):
+        unwrapped = self.traj.get_unwrapped_frac_coords()
+        self.assertArrayAlmostEqual(unwrapped[:, 0, 0],
+                                    [0.9, 0.95, 1.02, 1.1])
+        self.assertArrayAlmostEqual(self.traj.unwrap().frac_coords,
+                                    unwrapped)
+        disp = self.traj.get_displacements()
+        self.assertEqual(disp.shape, (2, 4, 3))
+        self.assertArrayAlmostEqual(disp[0, :, 0], [0, 0.2, 0.48, 0.8])
+        self.assertArrayAlmostEqual(disp[1, 2], [0, 0.04, 0])
+
+    def test_lattices(self):
+        structures = [s.copy() for s in self.structures]
+        structures[1].modify_lattice(Lattice.cubic(4.1))
+        traj = Trajectory.from_structures(structures, constant_lattice=False)
+        self.assertFalse(traj.constant_lattice)
+        self.assertAlmostEqual(traj[1].lattice.a, 4.1)
+        self.assertAlmostEqual(traj[1:].lattice.a, 4.1)
+        self.assertAlmostEqual(traj[2].lattice.a, 4)
+        self.assertRaises(ValueError, Trajectory, traj.lattice_matrices[1:],
+                          traj.species, traj.frac_coords)
+
+    def test_serialization(self):
+        traj = Trajectory.from_structures(self.structures, dtype=np.float32)
+        self.assertEqual(traj.frac_coords.dtype, np.float32)
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmp_dir, "traj.npz")
+            traj.to_npz(filename)
+            traj2 = Trajectory.from_npz(filename)
+        finally:
+            shutil.rmtree(tmp_dir)
+        self.assertEqual(traj2.frac_coords.dtype, np.float32)
+        self.assertArrayAlmostEqual(traj2.frac_coords, traj.frac_coords)
+        self.assertEqual(traj2[0].composition.reduced_formula, "Li2O2")
+        self.assertEqual(traj2[0][0].specie, Specie("Li", 1))
+        self.assertEqual(traj2[0].site_properties["magmom"], [0, 1])
+        traj3 = Trajectory.from_dict(self.traj.to_dict)
+        self.assertEqual(traj3[2], self.structures[2])
+
+
+if __name__ == '__main__':
+    import unittest
+    unittest.main()
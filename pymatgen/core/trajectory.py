@@ -0,0 +1,279 @@
+#!/usr/bin/env python
+
+"""
+This module provides a class representing a trajectory, i.e., a sequence of
+structures with the same sites, such as the ionic steps of a molecular
+dynamics run, in a compact array form.
+"""
+
+from __future__ import division
+
+import collections
+import json
+
+import numpy as np
+
+from pymatgen.core.lattice import Lattice
+from pymatgen.core.composition import Composition
+from pymatgen.core.structure import Structure
+from pymatgen.serializers.json_coders import MSONable
+
+
+class Trajectory(collections.Sequence, MSONable):
+    """
+    A sequence of frames of a structure with fixed sites, stored as a single
+    (frames, sites, 3) array of fractional coordinates together with either
+    one lattice for all frames or one lattice per frame. Structures are only
+    created on access, e.g., trajectory[10] returns the Structure of the
+    11th frame, while slicing, e.g., trajectory[::10], returns a Trajectory
+    sharing the coordinates of this one.
+
+    Args:
+        lattice: The lattice of all frames, either as a Lattice or a 3x3
+            matrix, or an array of shape (frames, 3, 3) of the lattice
+            matrices of each frame.
+        species: List of species on each site. Can take the same forms as
+            the species of a Structure.
+        frac_coords: Array of shape (frames, sites, 3) of the fractional
+            coordinates of the sites in each frame. Floating point arrays
+            are stored as is, i.e., a float32 array can be used to halve the
+            memory of long trajectories.
+        site_properties (dict): Properties associated with the sites as a
+            dict of sequences, e.g., {"magmom":[5,5,5,5]}. The sequences
+            have to be the same length as the number of sites. The
+            properties are the same in all frames.
+    """
+
+    def __init__(self, lattice, species, frac_coords, site_properties=None):
+        frac_coords = np.asarray(frac_coords)
+        if not np.issubdtype(frac_coords.dtype, np.floating):
+            frac_coords = frac_coords.astype(np.double)
+        if frac_coords.ndim != 3 or frac_coords.shape[2] != 3:
+            raise ValueError("frac_coords must have shape (frames, sites, 3)")
+        if frac_coords.shape[1] != len(species):
+            raise ValueError("Number of species does not match the number "
+                             "of sites!")
+        matrix = lattice.matrix if isinstance(lattice, Lattice) \
+            else np.array(lattice, dtype=np.double)
+        if matrix.ndim == 3:
+            if len(matrix) != len(frac_coords):
+                raise ValueError("Number of lattices does not match the "
+                                 "number of frames!")
+            self._lattices = matrix
+            self._lattice = Lattice(matrix[0]) if len(matrix) else None
+        else:
+            self._lattices = None
+            self._lattice = lattice if isinstance(lattice, Lattice) \
+                else Lattice(matrix)
+        self._species = [Composition(sp) if isinstance(sp, dict) else sp
+                         for sp in species]
+        self._frac_coords = frac_coords
+        self._site_properties = dict(site_properties) \
+            if site_properties else {}
+
+    @property
+    def frac_coords(self):
+        """
+        Array of shape (frames, sites, 3) of the fractional coordinates.
+        """
+        return self._frac_coords
+
+    @property
+    def lattice(self):
+        """
+        Lattice of the first frame, which is the lattice of all frames if
+        constant_lattice is True.
+        """
+        return self._lattice
+
+    @property
+    def constant_lattice(self):
+        """
+        True if all frames share the same lattice.
+        """
+        return self._lattices is None
+
+    @property
+    def lattice_matrices(self):
+        """
+        Array of shape (frames, 3, 3) of the lattice matrices of each frame.
+        """
+        if self._lattices is None:
+            return np.tile(self._lattice.matrix, (len(self), 1, 1))
+        return self._lattices
+
+    @property
+    def species(self):
+        """
+        List of species on each site.
+        """
+        return list(self._species)
+
+    @property
+    def site_properties(self):
+        """
+        Site properties as a dict of sequences.
+        """
+        return dict(self._site_properties)
+
+    @property
+    def num_sites(self):
+        """
+        Number of sites in each frame.
+        """
+        return self._frac_coords.shape[1]
+
+    def __len__(self):
+        return len(self._frac_coords)
+
+    def __getitem__(self, ind):
+        if isinstance(ind, (int, long, np.integer)):
+            return self.get_structure(ind)
+        lattice = self._lattice if self._lattices is None \
+            else self._lattices[ind]
+        return self.__class__(lattice, self._species, self._frac_coords[ind],
+                              site_properties=self._site_properties)
+
+    def get_lattice(self, i):
+        """
+        Returns the lattice of frame i.
+        """
+        if self._lattices is None:
+            return self._lattice
+        return Lattice(self._lattices[i])
+
+    def get_structure(self, i):
+        """
+        Returns the Structure of frame i.
+        """
+        return Structure(self.get_lattice(i), self._species,
+                         self._frac_coords[i],
+                         site_properties=self._site_properties or None)
+
+    def _get_frac_displacements(self):
+        """
+        Fractional displacements from the first frame, with the jumps
+        across periodic boundaries removed.
+        """
+        fcoords = self._frac_coords
+        f_disp = np.zeros_like(fcoords)
+        if len(fcoords) > 1:
+            steps = fcoords[1:] - fcoords[:-1]
+            steps -= np.round(steps)
+            np.cumsum(steps, axis=0, out=f_disp[1:])
+        return f_disp
+
+    def get_unwrapped_frac_coords(self):
+        """
+        Returns the fractional coordinates with the jumps across periodic
+        boundaries removed, i.e., the coordinates of each site are continuous
+        from frame to frame. This assumes that no site moves by more than
+        half a lattice vector between two frames.
+
+        Returns:
+            Array of shape (frames, sites, 3) with the same dtype as
+            frac_coords.
+        """
+        unwrapped = self._get_frac_displacements()
+        if len(unwrapped):
+            unwrapped += self._frac_coords[0]
+        return unwrapped
+
+    def unwrap(self):
+        """
+        Returns a Trajectory with the unwrapped fractional coordinates. See
+        get_unwrapped_frac_coords.
+        """
+        lattice = self._lattice if self._lattices is None else self._lattices
+        return self.__class__(lattice, self._species,
+                              self.get_unwrapped_frac_coords(),
+                              site_properties=self._site_properties)
+
+    def get_displacements(self):
+        """
+        Returns the cartesian displacements of the sites from their positions
+        in the first frame, based on the unwrapped fractional coordinates and
+        the lattice of the first frame.
+
+        Returns:
+            Array of shape (sites, frames, 3), which is the format used by
+            DiffusionAnalyzer.
+        """
+        f_disp = self._get_frac_displacements()
+        disp = self._lattice.get_cartesian_coords(f_disp)
+        return disp.astype(self._frac_coords.dtype).transpose((1, 0, 2))
+
+    @classmethod
+    def from_structures(cls, structures, constant_lattice=True,
+                        dtype=np.double):
+        """
+        Creates a Trajectory from a sequence of structures with the same
+        sites.
+
+        Args:
+            structures ([Structure]): Sequence of structures.
+            constant_lattice (bool): Whether all structures share the
+                lattice of the first one. If False, the lattice of each
+                structure is stored.
+            dtype: Numpy dtype of the stored fractional coordinates.
+        """
+        structures = list(structures)
+        frac_coords = np.array([s.frac_coords for s in structures],
+                               dtype=dtype)
+        if constant_lattice:
+            lattice = structures[0].lattice
+        else:
+            lattice = np.array([s.lattice.matrix for s in structures])
+        props = structures[0].site_properties
+        return cls(lattice, structures[0].species_and_occu, frac_coords,
+                   site_properties=props)
+
+    def _get_serialized_data(self):
+        species = [sp.to_dict if isinstance(sp, Composition)
+                   else Composition({sp: 1}).to_dict
+                   for sp in self._species]
+        if self._lattices is None:
+            lattice = self._lattice.matrix
+        else:
+            lattice = self._lattices
+        return lattice, species
+
+    def to_npz(self, filename):
+        """
+        Writes the trajectory to a numpy .npz file.
+
+        Args:
+            filename (str): Filename.
+        """
+        lattice, species = self._get_serialized_data()
+        np.savez(filename, frac_coords=self._frac_coords, lattice=lattice,
+                 species=json.dumps(species),
+                 site_properties=json.dumps(self._site_properties))
+
+    @classmethod
+    def from_npz(cls, filename):
+        """
+        Reads a trajectory written by to_npz.
+
+        Args:
+            filename (str): Filename.
+        """
+        data = np.load(filename)
+        return cls(data["lattice"], json.loads(str(data["species"])),
+                   data["frac_coords"],
+                   site_properties=json.loads(str(data["site_properties"])))
+
+    @property
+    def to_dict(self):
+        lattice, species = self._get_serialized_data()
+        return {"@module": self.__class__.__module__,
+                "@class": self.__class__.__name__,
+                "lattice": lattice.tolist(),
+                "species": species,
+                "frac_coords": self._frac_coords.tolist(),
+                "site_properties": self._site_properties}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["lattice"], d["species"], d["frac_coords"],
+                   site_properties=d.get("site_properties"))
@@ -15,7 +15,6 @@ __date__ = "March 14, 2012"
 
 import numpy as np
 import math
-import itertools
 import collections
 
 from pymatgen.core.structure import Structure
@@ -124,6 +123,35 @@ class Kpoint(MSONable):
                 "@class": self.__class__.__name__}
 
 
+def _get_projection_array(projections):
+    """
+    Converts projections given as {spin: [band][kpoint]{Orbital: [sites]}}
+    or {spin: array(band, kpoint, orbital, site)} to a single array with
+    shape (spin, band, kpoint, orbital, site). The orbitals of the nested
+    format can also be given by their names, as in the dict representation.
+    The orbital axis is indexed by the VASP index of the orbitals, i.e.,
+    follows Orbital.all_orbitals. Orbitals missing from the nested format are
+    filled with zeros.
+    """
+    spins = [spin for spin in (Spin.up, Spin.down) if spin in projections]
+    arrays = []
+    for spin in spins:
+        p = projections[spin]
+        if isinstance(p, np.ndarray):
+            arrays.append(p)
+            continue
+        keys = list(p[0][0].keys())
+        orbitals = [Orbital.from_string(k) if isinstance(k, basestring)
+                    else k for k in keys]
+        norb = max([orb.vasp_index for orb in orbitals]) + 1
+        nsites = len(p[0][0][keys[0]])
+        a = np.zeros((len(p), len(p[0]), norb, nsites))
+        for k, orb in zip(keys, orbitals):
+            a[:, :, orb.vasp_index, :] = [[pk[k] for pk in pb] for pb in p]
+        arrays.append(a)
+    return np.array(arrays, dtype=float)
+
+
 class BandStructure(object):
     """
     This is the most generic band structure data possible
@@ -159,7 +187,10 @@ class BandStructure(object):
             sites the keys of the dictionary are Orbital objects and the
             values are the projections on each site ordered as in the
             structure object. If the band structure is not spin polarized,
-            we only store one data set under Spin.up.
+            we only store one data set under Spin.up. Alternatively, the
+            projections for each spin can be given as an array with shape
+            (band, kpoint, orbital, site), where the orbitals are ordered
+            by their VASP index.
     """
 
     def __init__(self, kpoints, eigenvals, lattice, efermi, labels_dict=None,
@@ -169,11 +200,17 @@ class BandStructure(object):
         self._kpoints = []
         self._labels_dict = {}
         self._structure = structure
-        self._projections = projections if projections else {}
+        self._proj = None
+        self._projections_dict = None
+        self._proj_spins = []
+        if projections:
+            self._proj = _get_projection_array(projections)
+            self._proj_spins = [spin for spin in (Spin.up, Spin.down)
+                                if spin in projections]
         if labels_dict is None:
             labels_dict = {}
 
-        if len(self._projections) != 0 and self._structure is None:
+        if self._proj is not None and self._structure is None:
             raise Exception("if projections are provided a structure object"
                             " needs also to be given")
 
@@ -189,12 +226,20 @@ class BandStructure(object):
             self._kpoints.append(
                 Kpoint(k, lattice, label=label,
                        coords_are_cartesian=coords_are_cartesian))
-        self._bands = eigenvals
         self._nb_bands = len(eigenvals[Spin.up])
 
         self._is_spin_polarized = False
-        if len(self._bands) == 2:
+        if len(eigenvals) == 2:
             self._is_spin_polarized = True
+        spins = [Spin.up, Spin.down] if self._is_spin_polarized \
+            else [Spin.up]
+        #Eigenvalues as a (spin, band, kpoint) array, from which _bands is
+        #derived. The band edge data derived from it are cached as long as
+        #the fermi level is unchanged.
+        self._band_array = np.array([eigenvals[spin] for spin in spins],
+                                    dtype=float)
+        self._cache = {}
+        self._cache_efermi = efermi
 
     @property
     def kpoints(self):
@@ -236,6 +281,16 @@ class BandStructure(object):
         """
         return self._bands
 
+    @property
+    def _bands(self):
+        """
+        The eigenvalues as {spin: array(band, kpoint)}, which are views of
+        the (spin, band, kpoint) eigenvalue array.
+        """
+        spins = [Spin.up, Spin.down] if self._is_spin_polarized \
+            else [Spin.up]
+        return {spin: self._band_array[i] for i, spin in enumerate(spins)}
+
     @property
     def nb_bands(self):
         """
@@ -243,6 +298,71 @@ class BandStructure(object):
         """
         return self._nb_bands
 
+    @property
+    def projections(self):
+        """
+        The orbital projections as a dense array with shape
+        (spin, band, kpoint, orbital, site), or None if the band structure
+        has no projections. The spin index is 0 for Spin.up and 1 for
+        Spin.down, and the orbital index is the VASP index of the orbital (see
+        projection_orbitals).
+        """
+        return self._proj
+
+    @property
+    def projection_orbitals(self):
+        """
+        The orbitals corresponding to the orbital axis of projections.
+        """
+        if self._proj is None:
+            return []
+        return list(Orbital.all_orbitals[:self._proj.shape[3]])
+
+    @property
+    def _projections(self):
+        """
+        The projections in the nested {Spin.up:[][{Orbital:[]}], ...} format
+        of the constructor. This view is only built on first access and is
+        kept for backwards compatibility. Use projections instead.
+        """
+        if self._projections_dict is None:
+            self._projections_dict = {}
+            if self._proj is not None:
+                orbitals = self.projection_orbitals
+                for i, spin in enumerate(self._proj_spins):
+                    self._projections_dict[spin] = [
+                        [dict(zip(orbitals, p)) for p in band]
+                        for band in self._proj[i].tolist()]
+        return self._projections_dict
+
+    def _get_site_groups(self):
+        """
+        Returns the species of the sites (as strings, in order of first
+        occurrence) and a (site, species) indicator matrix used to sum
+        projections by species.
+        """
+        symbols = [str(site.specie) for site in self._structure]
+        species = sorted(set(symbols), key=symbols.index)
+        indicator = np.zeros((len(symbols), len(species)))
+        indicator[np.arange(len(symbols)),
+                  [species.index(sym) for sym in symbols]] = 1
+        return species, indicator
+
+    def get_projection_on_elements_array(self):
+        """
+        Returns the projections summed over orbitals and grouped by species.
+
+        Returns:
+            (species, projections), where species is a list of species
+            strings and projections an array with shape
+            (spin, band, kpoint, species). (None, None) if there are no
+            projections in the band structure.
+        """
+        if self._proj is None:
+            return None, None
+        species, indicator = self._get_site_groups()
+        return species, np.dot(self._proj.sum(axis=3), indicator)
+
     def get_projection_on_elements(self):
         """
         Method returning a dictionary of projections on elements.
@@ -253,24 +373,49 @@ class BandStructure(object):
             if there is no projections in the band structure
             returns an empty dict
         """
-        if len(self._projections) == 0:
+        species, proj = self.get_projection_on_elements_array()
+        if proj is None:
             return {}
-        if self.is_spin_polarized:
-            result = {Spin.up: [], Spin.down: []}
-        else:
-            result = {Spin.up: []}
-        structure = self._structure
-        for spin in result:
-            result[spin] = [[collections.defaultdict(float)
-                             for i in range(len(self._kpoints))]
-                            for j in range(self._nb_bands)]
-            for i, j, k in itertools.product(range(self._nb_bands),
-                                             range(len(self._kpoints)),
-                                             range(structure.num_sites)):
-                for orb in self._projections[Spin.up][i][j]:
-                    result[spin][i][j][str(structure[k].specie)] += \
-                        self._projections[spin][i][j][orb][k]
-        return result
+        return {spin: [[collections.defaultdict(float, zip(species, p))
+                        for p in band] for band in proj[i].tolist()]
+                for i, spin in enumerate(self._proj_spins)}
+
+    def get_projections_on_elts_and_orbitals_array(self, dictio):
+        """
+        Returns the projections on elements and orbital types, e.g., the
+        sum of all Cu d projections.
+
+        Args:
+            dictio: A dictionary of Elements and Orbitals for which we want
+                to have projections on. It is given as: {Element:[orbitals]},
+                e.g., {'Cu':['d','s']}
+
+        Returns:
+            (keys, projections), where keys is a list of
+            (species, orbital type) tuples, e.g., [("Cu", "s"), ("Cu", "d")],
+            and projections is an array with shape (spin, band, kpoint, key).
+            (None, None) if there are no projections in the band structure.
+        """
+        if self._proj is None:
+            return None, None
+        species, indicator = self._get_site_groups()
+        types = []
+        for orb in self.projection_orbitals:
+            if str(orb)[0] not in types:
+                types.append(str(orb)[0])
+        type_indicator = np.array([[str(orb)[0] == t for t in types]
+                                   for orb in self.projection_orbitals],
+                                  dtype=float)
+        keys = [(sp, t) for sp in species if sp in dictio
+                for t in types if t in dictio[sp]]
+        if not keys:
+            return keys, np.zeros(self._proj.shape[:3] + (0,))
+        #Sum over sites of the same species, then over orbitals of the same
+        #type.
+        proj = np.dot(np.swapaxes(np.dot(self._proj, indicator), 3, 4),
+                      type_indicator)
+        return keys, proj[..., [species.index(k[0]) for k in keys],
+                          [types.index(k[1]) for k in keys]]
 
     def get_projections_on_elts_and_orbitals(self, dictio):
         """
@@ -289,30 +434,32 @@ class BandStructure(object):
             if there is no projections in the band structure returns an empty
             dict.
         """
-        if len(self._projections) == 0:
+        keys, proj = self.get_projections_on_elts_and_orbitals_array(dictio)
+        if proj is None:
             return {}
-        if self.is_spin_polarized:
-            result = {Spin.up: [], Spin.down: []}
-        else:
-            result = {Spin.up: []}
-        structure = self._structure
-        for spin in result:
-            result[spin] = [[{str(e): collections.defaultdict(float)
-                            for e in dictio}
-                            for i in range(len(self._kpoints))]
-                            for j in range(self._nb_bands)]
-
-            for i, j, k in itertools.product(
-                    range(self._nb_bands), range(len(self._kpoints)),
-                    range(structure.num_sites)):
-                for orb in self._projections[Spin.up][i][j]:
-                    if str(structure[k].specie) in dictio:
-                        if str(orb)[0] in dictio[str(structure[k].specie)]:
-                            result[spin][i][j][str(structure[k].specie)]\
-                                [str(orb)[0]] += \
-                                self._projections[spin][i][j][orb][k]
+        result = {}
+        for i, spin in enumerate(self._proj_spins):
+            result[spin] = []
+            for band in proj[i].tolist():
+                result[spin].append([])
+                for p in band:
+                    d = {str(e): collections.defaultdict(float)
+                         for e in dictio}
+                    for (sp, t), v in zip(keys, p):
+                        d[sp][t] = v
+                    result[spin][-1].append(d)
         return result
 
+    def _get_cache(self):
+        """
+        Returns the cache of band edge data. The cache is reset whenever the
+        fermi level changes.
+        """
+        if self._cache_efermi != self._efermi:
+            self._cache = {}
+            self._cache_efermi = self._efermi
+        return self._cache
+
     def is_metal(self):
         """
         Check if the band structure indicates a metal by looking if the fermi
@@ -321,27 +468,82 @@ class BandStructure(object):
         Returns:
             True if a metal, False if not
         """
-        for i in range(self._nb_bands):
-            below = False
-            above = False
-            for j in range(len(self._kpoints)):
-                if self._bands[Spin.up][i][j] < self._efermi:
-                    below = True
-                if self._bands[Spin.up][i][j] > self._efermi:
-                    above = True
-            if above and below:
-                return True
-            if self.is_spin_polarized:
-                below = False
-                above = False
-                for j in range(len(self._kpoints)):
-                    if self._bands[Spin.down][i][j] < self._efermi:
-                        below = True
-                    if self._bands[Spin.down][i][j] > self._efermi:
-                        above = True
-                if above and below:
-                    return True
-        return False
+        cache = self._get_cache()
+        if "is_metal" not in cache:
+            below = np.any(self._band_array < self._efermi, axis=2)
+            above = np.any(self._band_array > self._efermi, axis=2)
+            cache["is_metal"] = bool(np.any(below & above))
+        return cache["is_metal"]
+
+    def _get_band_edge(self, vbm):
+        """
+        Locates the VBM (highest energy below the fermi level) or the CBM
+        (lowest energy above the fermi level).
+
+        Args:
+            vbm (bool): True for the VBM, False for the CBM.
+
+        Returns:
+            (energy, kpoint index, kpoint indices, band indices), where the
+            kpoint indices are all the indices of the kpoint of the band edge
+            and band indices is a dict {spin: [indices of the bands sharing
+            the band edge]}.
+        """
+        cache = self._get_cache()
+        key = "vbm" if vbm else "cbm"
+        if key not in cache:
+            bands = self._band_array
+            #Ties are resolved by taking the first band, then kpoint, then
+            #spin for the VBM and the first spin, then band, then kpoint for
+            #the CBM.
+            if vbm:
+                masked = np.where(bands < self._efermi, bands,
+                                  -float("inf")).transpose((1, 2, 0))
+                ind = np.unravel_index(np.argmax(masked), masked.shape)[1]
+            else:
+                masked = np.where(bands > self._efermi, bands, float("inf"))
+                ind = np.unravel_index(np.argmin(masked), masked.shape)[2]
+            energy = float(masked.max() if vbm else masked.min())
+            if np.isinf(energy):
+                raise ValueError("No band {} the fermi level".format(
+                    "below" if vbm else "above"))
+            label = self._kpoints[ind].label
+            if label is not None:
+                kpoint_indices = [i for i, k in enumerate(self._kpoints)
+                                  if k.label == label]
+            else:
+                kpoint_indices = [ind]
+            spins = [Spin.up, Spin.down] if self.is_spin_polarized \
+                else [Spin.up]
+            band_indices = {
+                spin: np.nonzero(np.abs(bands[i, :, ind] - energy)
+                                 < 0.001)[0].tolist()
+                for i, spin in enumerate(spins)}
+            cache[key] = (energy, ind, kpoint_indices, band_indices)
+        return cache[key]
+
+    def _get_band_edge_data(self, vbm):
+        """
+        Returns the data of get_vbm or get_cbm.
+        """
+        if self.is_metal():
+            return {"band_index": [], "kpoint_index": [],
+                    "kpoint": [], "energy": None, "projections": {}}
+        energy, ind, kpoint_indices, band_indices = self._get_band_edge(vbm)
+        proj = {}
+        if self._proj is not None:
+            for i, spin in enumerate(self._proj_spins):
+                if len(band_indices.get(spin, [])) == 0:
+                    continue
+                proj[spin] = dict(zip(
+                    self.projection_orbitals,
+                    self._proj[i, band_indices[spin][0],
+                               kpoint_indices[0]].tolist()))
+        return {"band_index": {spin: list(v)
+                               for spin, v in band_indices.items()},
+                "kpoint_index": list(kpoint_indices),
+                "kpoint": self._kpoints[ind], "energy": energy,
+                "projections": proj}
 
     def get_vbm(self):
         """
@@ -365,48 +567,7 @@ class BandStructure(object):
             BandStructure: {spin:{'Orbital': [proj]}} where the array
             [proj] is ordered according to the sites in structure
     """
-        if self.is_metal():
-            return {"band_index": [], "kpoint_index": [],
-                    "kpoint": [], "energy": None, "projections": {}}
-        max_tmp = -float("inf")
-        index = None
-        kpointvbm = None
-        for i in range(self._nb_bands):
-            for j in range(len(self._kpoints)):
-                for spin in self._bands:
-                    if self._bands[spin][i][j] < self._efermi:
-                        if self._bands[spin][i][j] > max_tmp:
-                            max_tmp = self._bands[spin][i][j]
-                            index = j
-                            kpointvbm = self._kpoints[j]
-
-        list_ind_kpts = []
-        if kpointvbm.label is not None:
-            for i in range(len(self._kpoints)):
-                if self._kpoints[i].label == kpointvbm.label:
-                    list_ind_kpts.append(i)
-        else:
-            list_ind_kpts.append(index)
-        #get all other bands sharing the vbm
-        list_ind_band = {Spin.up: []}
-        if self.is_spin_polarized:
-            list_ind_band = {Spin.up: [], Spin.down: []}
-        for spin in self._bands:
-            for i in range(self._nb_bands):
-                if math.fabs(self._bands[spin][i][index] - max_tmp) < 0.001:
-                    list_ind_band[spin].append(i)
-        proj = {}
-        if len(self._projections) != 0:
-            for spin in list_ind_band:
-                if len(list_ind_band[spin]) == 0:
-                    continue
-                proj[spin] =\
-                    self._projections[spin][list_ind_band[spin][0]][
-                        list_ind_kpts[0]]
-        return {'band_index': list_ind_band,
-                'kpoint_index': list_ind_kpts,
-                'kpoint': kpointvbm, 'energy': max_tmp,
-                'projections': proj}
+        return self._get_band_edge_data(True)
 
     def get_cbm(self):
         """
@@ -430,49 +591,7 @@ class BandStructure(object):
             BandStructure: {spin:{'Orbital': [proj]}} where the array
             [proj] is ordered according to the sites in structure
         """
-        if self.is_metal():
-            return {"band_index": [], "kpoint_index": [],
-                    "kpoint": [], "energy": None, "projections": {}}
-        max_tmp = float("inf")
-
-        index = None
-        kpointcbm = None
-        for spin in self._bands:
-            for i in range(self._nb_bands):
-                for j in range(len(self._kpoints)):
-                    if self._bands[spin][i][j] > self._efermi:
-                        if self._bands[spin][i][j] < max_tmp:
-                            max_tmp = self._bands[spin][i][j]
-                            index = j
-                            kpointcbm = self._kpoints[j]
-        list_index_kpoints = []
-        if kpointcbm.label is not None:
-            for i in range(len(self._kpoints)):
-                if self._kpoints[i].label == kpointcbm.label:
-                    list_index_kpoints.append(i)
-        else:
-            list_index_kpoints.append(index)
-        #get all other bands sharing the vbm
-        list_index_band = {Spin.up: []}
-        if self.is_spin_polarized:
-            list_index_band = {Spin.up: [], Spin.down: []}
-        for spin in self._bands:
-            for i in range(self._nb_bands):
-                if math.fabs(self._bands[spin][i][index] - max_tmp) < 0.001:
-                    list_index_band[spin].append(i)
-
-        proj = {}
-        if len(self._projections) != 0:
-            for spin in list_index_band:
-                if len(list_index_band[spin]) == 0:
-                    continue
-                proj[spin] = self._projections[spin][list_index_band[spin][0]][
-                    list_index_kpoints[0]]
-
-        return {'band_index': list_index_band,
-                'kpoint_index': list_index_kpoints,
-                'kpoint': kpointcbm, 'energy': max_tmp,
-                'projections': proj}
+        return self._get_band_edge_data(False)
 
     def get_band_gap(self):
         """
@@ -487,24 +606,28 @@ class BandStructure(object):
         """
         if self.is_metal():
             return {"energy": 0.0, "direct": False, "transition": None}
-        cbm = self.get_cbm()
-        vbm = self.get_vbm()
-        result = dict(direct=False, energy=0.0, transition=None)
-
-        result["energy"] = cbm["energy"] - vbm["energy"]
-
-        if cbm["kpoint"].label == vbm["kpoint"].label or \
-                np.linalg.norm(cbm["kpoint"].cart_coords
-                               - vbm["kpoint"].cart_coords) < 0.01:
-            result["direct"] = True
-
-        result["transition"] = "-".join(
-            [str(c.label) if c.label is not None else
-             str("(") + ",".join(["{0:.3f}".format(c.frac_coords[i])
-                                  for i in range(3)])
-             + str(")") for c in [vbm["kpoint"], cbm["kpoint"]]])
-
-        return result
+        cache = self._get_cache()
+        if "band_gap" not in cache:
+            cbm_energy, cbm_ind = self._get_band_edge(False)[:2]
+            vbm_energy, vbm_ind = self._get_band_edge(True)[:2]
+            cbm_kpt = self._kpoints[cbm_ind]
+            vbm_kpt = self._kpoints[vbm_ind]
+            result = dict(direct=False, energy=0.0, transition=None)
+
+            result["energy"] = cbm_energy - vbm_energy
+
+            if cbm_kpt.label == vbm_kpt.label or \
+                    np.linalg.norm(cbm_kpt.cart_coords
+                                   - vbm_kpt.cart_coords) < 0.01:
+                result["direct"] = True
+
+            result["transition"] = "-".join(
+                [str(c.label) if c.label is not None else
+                 str("(") + ",".join(["{0:.3f}".format(c.frac_coords[i])
+                                      for i in range(3)])
+                 + str(")") for c in [vbm_kpt, cbm_kpt]])
+            cache["band_gap"] = result
+        return dict(cache["band_gap"])
 
     def get_direct_band_gap(self):
         """
@@ -512,34 +635,29 @@ class BandStructure(object):
 
         Returns:
              the value of the direct band gap
+
+        Raises:
+            ValueError if a spin channel has no band above or below the fermi
+            level.
         """
         if self.is_metal():
             return 0.0
-        lowest_conduction_band = []
-        highest_valence_band = []
-        for j in range(len(self._bands[Spin.up])):
-            for i in range(len(self.kpoints)):
-                if self._bands[Spin.up][j][i] > self._efermi:
-                    lowest_conduction_band.append(self._bands[Spin.up][j][i])
-                    highest_valence_band.append(self._bands[Spin.up][j-1][i])
-        if self.is_spin_polarized:
-            lowest_conduction_band_d = []
-            highest_valence_band_d = []
-            for j in range(len(self._bands[Spin.down])):
-                for i in range(len(self.kpoints)):
-                    if self._bands[Spin.down][j][i] > self._efermi:
-                        lowest_conduction_band_d.append(self._bands[Spin.down][j][i])
-                        highest_valence_band_d.append(self._bands[Spin.down][j-1][i])
-            diff = []
-            for i in range(len(self.kpoints)):
-                diff.append(min([lowest_conduction_band[i],lowest_conduction_band_d[i]])
-                            - max([highest_valence_band[i],highest_valence_band_d[i]]))
-            return min(diff)
-
-        diff = []
-        for i in range(len(self.kpoints)):
-            diff.append(lowest_conduction_band[i] - highest_valence_band[i])
-        return min(diff)
+        cache = self._get_cache()
+        if "direct_band_gap" not in cache:
+            bands = self._band_array
+            #Index of the lowest conduction band for each spin.
+            ispins = np.arange(len(bands))
+            above = np.any(bands > self._efermi, axis=2)
+            if not np.all(np.any(above, axis=1)):
+                raise ValueError("No band above the fermi level")
+            icb = np.argmax(above, axis=1)
+            if np.any(icb == 0):
+                raise ValueError("No band below the fermi level")
+            lowest_conduction_band = bands[ispins, icb].min(axis=0)
+            highest_valence_band = bands[ispins, icb - 1].max(axis=0)
+            cache["direct_band_gap"] = float(
+                np.min(lowest_conduction_band - highest_valence_band))
+        return cache["direct_band_gap"]
 
     @property
     def to_dict(self):
@@ -554,8 +672,9 @@ class BandStructure(object):
         #the dict smaller and avoids the repetition of the lattice
         for k in self._kpoints:
             d["kpoints"].append(k.to_dict["fcoords"])
-        d["bands"] = {str(int(spin)): self._bands[spin]
-                      for spin in self._bands}
+        d["bands"] = {str(int(spin)): bands.tolist()
+                      for spin, bands in zip((Spin.up, Spin.down),
+                                             self._band_array)}
         d["is_metal"] = self.is_metal()
         vbm = self.get_vbm()
         d["vbm"] = {"energy": vbm["energy"],
@@ -581,17 +700,13 @@ class BandStructure(object):
         for c in self._labels_dict:
             d['labels_dict'][c] = self._labels_dict[c].to_dict['fcoords']
         d['projections'] = {}
-        if len(self._projections) != 0:
+        if self._proj is not None:
             d['structure'] = self._structure.to_dict
+            orbitals = [str(orb) for orb in self.projection_orbitals]
             d['projections'] = {
-                str(int(spin)): [
-                    [{str(orb): [
-                        self._projections[spin][i][j][orb][k]
-                        for k in range(len(self._projections[spin][i][j][orb]))]
-                      for orb in self._projections[spin][i][j]}
-                     for j in range(len(self._projections[spin][i]))]
-                    for i in range(len(self._projections[spin]))]
-                for spin in self._projections}
+                str(int(spin)): [[dict(zip(orbitals, p)) for p in band]
+                                 for band in self._proj[i].tolist()]
+                for i, spin in enumerate(self._proj_spins)}
         return d
 
     @classmethod
@@ -611,15 +726,8 @@ class BandStructure(object):
         if 'structure' in d:
             structure = Structure.from_dict(d['structure'])
         if 'projections' in d and len(d['projections']) != 0:
-            projections = {
-                Spin.from_int(int(spin)): [
-                    [{Orbital.from_string(orb): [
-                        d['projections'][spin][i][j][orb][k]
-                        for k in range(len(d['projections'][spin][i][j][orb]))]
-                      for orb in d['projections'][spin][i][j]}
-                     for j in range(len(d['projections'][spin][i]))]
-                    for i in range(len(d['projections'][spin]))]
-                for spin in d['projections']}
+            projections = {Spin.from_int(int(spin)): p
+                           for spin, p in d['projections'].items()}
 
         return BandStructure(
             d['kpoints'], {Spin.from_int(int(k)): d['bands'][k]
@@ -705,10 +813,6 @@ class BandStructureSymmLine(BandStructure, MSONable):
                                    "name": (self._kpoints[b[0]].label + "-" +
                                             self._kpoints[b[-1]].label)})
 
-        self._is_spin_polarized = False
-        if len(self._bands) == 2:
-            self._is_spin_polarized = True
-
     def get_equivalent_kpoints(self, index):
         """
         Returns the list of kpoint indices equivalent (meaning they are the
@@ -838,8 +942,9 @@ class BandStructureSymmLine(BandStructure, MSONable):
         for k in self._kpoints:
             d["kpoints"].append(k.to_dict["fcoords"])
         d["branches"] = self._branches
-        d["bands"] = {str(int(spin)): self._bands[spin]
-                      for spin in self._bands}
+        d["bands"] = {str(int(spin)): bands.tolist()
+                      for spin, bands in zip((Spin.up, Spin.down),
+                                             self._band_array)}
         d["is_metal"] = self.is_metal()
         vbm = self.get_vbm()
         d["vbm"] = {"energy": vbm["energy"],
@@ -865,17 +970,13 @@ class BandStructureSymmLine(BandStructure, MSONable):
         for c in self._labels_dict:
             d['labels_dict'][c] = self._labels_dict[c].to_dict['fcoords']
         d['projections'] = {}
-        if len(self._projections) != 0:
+        if self._proj is not None:
             d['structure'] = self._structure.to_dict
+            orbitals = [str(orb) for orb in self.projection_orbitals]
             d['projections'] = {
-                str(int(spin)): [
-                    [{str(orb): [
-                        self._projections[spin][i][j][orb][k]
-                        for k in range(len(self._projections[spin][i][j][orb]))]
-                      for orb in self._projections[spin][i][j]}
-                     for j in range(len(self._projections[spin][i]))]
-                    for i in range(len(self._projections[spin]))]
-                for spin in self._projections}
+                str(int(spin)): [[dict(zip(orbitals, p)) for p in band]
+                                 for band in self._proj[i].tolist()]
+                for i, spin in enumerate(self._proj_spins)}
         return d
 
     @classmethod
@@ -892,15 +993,8 @@ class BandStructureSymmLine(BandStructure, MSONable):
         structure = None
         if 'projections' in d and len(d['projections']) != 0:
             structure = Structure.from_dict(d['structure'])
-            projections = {
-                Spin.from_int(int(spin)): [
-                    [{Orbital.from_string(orb): [
-                        d['projections'][spin][i][j][orb][k]
-                        for k in range(len(d['projections'][spin][i][j][orb]))]
-                      for orb in d['projections'][spin][i][j]}
-                     for j in range(len(d['projections'][spin][i]))]
-                    for i in range(len(d['projections'][spin]))]
-                for spin in d['projections']}
+            projections = {Spin.from_int(int(spin)): p
+                           for spin, p in d['projections'].items()}
 
         return BandStructureSymmLine(
             d['kpoints'], {Spin.from_int(int(k)): d['bands'][k]
@@ -941,33 +1035,17 @@ def get_reconstructed_band_structure(list_bs, efermi=None):
                 kpoints.append(k.frac_coords)
             for k, v in bs._labels_dict.iteritems():
                 labels_dict[k] = v.frac_coords
-        eigenvals = {Spin.up: [list_bs[0]._bands[Spin.up][i]
-                               for i in range(nb_bands)]}
-        for i in range(nb_bands):
-            for bs in list_bs[1:]:
-                for e in bs._bands[Spin.up][i]:
-                    eigenvals[Spin.up][i].append(e)
+        bands = np.concatenate([bs._band_array[:, :nb_bands]
+                                for bs in list_bs], axis=2)
+        eigenvals = {Spin.up: bands[0].tolist()}
         if list_bs[0].is_spin_polarized:
-            eigenvals[Spin.down] = [list_bs[0]._bands[Spin.down][i]
-                                    for i in range(nb_bands)]
-            for i in range(nb_bands):
-                for bs in list_bs[1:]:
-                    for e in bs._bands[Spin.down][i]:
-                        eigenvals[Spin.down][i].append(e)
+            eigenvals[Spin.down] = bands[1].tolist()
         projections = {}
-        if len(list_bs[0]._projections) != 0:
-            projections = {Spin.up: [list_bs[0]._projections[Spin.up][i]
-                           for i in range(nb_bands)]}
-            for i in range(nb_bands):
-                for bs in list_bs[1:]:
-                    projections[Spin.up][i].extend(bs._projections[Spin.up][i])
-            if list_bs[0].is_spin_polarized:
-                projections[Spin.down] = [list_bs[0]._projections[Spin.down][i]
-                                          for i in range(nb_bands)]
-                for i in range(nb_bands):
-                    for bs in list_bs[1:]:
-                        projections[Spin.down][i].extend(
-                            bs._projections[Spin.down][i])
+        if list_bs[0].projections is not None:
+            proj = np.concatenate([bs.projections[:, :nb_bands]
+                                   for bs in list_bs], axis=2)
+            projections = {spin: proj[i]
+                           for i, spin in enumerate(list_bs[0]._proj_spins)}
 
         if isinstance(list_bs[0], BandStructureSymmLine):
             return BandStructureSymmLine(kpoints, eigenvals, rec_lattice,
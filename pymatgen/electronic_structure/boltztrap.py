@@ -32,6 +32,8 @@ __date__ = "August 23, 2013"
 
 import os
 import math
+import shutil
+import hashlib
 import numpy as np
 import tempfile
 from pymatgen.core.lattice import Lattice
@@ -77,13 +79,6 @@ class BoltztrapRunner():
                 get certain bands interpolated
     """
 
-    @requires(which('x_trans'),
-              "BoltztrapRunner requires the executables 'x_trans' to be in "
-              "the path. Please download the Boltztrap at "
-              "http://www.icams.de/content/departments/ams/madsen/boltztrap"
-              ".html and follow the instructions in the README to compile "
-              "Bolztrap accordingly. Then add x_trans to your path")
-
     def __init__(self, bs, nelec, dos_type="HISTO", energy_grid=0.005,
                  lpfac=10, type="BOLTZ", band_nb=None):
         self.lpfac = lpfac
@@ -97,141 +92,32 @@ class BoltztrapRunner():
 
     def _make_energy_file(self, file_name):
         with open(file_name, 'w') as f:
-            f.write("test\n")
-            f.write(str(len(self._bs.kpoints))+"\n")
-            for i in range(len(self._bs.kpoints)):
-                tmp_eigs = []
-                for spin in self._bs._bands:
-                    for j in range(int(math.floor(self._bs._nb_bands * 0.9))):
-                        tmp_eigs.append(Energy(self._bs._bands[spin][j][i] -
-                                        self._bs.efermi, "eV").to("Ry"))
-                tmp_eigs.sort()
-                f.write("%12.8f %12.8f %12.8f %d\n"
-                        % (self._bs.kpoints[i].frac_coords[0],
-                           self._bs.kpoints[i].frac_coords[1],
-                           self._bs.kpoints[i].frac_coords[2], len(tmp_eigs)))
-                for j in range(len(tmp_eigs)):
-                    f.write("%18.8f\n" % float(tmp_eigs[j]))
+            f.write(_get_energy_string(self._bs))
 
     def _make_struc_file(self, file_name):
-        sym = SymmetryFinder(self._bs._structure, symprec=0.01)
         with open(file_name, 'w') as f:
-            f.write(self._bs._structure.composition.formula+" " +
-                    str(sym.get_spacegroup_symbol())+"\n")
-            for i in range(3):
-                line = ''
-                for j in range(3):
-                    line += "%12.5f" % (
-                        Length(self._bs._structure.lattice.matrix[i][j],
-                               "ang").to("bohr"))
-                f.write(line+'\n')
-            ops = sym.get_symmetry_dataset()['rotations']
-            f.write(str(len(ops))+"\n")
-            for c in ops:
-                f.write('\n'.join([' '.join([str(int(i)) for i in row])
-                                   for row in c]))
-                f.write('\n')
+            f.write(_get_struct_string(self._bs._structure))
 
     def _make_def_file(self, def_file_name):
-        with open(def_file_name,'w') as f:
-            so = ""
-            if self._bs.is_spin_polarized:
-                so = "so"
-            f.write("5, 'boltztrap.intrans',      'old',    'formatted',0\n"+
-                    "6,'boltztrap.outputtrans',      'unknown',    'formatted',0\n"+
-                    "20,'boltztrap.struct',         'old',    'formatted',0\n"+
-                    "10,'boltztrap.energy"+so+"',         'old',    'formatted',0\n"+
-                    "48,'boltztrap.engre',         'unknown',    'unformatted',0\n"+
-                    "49,'boltztrap.transdos',        'unknown',    'formatted',0\n"+
-                    "50,'boltztrap.sigxx',        'unknown',    'formatted',0\n"+
-                    "51,'boltztrap.sigxxx',        'unknown',    'formatted',0\n"+
-                    "21,'boltztrap.trace',           'unknown',    'formatted',0\n"+
-                    "22,'boltztrap.condtens',           'unknown',    'formatted',0\n"+
-                    "24,'boltztrap.halltens',           'unknown',    'formatted',0\n"+
-                    "30,'boltztrap_BZ.cube',           'unknown',    'formatted',0\n"+
-                    "35,'boltztrap.banddat',           'unknown',    'formatted',0\n"+
-                    "36,'boltztrap_band.gpl',           'unknown',    'formatted',0\n")
+        with open(def_file_name, 'w') as f:
+            f.write(_get_def_string(self._bs.is_spin_polarized))
 
     def _make_proj_files(self, file_name, def_file_name):
-        for o in Orbital.all_orbitals:
-            for site_nb in range(0, len(self._bs._structure.sites)):
-                if o in self._bs._projections[Spin.up][0][0]:
-                    with open(file_name+"_"+str(site_nb)+"_"+str(o), 'w') as f:
-                        f.write(self._bs._structure.composition.formula+"\n")
-                        f.write(str(len(self._bs.kpoints))+"\n")
-                        for i in range(len(self._bs.kpoints)):
-                            tmp_proj = []
-                            for spin in self._bs._bands:
-                                for j in range(int(math.floor(self._bs._nb_bands * 0.9))):
-                                    tmp_proj.append(self._bs._projections[spin][j][i][o][site_nb])
-                            #TODO deal with the sorting going on at the energy level!!!
-                            f.write("%12.8f %12.8f %12.8f %d\n"
-                                    % (self._bs.kpoints[i].frac_coords[0],
-                                       self._bs.kpoints[i].frac_coords[1],
-                                       self._bs.kpoints[i].frac_coords[2], len(tmp_proj)))
-                            for j in range(len(tmp_proj)):
-                                f.write("%18.8f\n" % float(tmp_proj[j]))
-        with open(def_file_name,'w') as f:
-            so = ""
-            if self._bs.is_spin_polarized:
-                so = "so"
-            f.write("5, 'boltztrap.intrans',      'old',    'formatted',0\n"+
-                    "6,'boltztrap.outputtrans',      'unknown',    'formatted',0\n"+
-                    "20,'boltztrap.struct',         'old',    'formatted',0\n"+
-                    "10,'boltztrap.energy"+so+"',         'old',    'formatted',0\n"+
-                    "48,'boltztrap.engre',         'unknown',    'unformatted',0\n"+
-                    "49,'boltztrap.transdos',        'unknown',    'formatted',0\n"+
-                    "50,'boltztrap.sigxx',        'unknown',    'formatted',0\n"+
-                    "51,'boltztrap.sigxxx',        'unknown',    'formatted',0\n"+
-                    "21,'boltztrap.trace',           'unknown',    'formatted',0\n"+
-                    "22,'boltztrap.condtens',           'unknown',    'formatted',0\n"+
-                    "24,'boltztrap.halltens',           'unknown',    'formatted',0\n"+
-                    "30,'boltztrap_BZ.cube',           'unknown',    'formatted',0\n"+
-                    "35,'boltztrap.banddat',           'unknown',    'formatted',0\n"+
-                    "36,'boltztrap_band.gpl',           'unknown',    'formatted',0\n")
-            i = 1000
-            for o in Orbital.all_orbitals:
-                for site_nb in range(0, len(self._bs._structure.sites)):
-                    if o in self._bs._projections[Spin.up][0][0]:
-                        f.write(str(i)+",\'"+file_name+"_"+str(site_nb)+"_"+str(o)
-                                + "\' \'old\', \'formatted\',0\n")
-                        i += 1
+        proj_files = _get_proj_strings(self._bs)
+        for name, contents in proj_files:
+            with open(file_name + "_" + name, 'w') as f:
+                f.write(contents)
+        with open(def_file_name, 'w') as f:
+            f.write(_get_def_string(
+                self._bs.is_spin_polarized,
+                [file_name + "_" + name for name, contents in proj_files]))
 
     def _make_intrans_file(self, file_name,
                            doping=[1e15, 1e16, 1e17, 1e18, 1e19, 1e20], type="BOLTZ", band_nb=None):
-        if type == "BOLTZ":
-            with open(file_name, 'w') as fout:
-                fout.write("GENE          # use generic interface\n")
-                fout.write("1 0 0 0.0         # iskip (not presently used) idebug setgap shiftgap \n")
-                fout.write(
-                    "0.0 %f 0.1 %6.1f     # Fermilevel (Ry),energygrid,energy span around Fermilevel, "
-                    "number of electrons\n"
-                    % (Energy(self.energy_grid, "eV").to("Ry"), self._nelec))
-                fout.write("CALC                    # CALC (calculate expansion coeff), NOCALC read from file\n")
-                fout.write("%d                        # lpfac, number of latt-points per k-point\n" % self.lpfac)
-                fout.write("BOLTZ                     # run mode (only BOLTZ is supported)\n")
-                fout.write(".15                       # (efcut) energy range of chemical potential\n")
-                fout.write("800. 100.                  # Tmax, temperature grid\n")
-                fout.write("-1.  # energyrange of bands given DOS output sig_xxx and dos_xxx (xxx is band number)\n")
-                fout.write(self.dos_type+"\n")
-                fout.write("0 0 0 0 0\n")
-                fout.write(str(2*len(doping))+"\n")
-                for d in doping:
-                    fout.write(str(d)+"\n")
-                for d in doping:
-                    fout.write(str(-d)+"\n")
-        elif type == "FERMI":
-            with open(file_name, 'w') as fout:
-                fout.write("GENE          # use generic interface\n")
-                fout.write("1 0 0 0.0         # iskip (not presently used) idebug setgap shiftgap \n")
-                fout.write(
-                    "0.0 %f 0.1 %6.1f     # Fermilevel (Ry),energygrid,energy span around Fermilevel, "
-                    "number of electrons\n"
-                    % (Energy(self.energy_grid, "eV").to("Ry"), self._nelec))
-                fout.write("CALC                    # CALC (calculate expansion coeff), NOCALC read from file\n")
-                fout.write("%d                        # lpfac, number of latt-points per k-point\n" % self.lpfac)
-                fout.write("FERMI                     # run mode (only BOLTZ is supported)\n")
-                fout.write(str(band_nb+1))
+        with open(file_name, 'w') as fout:
+            fout.write(_get_intrans_string(
+                self._nelec, self.energy_grid, self.lpfac, self.dos_type,
+                doping, type, band_nb))
 
     def _make_all_files(self, path):
         if self._bs.is_spin_polarized:
@@ -241,9 +127,15 @@ class BoltztrapRunner():
         self._make_struc_file(os.path.join(path, "boltztrap.struct"))
         self._make_intrans_file(os.path.join(path, "boltztrap.intrans"), type=self.type, band_nb=self.band_nb)
         self._make_def_file("BoltzTraP.def")
-        if len(self._bs._projections) != 0:
+        if self._bs.projections is not None:
             self._make_proj_files(os.path.join(path,"boltztrap.proj"), os.path.join(path, "BoltzTraP.def"))
 
+    @requires(which('x_trans'),
+              "BoltztrapRunner requires the executables 'x_trans' to be in "
+              "the path. Please download the Boltztrap at "
+              "http://www.icams.de/content/departments/ams/madsen/boltztrap"
+              ".html and follow the instructions in the README to compile "
+              "Bolztrap accordingly. Then add x_trans to your path")
     def run(self, prev_sigma=None, path_dir=None, convergence=True):
         if self.type == "FERMI":
             convergence=False
@@ -295,20 +187,7 @@ class BoltztrapRunner():
         #here we check if the doping levels were well computed
         #sometimes boltztrap mess this up because of two small energy grids
         analyzer = BoltztrapAnalyzer.from_files(path_dir)
-        doping_ok = True
-        for doping in ['n', 'p']:
-            for c in analyzer.mu_doping[doping]:
-                if len(analyzer.mu_doping[doping][c]) != len(analyzer.doping[doping]):
-                    doping_ok = False
-                    break
-                if doping == 'p' and \
-                        sorted(analyzer.mu_doping[doping][c], reverse=True) != analyzer.mu_doping[doping][c]:
-                    doping_ok = False
-                    break
-                if doping == 'n' and sorted(analyzer.mu_doping[doping][c]) != analyzer.mu_doping[doping][c]:
-                    doping_ok = False
-                    break
-        if not doping_ok:
+        if not _is_doping_ok(analyzer):
             self.energy_grid /= 10
             print "lowers energy grid to "+str(self.energy_grid)
             if self.energy_grid < 0.00005:
@@ -979,3 +858,329 @@ class BoltztrapPlotter():
         plt.yticks(fontsize=25)
         return plt
 
+
+def get_bs_hash(bs):
+    """
+    Returns a hash of the data of a band structure that determines the
+    BoltzTraP inputs, i.e., the eigenvalues, fermi level, kpoints, structure
+    and projections.
+
+    Args:
+        bs: A band structure object.
+
+    Returns:
+        The hash as a hexadecimal string.
+    """
+    h = hashlib.md5()
+    h.update(np.ascontiguousarray(bs._band_array).tostring())
+    h.update(repr(float(bs.efermi)))
+    h.update(np.array([k.frac_coords for k in bs.kpoints],
+                      dtype=float).tostring())
+    structure = bs._structure
+    if structure is not None:
+        h.update(np.array(structure.lattice.matrix, dtype=float).tostring())
+        h.update(np.array(structure.frac_coords, dtype=float).tostring())
+        h.update(" ".join([str(site.species_and_occu)
+                           for site in structure]))
+    if bs.projections is not None:
+        h.update(np.ascontiguousarray(bs.projections).tostring())
+    return h.hexdigest()
+
+
+def _write_bs_inputs(bs, path):
+    """
+    Writes the BoltzTraP input files that depend only on the band structure,
+    i.e., the energy, struct, proj and def files, in a directory. The def file
+    refers to the proj files by relative paths.
+    """
+    files = [("boltztrap.energyso" if bs.is_spin_polarized
+              else "boltztrap.energy", _get_energy_string(bs)),
+             ("boltztrap.struct", _get_struct_string(bs._structure))]
+    proj_files = [("boltztrap.proj_" + name, contents)
+                  for name, contents in _get_proj_strings(bs)]
+    files.extend(proj_files)
+    files.append(("BoltzTraP.def", _get_def_string(
+        bs.is_spin_polarized, [name for name, contents in proj_files])))
+    for name, contents in files:
+        with open(os.path.join(path, name), "w") as f:
+            f.write(contents)
+
+
+def _get_kpoint_blocks(bs, values):
+    """
+    Formats a (kpoint, value) array in the blocks of the BoltzTraP energy
+    and proj files.
+    """
+    lines = []
+    for kpt, v in zip(bs.kpoints, values):
+        lines.append("%12.8f %12.8f %12.8f %d" % (kpt.frac_coords[0],
+                                                  kpt.frac_coords[1],
+                                                  kpt.frac_coords[2], len(v)))
+        lines.extend(["%18.8f" % x for x in v])
+    return "\n".join(lines) + "\n"
+
+
+def _get_eigenvalue_order(bs):
+    """
+    Returns the (kpoint, value) array of the eigenvalues of all spins at each
+    kpoint relative to the fermi level, and the permutation sorting them
+    along each kpoint, which is applied to both the energies and the
+    projections.
+    """
+    nbands = int(math.floor(bs.nb_bands * 0.9))
+    nkpts = len(bs.kpoints)
+    eigs = bs._band_array[:, :nbands] - bs.efermi
+    eigs = eigs.transpose((2, 0, 1)).reshape((nkpts, -1))
+    return eigs, np.argsort(eigs, axis=1, kind="mergesort")
+
+
+def _get_energy_string(bs):
+    eigs, order = _get_eigenvalue_order(bs)
+    nkpts = len(bs.kpoints)
+    #Sorted eigenvalues of all spins at each kpoint in Ry.
+    eigs = eigs[np.arange(nkpts)[:, None], order] * Energy(1, "eV").to("Ry")
+    return "test\n" + str(nkpts) + "\n" + _get_kpoint_blocks(bs, eigs)
+
+
+def _get_struct_string(structure):
+    sym = SymmetryFinder(structure, symprec=0.01)
+    lines = [structure.composition.formula + " " +
+             str(sym.get_spacegroup_symbol())]
+    for i in range(3):
+        lines.append("".join(["%12.5f" % Length(structure.lattice.matrix[i][j],
+                                                "ang").to("bohr")
+                              for j in range(3)]))
+    ops = sym.get_symmetry_dataset()['rotations']
+    lines.append(str(len(ops)))
+    for c in ops:
+        lines.append('\n'.join([' '.join([str(int(i)) for i in row])
+                                for row in c]))
+    return "\n".join(lines) + "\n"
+
+
+def _get_proj_strings(bs):
+    if bs.projections is None:
+        return []
+    nbands = int(math.floor(bs.nb_bands * 0.9))
+    nkpts = len(bs.kpoints)
+    header = bs._structure.composition.formula + "\n" + str(nkpts) + "\n"
+    #The projections are sorted in the order of the energies in the energy
+    #file.
+    order = _get_eigenvalue_order(bs)[1]
+    proj = bs.projections[:, :nbands].transpose((2, 0, 1, 3, 4))
+    proj = proj.reshape((nkpts, -1) + proj.shape[3:])
+    proj = proj[np.arange(nkpts)[:, None], order]
+    proj_files = []
+    for o, orb in enumerate(bs.projection_orbitals):
+        for site_nb in range(proj.shape[3]):
+            proj_files.append(("{}_{}".format(site_nb, orb),
+                               header + _get_kpoint_blocks(
+                                   bs, proj[:, :, o, site_nb])))
+    return proj_files
+
+
+def _get_def_string(spin_polarized, proj_files=()):
+    so = "so" if spin_polarized else ""
+    lines = ["5, 'boltztrap.intrans',      'old',    'formatted',0",
+             "6,'boltztrap.outputtrans',      'unknown',    'formatted',0",
+             "20,'boltztrap.struct',         'old',    'formatted',0",
+             "10,'boltztrap.energy" + so +
+             "',         'old',    'formatted',0",
+             "48,'boltztrap.engre',         'unknown',    'unformatted',0",
+             "49,'boltztrap.transdos',        'unknown',    'formatted',0",
+             "50,'boltztrap.sigxx',        'unknown',    'formatted',0",
+             "51,'boltztrap.sigxxx',        'unknown',    'formatted',0",
+             "21,'boltztrap.trace',           'unknown',    'formatted',0",
+             "22,'boltztrap.condtens',           'unknown',    'formatted',0",
+             "24,'boltztrap.halltens',           'unknown',    'formatted',0",
+             "30,'boltztrap_BZ.cube',           'unknown',    'formatted',0",
+             "35,'boltztrap.banddat',           'unknown',    'formatted',0",
+             "36,'boltztrap_band.gpl',           'unknown',    'formatted',0"]
+    for i, file_name in enumerate(proj_files):
+        lines.append(str(1000 + i) + ",'" + file_name +
+                     "' 'old', 'formatted',0")
+    return "\n".join(lines) + "\n"
+
+
+def _get_intrans_string(nelec, energy_grid, lpfac, dos_type,
+                        doping=(1e15, 1e16, 1e17, 1e18, 1e19, 1e20),
+                        type="BOLTZ", band_nb=None):
+    lines = ["GENE          # use generic interface",
+             "1 0 0 0.0         # iskip (not presently used) idebug setgap "
+             "shiftgap ",
+             "0.0 %f 0.1 %6.1f     # Fermilevel (Ry),energygrid,energy span "
+             "around Fermilevel, number of electrons"
+             % (Energy(energy_grid, "eV").to("Ry"), nelec),
+             "CALC                    # CALC (calculate expansion coeff), "
+             "NOCALC read from file",
+             "%d                        # lpfac, number of latt-points per "
+             "k-point" % lpfac]
+    if type == "BOLTZ":
+        lines.extend(
+            ["BOLTZ                     # run mode (only BOLTZ is "
+             "supported)",
+             ".15                       # (efcut) energy range of chemical "
+             "potential",
+             "800. 100.                  # Tmax, temperature grid",
+             "-1.  # energyrange of bands given DOS output sig_xxx and "
+             "dos_xxx (xxx is band number)",
+             dos_type, "0 0 0 0 0", str(2 * len(doping))])
+        lines.extend([str(d) for d in doping])
+        lines.extend([str(-d) for d in doping])
+        return "\n".join(lines) + "\n"
+    elif type == "FERMI":
+        lines.extend(["FERMI                     # run mode (only BOLTZ is "
+                      "supported)", str(band_nb + 1)])
+        return "\n".join(lines)
+    return ""
+
+
+def _is_doping_ok(analyzer):
+    """
+    Checks if the doping levels were well computed. Sometimes boltztrap mess
+    this up because of too small energy grids.
+    """
+    for doping in ['n', 'p']:
+        for c in analyzer.mu_doping[doping]:
+            mu = analyzer.mu_doping[doping][c]
+            if len(mu) != len(analyzer.doping[doping]):
+                return False
+            if mu != sorted(mu, reverse=(doping == 'p')):
+                return False
+    return True
+
+
+def _run_boltztrap_job(args):
+    """
+    Runs a single BoltzTraP job in its own temporary directory. Only Python
+    primitives are passed to support parallel processing. Failures of the
+    executable and errors reading its outputs are reported as error messages
+    including the stderr of the last run.
+
+    Returns:
+        (index, BoltztrapAnalyzer, None) or (index, None, error message)
+    """
+    i, (input_dir, spin_polarized, nelec, energy_grid, lpfac, dos_type,
+        run_type, band_nb, convergence, executable) = args
+    path = tempfile.mkdtemp()
+    err = ""
+    try:
+        for name in os.listdir(input_dir):
+            shutil.copy(os.path.join(input_dir, name), path)
+        cmd = [executable, "BoltzTraP"]
+        if spin_polarized:
+            cmd.append("-so")
+        prev_sigma = None
+        while True:
+            with open(os.path.join(path, "boltztrap.intrans"), "w") as f:
+                f.write(_get_intrans_string(nelec, energy_grid, lpfac,
+                                            dos_type, type=run_type,
+                                            band_nb=band_nb))
+            p = subprocess.Popen(cmd, cwd=path, stdout=subprocess.PIPE,
+                                 stdin=subprocess.PIPE,
+                                 stderr=subprocess.PIPE)
+            out, err = p.communicate()
+            if "STOP error in factorization" in out + err:
+                raise BoltztrapError("STOP error in factorization")
+            if p.returncode != 0:
+                raise BoltztrapError("{} exited with code {}: {}".format(
+                    executable, p.returncode, err.strip()))
+            with open(os.path.join(path, "boltztrap.outputtrans")) as f:
+                warning = any(["WARNING" in l for l in f])
+            if warning:
+                lpfac *= 2
+                if lpfac > 100:
+                    raise BoltztrapError("lpfac higher than 100 and still a "
+                                         "warning")
+                continue
+            analyzer = BoltztrapAnalyzer.from_files(path)
+            if not _is_doping_ok(analyzer):
+                energy_grid /= 10
+                if energy_grid < 0.00005:
+                    raise BoltztrapError("energy grid lower than 0.00005 and "
+                                         "still no good doping")
+                #Restart the lpfac convergence on the finer grid.
+                prev_sigma = None
+                continue
+            if not convergence:
+                return i, analyzer, None
+            #Test if the effective mass converges with lpfac.
+            sigma = sum(analyzer.get_eig_average_eff_mass_tensor()['n']) / 3
+            if prev_sigma is not None and \
+                    abs(sigma - prev_sigma) / prev_sigma <= 0.05:
+                return i, analyzer, None
+            prev_sigma = sigma
+            lpfac *= 2
+            if lpfac > 100:
+                raise BoltztrapError("lpfac higher than 100 and still not "
+                                     "converged")
+    except BoltztrapError as ex:
+        return i, None, ex.msg
+    except (IOError, OSError, ValueError, IndexError) as ex:
+        return i, None, "{}: {}".format(ex, err.strip())
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def run_boltztrap_batch(runners, ncpus=None, convergence=True,
+                        executable="x_trans"):
+    """
+    Runs BoltzTraP for many band structures. Each job runs in its own
+    temporary directory, which is deleted once its results are parsed, and
+    the jobs can be distributed over a pool of processes. The input files
+    that only depend on the band structure are written once per distinct
+    band structure (by hash) in a temporary directory, from which the jobs
+    copy them, and are deleted when the generator is exhausted or closed.
+
+    Args:
+        runners ([BoltztrapRunner]): The runners defining the band
+            structures and BoltzTraP settings of the jobs.
+        ncpus (int): Number of processes to use. Default of None means serial
+            processing.
+        convergence (bool): Whether to increase lpfac until the average
+            effective mass is converged, as in BoltztrapRunner.run.
+        executable (str): Name or path of the BoltzTraP x_trans executable.
+
+    Returns:
+        A generator of (index, result) tuples in order of completion, where
+        index is the index of the runner in runners and result is either a
+        BoltztrapAnalyzer or a BoltztrapError if the job failed.
+    """
+    exe = which(executable)
+    if exe is None:
+        raise BoltztrapError("Executable {} not found".format(executable))
+    return _iter_boltztrap_results(runners, ncpus, convergence,
+                                   os.path.abspath(exe))
+
+
+def _iter_boltztrap_results(runners, ncpus, convergence, exe):
+    input_dir = tempfile.mkdtemp()
+    pool = None
+    try:
+        input_paths = {}
+        jobs = []
+        for runner in runners:
+            bs = runner._bs
+            key = get_bs_hash(bs)
+            if key not in input_paths:
+                input_paths[key] = os.path.join(input_dir, key)
+                os.mkdir(input_paths[key])
+                _write_bs_inputs(bs, input_paths[key])
+            jobs.append((input_paths[key], bs.is_spin_polarized,
+                         runner._nelec, runner.energy_grid, runner.lpfac,
+                         runner.dos_type, runner.type, runner.band_nb,
+                         convergence and runner.type != "FERMI", exe))
+        if ncpus:
+            import multiprocessing as mp
+            pool = mp.Pool(ncpus)
+            results = pool.imap_unordered(_run_boltztrap_job,
+                                          enumerate(jobs))
+        else:
+            results = (_run_boltztrap_job(job) for job in enumerate(jobs))
+        for i, analyzer, error in results:
+            yield i, analyzer if error is None else BoltztrapError(error)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        shutil.rmtree(input_dir, ignore_errors=True)
@@ -94,9 +94,7 @@ class Dos(MSONable):
         """
         from scipy.ndimage.filters import gaussian_filter1d
         smeared_dens = {}
-        diff = [self.energies[i + 1] - self.energies[i]
-                for i in xrange(len(self.energies) - 1)]
-        avgdiff = sum(diff) / len(diff)
+        avgdiff = np.mean(np.diff(self.energies))
         for spin, dens in self.densities.items():
             smeared_dens[spin] = gaussian_filter1d(dens, sigma / avgdiff)
         return smeared_dens
@@ -153,12 +151,10 @@ class Dos(MSONable):
         if not abs_tol:
             tol = tol * tdos.sum() / tdos.shape[0]
         energies = self.energies
-        below_fermi = [i for i in xrange(len(energies))
-                       if energies[i] < self.efermi and tdos[i] > tol]
-        above_fermi = [i for i in xrange(len(energies))
-                       if energies[i] > self.efermi and tdos[i] > tol]
-        vbm_start = max(below_fermi)
-        cbm_start = min(above_fermi)
+        vbm_start = np.max(np.nonzero((energies < self.efermi)
+                                      & (tdos > tol))[0])
+        cbm_start = np.min(np.nonzero((energies > self.efermi)
+                                      & (tdos > tol))[0])
         if vbm_start == cbm_start:
             return 0.0, self.efermi, self.efermi
         else:
@@ -273,6 +269,10 @@ class CompleteDos(Dos):
     a vasprun.xml file. You are unlikely to try to generate this object
     manually.
 
+    Internally, the partial densities are stored as a single array with
+    shape (site, orbital, spin, energy), from which the element, spd, site
+    and t2g/eg resolved DOS are obtained by grouped sums.
+
     Args:
         structure: Structure associated with this particular DOS.
         total_dos: total Dos for structure
@@ -291,8 +291,117 @@ class CompleteDos(Dos):
         Dos.__init__(self, total_dos.efermi, energies=total_dos.energies,
                      densities={k: np.array(d)
                                 for k, d in total_dos.densities.items()})
-        self.pdos = pdoss
         self.structure = structure
+        spins = self._spins
+        #Map the sites to their indices in the structure. The sites are
+        #normally the structure's own site objects, so they are first matched
+        #by identity to avoid expensive site comparisons.
+        ids = {id(site): i for i, site in enumerate(structure)}
+        sites = []
+        for site in pdoss:
+            sites.append(ids[id(site)] if id(site) in ids
+                         else structure.sites.index(site))
+        orbitals = set()
+        for orb_dos in pdoss.values():
+            orbitals.update(orb_dos.keys())
+        orbitals = sorted(orbitals, key=lambda orb: orb.vasp_index)
+        pdos = np.zeros((len(sites), len(orbitals), len(spins),
+                         len(self.energies)))
+        for i, orb_dos in enumerate(pdoss.values()):
+            for j, orb in enumerate(orbitals):
+                if orb in orb_dos:
+                    for k, spin in enumerate(spins):
+                        if spin in orb_dos[orb]:
+                            pdos[i, j, k] = orb_dos[orb][spin]
+        self._set_pdos_array(pdos, orbitals, sites)
+
+    @property
+    def _spins(self):
+        return [spin for spin in (Spin.up, Spin.down)
+                if spin in self.densities]
+
+    def _set_pdos_array(self, pdos, orbitals, sites):
+        """
+        Sets the partial densities.
+
+        Args:
+            pdos: Array of partial densities with shape
+                (site, orbital, spin, energy).
+            orbitals: The orbitals of the second axis.
+            sites: The indices in the structure of the sites of the first
+                axis.
+        """
+        order = np.argsort(sites, kind="mergesort")
+        self._pdos_array = pdos[order]
+        self._pdos_orbitals = list(orbitals)
+        self._pdos_sites = [sites[i] for i in order]
+        self._pdos = None
+        self._derived = {}
+
+    @property
+    def pdos(self):
+        """
+        Dict of partial densities of the form
+        {Site:{Orbital:{Spin:Densities}}}, where the densities are views of
+        the underlying array. Only built on first access.
+        """
+        if self._pdos is None:
+            spins = self._spins
+            self._pdos = {
+                self.structure[i]: {
+                    orb: {spin: self._pdos_array[j, k, l]
+                          for l, spin in enumerate(spins)}
+                    for k, orb in enumerate(self._pdos_orbitals)}
+                for j, i in enumerate(self._pdos_sites)}
+        return self._pdos
+
+    def _get_site_pdos(self, site):
+        """
+        Returns the (orbital, spin, energy) array of partial densities of a
+        site.
+        """
+        i = self._pdos_sites.index(self.structure.sites.index(site))
+        return self._pdos_array[i]
+
+    def _get_grouped_densities(self, site_labels=None, orbital_labels=None):
+        """
+        Sums the partial densities by groups of sites and orbitals.
+
+        Args:
+            site_labels: A label for each site having partial densities,
+                e.g., its species. Sites with the same label are summed.
+                None sums all sites.
+            orbital_labels: A label for each orbital, e.g., its type.
+                Orbitals with the same label are summed. None sums all
+                orbitals.
+
+        Returns:
+            Dict of {(site label, orbital label): {Spin: densities}}.
+        """
+        def get_indicator(labels, n):
+            if labels is None:
+                labels = [None] * n
+            groups = []
+            for label in labels:
+                if label not in groups:
+                    groups.append(label)
+            indicator = np.array([[label == g for g in groups]
+                                  for label in labels], dtype=float)
+            return groups, indicator.reshape((n, len(groups)))
+
+        site_groups, site_ind = get_indicator(site_labels,
+                                              len(self._pdos_sites))
+        orb_groups, orb_ind = get_indicator(orbital_labels,
+                                            len(self._pdos_orbitals))
+        #(orbital group, site, spin, energy) and then
+        #(site group, orbital group, spin, energy)
+        summed = np.tensordot(orb_ind, self._pdos_array, axes=([0], [1]))
+        summed = np.tensordot(site_ind, summed, axes=([0], [1]))
+        spins = self._spins
+        return {(sg, og): {spin: summed[i, j, k]
+                           for k, spin in enumerate(spins)}
+                for i, sg in enumerate(site_groups)
+                for j, og in enumerate(orb_groups)}
 
     def get_site_orbital_dos(self, site, orbital):
         """
@@ -305,7 +414,9 @@ class CompleteDos(Dos):
         Returns:
             Dos containing densities for orbital of site.
         """
-        return Dos(self.efermi, self.energies, self.pdos[site][orbital])
+        pdos = self._get_site_pdos(site)[self._pdos_orbitals.index(orbital)]
+        return Dos(self.efermi, self.energies,
+                   {spin: pdos[i] for i, spin in enumerate(self._spins)})
 
     def get_site_dos(self, site):
         """
@@ -317,8 +428,9 @@ class CompleteDos(Dos):
         Returns:
             Dos containing summed orbital densities for site.
         """
-        site_dos = reduce(add_densities, self.pdos[site].values())
-        return Dos(self.efermi, self.energies, site_dos)
+        site_dos = self._get_site_pdos(site).sum(axis=0)
+        return Dos(self.efermi, self.energies,
+                   {spin: site_dos[i] for i, spin in enumerate(self._spins)})
 
     def get_site_t2g_eg_resolved_dos(self, site):
         """
@@ -331,19 +443,18 @@ class CompleteDos(Dos):
             A dict {"e_g": Dos, "t2g": Dos} containing summed e_g and t2g DOS
             for the site.
         """
-        t2g_dos = []
-        eg_dos = []
-        for s, atom_dos in self.pdos.items():
-            if s == site:
-                for orb, pdos in atom_dos.items():
-                    if orb in (Orbital.dxy, Orbital.dxz, Orbital.dyz):
-                        t2g_dos.append(pdos)
-                    elif orb in (Orbital.dx2, Orbital.dz2):
-                        eg_dos.append(pdos)
-        return {"t2g": Dos(self.efermi, self.energies,
-                           reduce(add_densities, t2g_dos)),
-                "e_g": Dos(self.efermi, self.energies,
-                           reduce(add_densities, eg_dos))}
+        pdos = self._get_site_pdos(site)
+        result = {}
+        for name, orbitals in (("t2g", (Orbital.dxy, Orbital.dxz,
+                                        Orbital.dyz)),
+                               ("e_g", (Orbital.dx2, Orbital.dz2))):
+            inds = [i for i, orb in enumerate(self._pdos_orbitals)
+                    if orb in orbitals]
+            dens = pdos[inds].sum(axis=0)
+            result[name] = Dos(self.efermi, self.energies,
+                               {spin: dens[i]
+                                for i, spin in enumerate(self._spins)})
+        return result
 
     def get_spd_dos(self):
         """
@@ -352,17 +463,12 @@ class CompleteDos(Dos):
         Returns:
             dict of {orbital: Dos}, e.g. {"s": Dos object, ...}
         """
-        spd_dos = {}
-        for atom_dos in self.pdos.values():
-            for orb, pdos in atom_dos.items():
-                orbital_type = orb.orbital_type
-                if orbital_type not in spd_dos:
-                    spd_dos[orbital_type] = pdos
-                else:
-                    spd_dos[orbital_type] = \
-                        add_densities(spd_dos[orbital_type], pdos)
+        if "spd" not in self._derived:
+            self._derived["spd"] = self._get_grouped_densities(
+                orbital_labels=[orb.orbital_type
+                                for orb in self._pdos_orbitals])
         return {orb: Dos(self.efermi, self.energies, densities)
-                for orb, densities in spd_dos.items()}
+                for (_, orb), densities in self._derived["spd"].items()}
 
     def get_element_dos(self):
         """
@@ -371,25 +477,35 @@ class CompleteDos(Dos):
         Returns:
             dict of {Element: Dos}
         """
-
-        el_dos = {}
-        for site, atom_dos in self.pdos.items():
-            el = site.specie
-            for pdos in atom_dos.values():
-                if el not in el_dos:
-                    el_dos[el] = pdos
-                else:
-                    el_dos[el] = add_densities(el_dos[el], pdos)
+        if "element" not in self._derived:
+            self._derived["element"] = self._get_grouped_densities(
+                site_labels=[self.structure[i].specie
+                             for i in self._pdos_sites])
         return {el: Dos(self.efermi, self.energies, densities)
-                for el, densities in el_dos.items()}
+                for (el, _), densities in self._derived["element"].items()}
 
     @classmethod
     def from_dict(cls, d):
         """
-        Returns CompleteDos object from dict representation.
+        Returns CompleteDos object from dict representation. Both the packed
+        representation of the partial densities and the original one of a
+        list of {orbital: {"densities": {spin: densities}}} for each site are
+        supported.
         """
         tdos = Dos.from_dict(d)
         struct = Structure.from_dict(d["structure"])
+        if isinstance(d["pdos"], dict):
+            dos = CompleteDos(struct, tdos, {})
+            packed = d["pdos"]
+            pdos = np.array([packed["densities"][str(int(spin))]
+                             for spin in dos._spins], dtype=float)
+            pdos = pdos.reshape((len(dos._spins), len(packed["sites"]),
+                                 len(packed["orbitals"]), -1))
+            dos._set_pdos_array(
+                pdos.transpose((1, 2, 0, 3)),
+                [Orbital.from_string(orb) for orb in packed["orbitals"]],
+                packed["sites"])
+            return dos
         pdoss = {}
         for i in xrange(len(d["pdos"])):
             at = struct[i]
@@ -404,23 +520,22 @@ class CompleteDos(Dos):
     @property
     def to_dict(self):
         """
-        Json-serializable dict representation of CompleteDos.
+        Json-serializable dict representation of CompleteDos. The partial
+        densities are packed as {"sites": [site indices], "orbitals":
+        [orbitals], "densities": {spin: array(site, orbital, energy)}}.
         """
         d = {"@module": self.__class__.__module__,
              "@class": self.__class__.__name__, "efermi": self.efermi,
              "structure": self.structure.to_dict,
-             "energies": list(self.energies),
-             "densities": {str(spin): list(dens)
+             "energies": self.energies.tolist(),
+             "densities": {str(spin): np.asarray(dens).tolist()
                            for spin, dens in self.densities.items()},
-             "pdos": []}
-        if len(self.pdos) > 0:
-            for at in self.structure:
-                dd = {}
-                for orb, pdos in self.pdos[at].items():
-                    dd[str(orb)] = {"densities": {str(int(spin)): list(dens)
-                                                  for spin,
-                                                  dens in pdos.items()}}
-                d["pdos"].append(dd)
+             "pdos": {"sites": list(self._pdos_sites),
+                      "orbitals": [str(orb) for orb in self._pdos_orbitals],
+                      "densities": {
+                          str(int(spin)): self._pdos_array[:, :, i].tolist()
+                          for i, spin in enumerate(self._spins)}}}
+        if len(self._pdos_sites) > 0:
             d["atom_dos"] = {str(at): dos.to_dict for at,
                              dos in self.get_element_dos().items()}
             d["spd_dos"] = {str(orb): dos.to_dict for orb,
@@ -444,3 +559,76 @@ def add_densities(density1, density2):
     """
     return {spin: np.array(density1[spin]) + np.array(density2[spin])
             for spin in density1.keys()}
+
+
+def smear_densities(densities, delta_e, sigma, smearing="gaussian"):
+    """
+    Smears densities on a uniform energy grid by convolution with a Gaussian
+    or Lorentzian. All densities are smeared in a single FFT-based pass.
+
+    Args:
+        densities: Array of densities with the energies along the last axis,
+            e.g., with shape (materials, energies).
+        delta_e: Spacing of the energy grid.
+        sigma: Std dev of the Gaussian or half width at half maximum of the
+            Lorentzian.
+        smearing: "gaussian" or "lorentzian".
+
+    Returns:
+        Array of smeared densities with the same shape as densities.
+    """
+    densities = np.asarray(densities, dtype=float)
+    n = densities.shape[-1]
+    if smearing == "gaussian":
+        m = min(int(np.ceil(5 * sigma / delta_e)), n - 1)
+        x = np.arange(-m, m + 1) * delta_e
+        kernel = np.exp(-x ** 2 / (2 * sigma ** 2))
+    elif smearing == "lorentzian":
+        #The tails of the Lorentzian decay slowly, so the kernel spans the
+        #whole grid.
+        m = n - 1
+        x = np.arange(-m, m + 1) * delta_e
+        kernel = sigma / (x ** 2 + sigma ** 2)
+    else:
+        raise ValueError("Unknown smearing {}".format(smearing))
+    kernel /= kernel.sum()
+    nfft = 2 ** int(np.ceil(np.log2(n + 2 * m)))
+    conv = np.fft.irfft(np.fft.rfft(densities, nfft) *
+                        np.fft.rfft(kernel, nfft), nfft)
+    return conv[..., m:m + n]
+
+
+def get_resampled_densities(doss, energies, sigma=None, smearing="gaussian",
+                            spin=None, relative_to_efermi=False):
+    """
+    Resamples many Dos (or CompleteDos) objects onto a common energy grid by
+    linear interpolation and optionally smears them, e.g., to compute DOS
+    fingerprints of many materials. Densities outside the energy range of a
+    Dos are zero.
+
+    Args:
+        doss: Sequence of Dos objects.
+        energies: The common energy grid, which must be uniform if the
+            densities are smeared.
+        sigma: Std dev of the Gaussian or half width at half maximum of the
+            Lorentzian smearing. None means no smearing.
+        smearing: "gaussian" or "lorentzian".
+        spin: Spin of the densities. None sums all spins.
+        relative_to_efermi: If True, the energies of each Dos are taken
+            relative to its fermi level.
+
+    Returns:
+        Array of densities with shape (len(doss), len(energies)).
+    """
+    energies = np.asarray(energies, dtype=float)
+    densities = np.empty((len(doss), len(energies)))
+    for i, dos in enumerate(doss):
+        shift = dos.efermi if relative_to_efermi else 0
+        densities[i] = np.interp(energies, dos.energies - shift,
+                                 dos.get_densities(spin), left=0, right=0)
+    if sigma:
+        delta_e = np.diff(energies)
+        if not np.allclose(delta_e, delta_e[0]):
+            raise ValueError("Smearing requires a uniform energy grid.")
+        densities = smear_densities(densities, delta_e[0], sigma, smearing)
+    return densities
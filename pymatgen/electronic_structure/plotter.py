@@ -683,7 +683,7 @@ class BSPlotterProjected(BSPlotter):
     """
 
     def __init__(self, bs):
-        if len(bs._projections) == 0:
+        if bs.projections is None:
             raise ValueError("try to plot projections"
                              " on a band structure without any")
         BSPlotter.__init__(self, bs)
@@ -4,10 +4,13 @@ import unittest
 import os
 import json
 
+import numpy as np
+
 from pymatgen.electronic_structure.bandstructure import Kpoint
 from pymatgen import Lattice
 from pymatgen.electronic_structure.core import Spin, Orbital
-from pymatgen.electronic_structure.bandstructure import BandStructureSymmLine
+from pymatgen.electronic_structure.bandstructure import \
+    BandStructureSymmLine, get_reconstructed_band_structure
 
 test_dir = os.path.join(os.path.dirname(__file__), "..", "..", "..",
                         'test_files')
@@ -45,6 +48,7 @@ class BandStructureSymmLine_test(unittest.TestCase):
             self.assertAlmostEqual(self.bs.get_projection_on_elements()[Spin.up][22][25]['Cu'], 0.8327)
             self.assertAlmostEqual(self.bs.get_projections_on_elts_and_orbitals({'Cu':['s','d']})[Spin.up][25][0]['Cu']['s'], 0.0027)
             self.assertAlmostEqual(self.bs.get_projections_on_elts_and_orbitals({'Cu':['s','d']})[Spin.up][25][0]['Cu']['d'], 0.8495999999999999)
+            self.bs_proj = self.bs
 
         with open(os.path.join(test_dir, "CaO_2605_bandstructure.json"), "rb") as f:
             d = json.loads(f.read())
@@ -72,6 +76,38 @@ class BandStructureSymmLine_test(unittest.TestCase):
             self.assertAlmostEqual(self.bs_spin._bands[Spin.down][5][10],
                                    1.6156)
 
+    def test_projections(self):
+        self.assertIsNone(self.bs.projections)
+        self.assertEqual(self.bs.projection_orbitals, [])
+        self.assertEqual(self.bs.get_projection_on_elements(), {})
+        proj = self.bs_proj.projections
+        self.assertEqual(proj.shape[:3],
+                         (1, self.bs_proj._nb_bands,
+                          len(self.bs_proj.kpoints)))
+        self.assertEqual(proj.shape[4], len(self.bs_proj._structure))
+        orbitals = self.bs_proj.projection_orbitals
+        self.assertEqual(orbitals[0], Orbital.s)
+        self.assertAlmostEqual(proj[0, 25, 0, orbitals.index(Orbital.dyz), 5],
+                               0.069)
+        species, proj_el = self.bs_proj.get_projection_on_elements_array()
+        self.assertEqual(sorted(species), ['Cu', 'O'])
+        self.assertAlmostEqual(proj_el[0, 25, 10, species.index('O')], 0.0328)
+        self.assertTrue(np.allclose(proj_el.sum(axis=3),
+                                    proj.sum(axis=(3, 4))))
+        keys, proj_orb = \
+            self.bs_proj.get_projections_on_elts_and_orbitals_array(
+                {'Cu': ['s', 'd']})
+        self.assertEqual(keys, [('Cu', 's'), ('Cu', 'd')])
+        self.assertAlmostEqual(proj_orb[0, 25, 0, 1], 0.8496)
+        #Round trip through the dict representation.
+        bs = BandStructureSymmLine.from_dict(
+            json.loads(json.dumps(self.bs_proj.to_dict)))
+        self.assertTrue(np.allclose(bs.projections, proj))
+        rec = get_reconstructed_band_structure([self.bs_proj, bs])
+        self.assertEqual(rec.projections.shape[2], 2 * proj.shape[2])
+        self.assertTrue(np.allclose(rec.projections[:, :, proj.shape[2]:],
+                                    proj))
+
     def test_properties(self):
         self.assertEqual(self.one_kpoint.frac_coords[0], 0.5)
         self.assertEqual(self.one_kpoint.frac_coords[1], 0.25)
@@ -130,6 +166,30 @@ class BandStructureSymmLine_test(unittest.TestCase):
         self.assertEqual(vbm_spin['kpoint'].frac_coords[2], 0.5, "wrong VBM kpoint frac coords")
         self.assertEqual(vbm_spin['kpoint'].label, "L", "wrong VBM kpoint label")
 
+    def test_get_direct_band_gap(self):
+        self.assertAlmostEqual(self.bs.get_direct_band_gap(), 4.0126)
+        self.assertAlmostEqual(self.bs_spin.get_direct_band_gap(), 2.9632)
+        #A fermi level above or below all bands has no direct gap.
+        d = self.bs.to_dict
+        for efermi in [1000, -1000]:
+            d["efermi"] = efermi
+            bs = BandStructureSymmLine.from_dict(d)
+            self.assertFalse(bs.is_metal())
+            self.assertRaises(ValueError, bs.get_direct_band_gap)
+
+    def test_band_edge_cache(self):
+        vbm = self.bs.get_vbm()
+        vbm["band_index"][Spin.up].append(100)
+        self.assertEqual(len(self.bs.get_vbm()["band_index"][Spin.up]), 3)
+        #A fermi level inside a band gives a metal.
+        d = self.bs.to_dict
+        d["efermi"] = vbm["energy"] - 0.01
+        bs = BandStructureSymmLine.from_dict(d)
+        self.assertTrue(bs.is_metal())
+        self.assertEqual(bs.get_band_gap()["energy"], 0.0)
+        self.assertFalse(self.bs.is_metal())
+        self.assertAlmostEqual(self.bs.get_band_gap()["energy"], 3.6348)
+
     def test_get_band_gap(self):
         bg = self.bs.get_band_gap()
         self.assertAlmostEqual(bg['energy'], 3.6348, "wrong gap energy")
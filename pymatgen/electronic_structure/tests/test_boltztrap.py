@@ -1,6 +1,17 @@
 import unittest
 import os
-from pymatgen.electronic_structure.boltztrap import BoltztrapAnalyzer
+import sys
+import json
+import stat
+import shutil
+import tempfile
+
+from pymatgen.electronic_structure.boltztrap import BoltztrapAnalyzer, \
+    BoltztrapRunner, BoltztrapError, run_boltztrap_batch, get_bs_hash, \
+    _write_bs_inputs
+from pymatgen.electronic_structure.bandstructure import \
+    BandStructureSymmLine
+from pymatgen.electronic_structure.core import Spin, Orbital
 
 test_dir = os.path.join(os.path.dirname(__file__), "..", "..", "..",
                         'test_files')
@@ -65,5 +76,152 @@ class BoltztrapAnalyzerTest(unittest.TestCase):
             self.assertAlmostEqual(list_n[i], ref_n[i])
 
 
+#A stub standing in for x_trans, which writes minimal BoltzTraP outputs. The
+#conductivities grow with lpfac up to lpfac = 20, so that convergence is
+#reached at lpfac = 40.
+STUB = """
+import os
+import sys
+fail = os.environ.get("BOLTZTRAP_STUB_FAIL")
+if fail == "factorization":
+    sys.stdout.write("STOP error in factorization")
+    sys.exit(0)
+elif fail == "crash":
+    sys.stderr.write("Segmentation fault")
+    sys.exit(139)
+elif fail == "no_output":
+    sys.stderr.write("Cannot open boltztrap.struct")
+    sys.exit(0)
+with open("boltztrap.intrans") as f:
+    lines = f.readlines()
+lpfac = int(lines[4].split()[0])
+c = 1e19 * min(lpfac, 20)
+mus = (0.2, 0.1)
+if os.environ.get("BOLTZTRAP_STUB_GRID"):
+    #The default energy grid gives wrong doping levels at lpfac = 20 and
+    #twice the conductivities of the finer grid, which converge at lpfac =
+    #80.
+    coarse = float(lines[2].split()[1]) > 1e-4
+    c = 1e19 * min(lpfac, 40) * (2 if coarse else 1)
+    if coarse and lpfac == 20:
+        mus = (0.1, 0.2)
+tens = [c, 0, 0, 0, c, 0, 0, 0, c]
+with open("boltztrap.outputtrans", "w") as f:
+    f.write("VBM 0.1\\nEgap: 0.05\\nDoping levels to be output for\\n")
+    f.write(" 1e18 1e19\\n -1e18 -1e19\\n")
+with open("boltztrap.condtens", "w") as f:
+    for mu in (0.1, 0.2, 0.3, 0.4):
+        f.write(" ".join(map(str, [mu, 300, 0.01] + 3 * tens)) + "\\n")
+with open("boltztrap.halltens", "w") as f:
+    for mu in (0.1, 0.2, 0.3, 0.4):
+        f.write(" ".join(map(str, [mu, 300, 0.01] + [0] * 27)) + "\\n")
+with open("boltztrap.transdos", "w") as f:
+    f.write(" # dos\\n0.1 1.0\\n0.2 2.0\\n")
+with open("boltztrap.condtens_fixdoping", "w") as f:
+    for n, mu in ((1e18, mus[0]), (1e19, mus[1]), (-1e18, 0.3),
+                  (-1e19, 0.4)):
+        f.write(" ".join(map(str, [300, n] + 3 * tens + [mu])) + "\\n")
+with open("boltztrap.halltens_fixdoping", "w") as f:
+    for n in (1e18, 1e19, -1e18, -1e19):
+        f.write(" ".join(map(str, [300, n] + [0] * 27)) + "\\n")
+"""
+
+
+class BoltztrapBatchRunnerTest(unittest.TestCase):
+
+    def setUp(self):
+        with open(os.path.join(test_dir, "Cu2O_361_bandstructure.json")) as f:
+            self.bs = BandStructureSymmLine.from_dict(json.load(f))
+        self.tmp_dir = tempfile.mkdtemp()
+        self.exe = os.path.join(self.tmp_dir, "x_trans")
+        with open(self.exe, "w") as f:
+            f.write("#!" + sys.executable + "\n" + STUB)
+        os.chmod(self.exe, stat.S_IRWXU)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+        os.environ.pop("BOLTZTRAP_STUB_FAIL", None)
+        os.environ.pop("BOLTZTRAP_STUB_GRID", None)
+
+    def test_bs_inputs(self):
+        d = self.bs.to_dict
+        bs = BandStructureSymmLine.from_dict(d)
+        self.assertEqual(get_bs_hash(bs), get_bs_hash(self.bs))
+        d["efermi"] += 0.1
+        bs = BandStructureSymmLine.from_dict(d)
+        self.assertNotEqual(get_bs_hash(bs), get_bs_hash(self.bs))
+        _write_bs_inputs(self.bs, self.tmp_dir)
+        files = os.listdir(self.tmp_dir)
+        proj_files = [f for f in files if f.startswith("boltztrap.proj_")]
+        self.assertEqual(len(proj_files), 9 * len(self.bs._structure))
+        with open(os.path.join(self.tmp_dir, "boltztrap.energy")) as f:
+            self.assertEqual(f.readline(), "test\n")
+        with open(os.path.join(self.tmp_dir, "BoltzTraP.def")) as f:
+            self.assertIn("'boltztrap.proj_0_s'", f.read())
+
+    def test_proj_sorting(self):
+        #Spin down bands shifted to interleave with the spin up bands, with
+        #projections offset by one to tell them apart.
+        d = self.bs.to_dict
+        d["bands"]["-1"] = [[e + 0.3 for e in band]
+                            for band in d["bands"]["1"]]
+        d["projections"]["-1"] = [
+            [{orb: [v + 1 for v in vals] for orb, vals in p.items()}
+             for p in band] for band in d["projections"]["1"]]
+        bs = BandStructureSymmLine.from_dict(d)
+        self.assertTrue(bs.is_spin_polarized)
+        _write_bs_inputs(bs, self.tmp_dir)
+        with open(os.path.join(self.tmp_dir, "boltztrap.proj_1_s")) as f:
+            lines = f.readlines()
+        nbands = int(bs.nb_bands * 0.9)
+        for k in [0, 1, len(bs.kpoints) - 1]:
+            start = 3 + k * (2 * nbands + 1)
+            #Projections of all spins and bands ordered by energy.
+            pairs = sorted(
+                [(bs._bands[spin][j][k],
+                  bs._projections[spin][j][k][Orbital.s][1])
+                 for spin in [Spin.up, Spin.down] for j in range(nbands)],
+                key=lambda x: x[0])
+            self.assertEqual([float(l) for l in
+                              lines[start:start + 2 * nbands]],
+                             [round(p, 8) for e, p in pairs])
+
+    def test_run_boltztrap_batch(self):
+        runners = [BoltztrapRunner(self.bs, 20, lpfac=10) for i in range(3)]
+        results = dict(run_boltztrap_batch(runners, ncpus=2,
+                                           executable=self.exe))
+        self.assertEqual(sorted(results.keys()), [0, 1, 2])
+        for analyzer in results.values():
+            self.assertAlmostEqual(analyzer.cond_doping['n'][300][0][0][0],
+                                   2e20)
+            self.assertEqual(analyzer.doping['p'], [1e18, 1e19])
+        results = list(run_boltztrap_batch(runners[:1], convergence=False,
+                                           executable=self.exe))
+        self.assertAlmostEqual(results[0][1].cond_doping['n'][300][0][0][0],
+                               1e20)
+        #Refining the energy grid restarts the lpfac convergence, instead of
+        #comparing with the conductivities of the coarser grid.
+        os.environ["BOLTZTRAP_STUB_GRID"] = "1"
+        results = list(run_boltztrap_batch(runners[:1], executable=self.exe))
+        self.assertAlmostEqual(results[0][1].cond_doping['n'][300][0][0][0],
+                               4e20)
+        os.environ.pop("BOLTZTRAP_STUB_GRID")
+        #Failed runs are reported without stopping the other jobs.
+        for fail in ["factorization", "crash", "no_output"]:
+            os.environ["BOLTZTRAP_STUB_FAIL"] = fail
+            results = list(run_boltztrap_batch(runners[:2], ncpus=2,
+                                               executable=self.exe))
+            self.assertEqual(len(results), 2)
+            for i, error in results:
+                self.assertIsInstance(error, BoltztrapError)
+                if fail == "crash":
+                    self.assertIn("exited with code 139: Segmentation fault",
+                                  error.msg)
+                elif fail == "no_output":
+                    self.assertIn("Cannot open boltztrap.struct", error.msg)
+        self.assertRaises(BoltztrapError, run_boltztrap_batch, runners,
+                          executable="not_an_x_trans")
+
+
 if __name__ == '__main__':
     unittest.main()
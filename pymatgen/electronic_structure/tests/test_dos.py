@@ -4,8 +4,11 @@ import unittest
 import os
 import json
 
+import numpy as np
+
 from pymatgen import Spin, Orbital
-from pymatgen.electronic_structure.dos import CompleteDos
+from pymatgen.electronic_structure.dos import CompleteDos, \
+    smear_densities, get_resampled_densities
 
 test_dir = os.path.join(os.path.dirname(__file__), "..", "..", "..",
                         'test_files')
@@ -47,6 +50,47 @@ class DosTest(unittest.TestCase):
         for spin in Spin.all_spins:
             self.assertAlmostEqual(sum(dens[spin]), sum(smeared[spin]))
 
+    def test_get_resampled_densities(self):
+        dos = self.dos
+        dens = get_resampled_densities([dos, dos], dos.energies)
+        self.assertEqual(dens.shape, (2, 301))
+        self.assertTrue(np.allclose(dens[1], dos.get_densities()))
+        dens = get_resampled_densities([dos], dos.energies, spin=Spin.down)
+        self.assertTrue(np.allclose(dens[0], dos.densities[Spin.down]))
+        energies = np.linspace(-5, 5, 101)
+        dens = get_resampled_densities([dos], energies,
+                                       relative_to_efermi=True)
+        self.assertAlmostEqual(dens[0, 50],
+                               dos.get_interpolated_value(dos.efermi)[
+                                   Spin.up] +
+                               dos.get_interpolated_value(dos.efermi)[
+                                   Spin.down])
+        self.assertEqual(get_resampled_densities([dos], [100, 101])[0, 1], 0)
+        smeared = get_resampled_densities([dos], energies, sigma=0.2,
+                                          relative_to_efermi=True)
+        #Smearing conserves the densities, apart from the tails leaking out
+        #of the energy window.
+        self.assertAlmostEqual(smeared.sum() / dens.sum(), 1, 1)
+        self.assertRaises(ValueError, get_resampled_densities, [dos],
+                          [0, 1, 3], 0.1)
+
+    def test_smear_densities(self):
+        dens = np.random.rand(3, 200)
+        for smearing in ["gaussian", "lorentzian"]:
+            smeared = smear_densities(dens, 0.01, 0.05, smearing)
+            m = 25 if smearing == "gaussian" else 199
+            x = np.arange(-m, m + 1) * 0.01
+            if smearing == "gaussian":
+                kernel = np.exp(-x ** 2 / (2 * 0.05 ** 2))
+            else:
+                kernel = 0.05 / (x ** 2 + 0.05 ** 2)
+            kernel /= kernel.sum()
+            for d, s in zip(dens, smeared):
+                self.assertTrue(np.allclose(
+                    s, np.convolve(d, kernel)[m:m + 200]))
+        self.assertRaises(ValueError, smear_densities, dens, 0.01, 0.05,
+                          "box")
+
 
 class CompleteDosTest(unittest.TestCase):
 
@@ -127,6 +171,30 @@ class CompleteDosTest(unittest.TestCase):
         self.assertTrue((abs(sum_spd.energies
                              - sum_element.energies) < 0.0001).all())
 
+    def test_packed_pdos(self):
+        d = json.loads(json.dumps(self.dos.to_dict))
+        self.assertEqual(len(d["pdos"]["sites"]), len(self.dos.structure))
+        self.assertEqual(d["pdos"]["orbitals"][0], "s")
+        dos = CompleteDos.from_dict(d)
+        site = dos.structure[4]
+        for orb, pdos in self.dos.pdos[self.dos.structure[4]].items():
+            for spin, dens in pdos.items():
+                self.assertTrue(np.allclose(dos.pdos[site][orb][spin], dens))
+        egt2g = dos.get_site_t2g_eg_resolved_dos(site)
+        self.assertAlmostEqual(sum(egt2g["t2g"].get_densities(Spin.up)),
+                               22.910399999999999)
+        self.assertAlmostEqual(
+            sum(dos.get_site_orbital_dos(site, Orbital.dxy).get_densities(
+                Spin.up)),
+            sum(self.dos.get_site_orbital_dos(
+                self.dos.structure[4], Orbital.dxy).get_densities(Spin.up)))
+        #Sites without partial densities are not serialized.
+        pdoss = {dos.structure[0]: dos.pdos[dos.structure[0]]}
+        partial = CompleteDos(dos.structure, dos, pdoss)
+        self.assertEqual(partial.to_dict["pdos"]["sites"], [0])
+        self.assertEqual(partial.get_element_dos().keys(),
+                         [dos.structure[0].specie])
+
     def test_str(self):
         self.assertIsNotNone(str(self.dos))
 
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+
+"""
+This module provides tools to perform phase stability analyses of entire
+databases of entries spanning many chemical systems at once.
+"""
+
+from __future__ import division
+
+import logging
+import itertools
+import collections
+
+import numpy as np
+
+from pymatgen.core.composition import Composition
+from pymatgen.core.periodic_table import Element
+from pymatgen.phasediagram.entries import PDEntry
+from pymatgen.phasediagram.pdmaker import PhaseDiagram, PhaseDiagramError
+from pymatgen.phasediagram.pdanalyzer import PDAnalyzer
+
+logger = logging.getLogger(__name__)
+
+
+def get_chemsys(composition):
+    """
+    Returns the chemical system of a composition as a sorted tuple of
+    element symbols, e.g., ("Fe", "Li", "O").
+    """
+    return tuple(sorted([el.symbol for el in composition.elements
+                         if composition[el] > Composition.amount_tolerance]))
+
+
+def _process_system(args):
+    """
+    Computes the hull of a single chemical system. Only Python primitives and
+    numpy arrays are passed to support parallel processing.
+
+    Args:
+        args: (symbols, fractions, energies, nown), where fractions are the
+            atomic fractions of the elements in symbols and energies the
+            energies per atom of all entries. The last nown entries are the
+            ones with exactly this chemical system, the others are stable
+            entries of the subsystems.
+
+    Returns:
+        (stable, e_above_hulls), where stable are the indices of the stable
+        entries among the last nown and e_above_hulls the energies above hull
+        of the last nown entries. (None, None) if the phase diagram cannot be
+        constructed, e.g., if there are no elemental entries for some element.
+    """
+    symbols, fractions, energies, nown = args
+    elements = [Element(sym) for sym in symbols]
+    entries = [PDEntry(Composition({el: x for el, x in zip(elements, row)
+                                    if x > 0}), energy)
+               for row, energy in zip(fractions, energies)]
+    try:
+        pd = PhaseDiagram(entries, elements)
+    except PhaseDiagramError:
+        return None, None
+    own = entries[len(entries) - nown:]
+    stable_entries = pd.stable_entries
+    stable = [i for i, entry in enumerate(own) if entry in stable_entries]
+    return stable, PDAnalyzer(pd).get_e_above_hull_batch(own)
+
+
+def get_e_above_hulls(entries, ncpus=None):
+    """
+    Computes the energy above hull of every entry in a list of entries
+    spanning many chemical systems, e.g., an entire database.
+
+    The entries are partitioned by chemical system and the hulls are computed
+    bottom-up, i.e., unary systems first, followed by binaries, ternaries,
+    etc. Since an entry that is unstable in a subsystem is also unstable in
+    all higher-order systems, the hull of each system is constructed from
+    its own entries and only the stable entries of its subsystems. Systems
+    of the same order are independent and can be processed in parallel.
+
+    Args:
+        entries ([PDEntry]): A list of PDEntry-like objects having an
+            energy, energy_per_atom and composition.
+        ncpus (int): Number of cpus to use. Default of None means serial
+            processing.
+
+    Returns:
+        (e_above_hulls, stable_entries). e_above_hulls is an array of the
+        energies above hull of the entries, in the same order as entries.
+        Entries in chemical systems that are lacking elemental entries have
+        an energy above hull of nan. stable_entries is a dict of
+        {chemsys: [stable entries]}, where the stable entries have exactly
+        the chemical system chemsys.
+    """
+    entries = list(entries)
+    chemsys_indices = collections.defaultdict(list)
+    for i, entry in enumerate(entries):
+        chemsys_indices[get_chemsys(entry.composition)].append(i)
+    energies = np.array([entry.energy_per_atom for entry in entries])
+    fractions = [{el.symbol: entry.composition.get_atomic_fraction(el)
+                  for el in entry.composition.elements}
+                 for entry in entries]
+
+    e_above_hulls = np.empty(len(entries))
+    e_above_hulls.fill(np.nan)
+    stable = {}
+    levels = collections.defaultdict(list)
+    for chemsys in chemsys_indices:
+        levels[len(chemsys)].append(chemsys)
+
+    pool = None
+    if ncpus:
+        import multiprocessing as mp
+        logger.info("Using {} cpus".format(ncpus))
+        pool = mp.Pool(ncpus)
+    try:
+        for order in sorted(levels.keys()):
+            systems = levels[order]
+            logger.info("Processing {} systems of order {}"
+                        .format(len(systems), order))
+            if order == 1:
+                #Unary systems are trivial.
+                for chemsys in systems:
+                    inds = chemsys_indices[chemsys]
+                    emin = np.min(energies[inds])
+                    e_above_hulls[inds] = energies[inds] - emin
+                    stable[chemsys] = [inds[np.argmin(energies[inds])]]
+                continue
+            tasks = []
+            for chemsys in systems:
+                inds = []
+                for n in xrange(1, order):
+                    for sub in itertools.combinations(chemsys, n):
+                        inds.extend(stable.get(sub, []))
+                inds.extend(chemsys_indices[chemsys])
+                tasks.append((chemsys,
+                              np.array([[fractions[i].get(sym, 0)
+                                         for sym in chemsys] for i in inds]),
+                              energies[inds],
+                              len(chemsys_indices[chemsys])))
+            if pool is not None:
+                results = pool.map(_process_system, tasks)
+            else:
+                results = map(_process_system, tasks)
+            for chemsys, (stable_own, ehulls) in zip(systems, results):
+                own = chemsys_indices[chemsys]
+                if stable_own is None:
+                    logger.warning("Unable to construct phase diagram for "
+                                   "{}".format("-".join(chemsys)))
+                    stable[chemsys] = []
+                    continue
+                stable[chemsys] = [own[i] for i in stable_own]
+                e_above_hulls[own] = ehulls
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    stable_entries = {chemsys: [entries[i] for i in inds]
+                      for chemsys, inds in stable.items() if inds}
+    return e_above_hulls, stable_entries
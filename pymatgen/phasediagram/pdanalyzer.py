@@ -23,7 +23,7 @@ from pyhull.simplex import Simplex
 
 from pymatgen.core.composition import Composition
 from pymatgen.phasediagram.pdmaker import PhaseDiagram, \
-    GrandPotentialPhaseDiagram
+    GrandPotentialPhaseDiagram, get_data_matrix
 from pymatgen.analysis.reaction_calculator import Reaction
 
 
@@ -45,6 +45,10 @@ class PDAnalyzer(object):
 
     numerical_tol = 1e-8
 
+    # Maximum number of (composition, facet) pairs processed at a time in
+    # the batch methods. Limits the memory used for temporary arrays.
+    batch_size = 2 ** 20
+
     def __init__(self, pd):
         """
         Initializes analyzer with a PhaseDiagram.
@@ -53,6 +57,19 @@ class PDAnalyzer(object):
             pd: Phase Diagram to analyze.
         """
         self._pd = pd
+        self._cache_key = None
+        self._cache = None
+
+    def _get_cache(self):
+        """
+        Returns the cache of data derived from the facets, which is reset
+        whenever the facets of the phase diagram change.
+        """
+        facet_data = self._pd.get_facet_data()
+        if self._cache_key is not facet_data:
+            self._cache_key = facet_data
+            self._cache = {"facet_pairs": {}}
+        return self._cache
 
     def _make_comp_matrix(self, complist):
         """
@@ -62,38 +79,45 @@ class PDAnalyzer(object):
         return np.array([[comp.get_atomic_fraction(el)
                           for el in self._pd.elements] for comp in complist])
 
-    def _in_facet(self, facet, comp):
+    def _make_point_matrix(self, complist):
         """
-        Checks if a composition is in a facet.
+        Helper function to generate the matrix of facet space points, i.e.,
+        the atomic fractions of all but the first element followed by a 1,
+        from a list of compositions.
+        """
+        els = self._pd.elements[1:]
+        return np.array([[comp.get_atomic_fraction(el) for el in els] + [1]
+                         for comp in complist]).reshape((-1, len(els) + 1))
 
-        Args:
-            facet: facet to test.
-            comp: Composition to test.
-        """
-        els = self._pd.elements
-        dim = len(els)
-        if dim > 1:
-            coords = self._pd.qhull_data[facet, :-1]
-            simplex = Simplex(coords)
-            comp_point = [comp.get_atomic_fraction(e) for e in els[1:]]
-            return simplex.in_simplex(comp_point, PDAnalyzer.numerical_tol)
-        else:
-            return True
+    def _get_bary_coords(self, points):
+        """
+        Returns the barycentric coordinates of points (see _make_point_matrix)
+        in all facets as an array of shape (npoints, nfacets, dim).
+        """
+        return np.einsum("fij,nj->nfi", self._pd.get_facet_data()[1], points)
+
+    def _get_facet_indices(self, comp):
+        """
+        Get the indices of the facets that a composition falls into.
+        """
+        bary = self._get_bary_coords(self._make_point_matrix([comp]))[0]
+        in_facets = np.all(bary >= -PDAnalyzer.numerical_tol, axis=1)
+        return np.where(in_facets)[0]
 
     def _get_facets(self, comp):
         """
         Get the facets that a composition falls into.
         """
-        return filter(lambda f: self._in_facet(f, comp), self._pd.facets)
+        return [self._pd.facets[i] for i in self._get_facet_indices(comp)]
 
     def _get_facet(self, comp):
         """
         Get any facet that a composition falls into.
         """
-        for facet in self._pd.facets:
-            if self._in_facet(facet, comp):
-                return facet
-        raise RuntimeError("No facet found for comp = {}".format(comp))
+        facets = self._get_facets(comp)
+        if not facets:
+            raise RuntimeError("No facet found for comp = {}".format(comp))
+        return facets[0]
 
     def get_decomposition(self, comp):
         """
@@ -148,6 +172,118 @@ class PDAnalyzer(object):
                 return decomp, ehull
         raise ValueError("No valid decomp found!")
 
+    def _locate_batch(self, points, energies=None, allow_negative=False):
+        """
+        Locates many compositions in the facets in a vectorized manner.
+
+        Args:
+            points: Point matrix of the compositions (see _make_point_matrix).
+            energies: Energies per atom of the compositions. If None, the
+                first facet containing each composition is returned.
+                Otherwise, the first containing facet with an energy above
+                hull >= 0 (unless allow_negative is True) is returned.
+            allow_negative: Whether to allow negative e_above_hulls.
+
+        Returns:
+            (facet indices, barycentric coordinates, energies above hull).
+            Energies above hull are None if energies is None. If a
+            composition cannot be located, (index of the composition, None,
+            None) is returned instead.
+        """
+        tol = PDAnalyzer.numerical_tol
+        facets, inverses, facet_energies = self._pd.get_facet_data()
+        n = len(points)
+        inds = np.zeros(n, dtype=int)
+        amts = np.zeros((n, facets.shape[1]))
+        ehulls = None if energies is None else np.zeros(n)
+        chunk = max(1, self.batch_size // max(len(facets), 1))
+        for i in xrange(0, n, chunk):
+            s = slice(i, min(i + chunk, n))
+            bary = self._get_bary_coords(points[s])
+            valid = np.all(bary >= -tol, axis=2)
+            if energies is not None:
+                e = energies[s, None] - np.sum(bary * facet_energies[None],
+                                               axis=2)
+                if not allow_negative:
+                    valid &= e >= -tol
+            found = np.any(valid, axis=1)
+            if not np.all(found):
+                return i + np.argmin(found), None, None
+            f = np.argmax(valid, axis=1)
+            r = np.arange(len(f))
+            inds[s] = f
+            amts[s] = bary[r, f]
+            if energies is not None:
+                ehulls[s] = e[r, f]
+        amts[np.abs(amts) <= tol] = 0
+        return inds, amts, ehulls
+
+    def get_decomposition_batch(self, comps):
+        """
+        Provides the decompositions of many compositions at once. All facets
+        are located in a single vectorized pass, which is much faster than
+        calling get_decomposition for each composition.
+
+        Args:
+            comps: Sequence of compositions.
+
+        Returns:
+            (indices, amounts), both arrays of shape (len(comps), dim).
+            indices[i] are the indices in pd.qhull_entries of the vertices of
+            the facet containing comps[i] and amounts[i] the corresponding
+            amounts of the decomposition. Amounts below the numerical
+            tolerance are set to zero.
+        """
+        inds, amts, ehulls = self._locate_batch(self._make_point_matrix(comps))
+        if amts is None:
+            raise RuntimeError("No facet found for comp = {}"
+                               .format(comps[inds]))
+        return self._pd.get_facet_data()[0][inds], amts
+
+    def get_decomp_and_e_above_hull_batch(self, entries,
+                                          allow_negative=False):
+        """
+        Provides the decompositions and energies above convex hull for many
+        entries at once. This is the vectorized version of
+        get_decomp_and_e_above_hull.
+
+        Args:
+            entries: Sequence of PDEntry like objects.
+            allow_negative: Whether to allow negative e_above_hulls. Defaults
+                to False.
+
+        Returns:
+            (indices, amounts, e_above_hulls). indices and amounts are
+            arrays of shape (len(entries), dim) describing the decompositions
+            as in get_decomposition_batch. e_above_hulls is an array of
+            energies above hull, which are 0 for stable entries.
+        """
+        stable_entries = self._pd.stable_entries
+        stable = np.array([e in stable_entries for e in entries], dtype=bool)
+        energies = np.array([e.energy_per_atom for e in entries])
+        points = self._make_point_matrix([e.composition for e in entries])
+        #Stable entries are always accepted, with an energy above hull of 0.
+        inds, amts, ehulls = self._locate_batch(
+            points, np.where(stable, np.inf, energies), allow_negative)
+        if amts is None:
+            raise ValueError("No valid decomp found!")
+        ehulls[stable] = 0
+        return self._pd.get_facet_data()[0][inds], amts, ehulls
+
+    def get_e_above_hull_batch(self, entries):
+        """
+        Provides the energies above convex hull for many entries at once.
+        Much faster than calling get_e_above_hull for each entry.
+
+        Args:
+            entries: Sequence of PDEntry like objects.
+
+        Returns:
+            Array of energies above convex hull. Stable entries have an energy
+            above hull of 0.
+        """
+        return self.get_decomp_and_e_above_hull_batch(entries)[2]
+
     def get_e_above_hull(self, entry):
         """
         Provides the energy above convex hull for an entry
@@ -185,6 +321,57 @@ class PDAnalyzer(object):
         return analyzer.get_decomp_and_e_above_hull(entry,
                                                     allow_negative=True)[1]
 
+    def get_all_facet_chempots(self):
+        """
+        Calculates the chemical potentials of all facets at once with a
+        batched linear solve. The result is cached.
+
+        Returns:
+            Array of chemical potentials with shape (nfacets, dim), i.e.,
+            chempots[i, j] is the chemical potential of pd.elements[j] in
+            pd.facets[i].
+        """
+        cache = self._get_cache()
+        if "chempots" not in cache:
+            pd = self._pd
+            facets = pd.get_facet_data()[0]
+            data = get_data_matrix(pd.qhull_entries, pd.elements)
+            chempots = np.linalg.solve(data[facets, :-1],
+                                       data[facets, -1][:, :, None])[:, :, 0]
+            chempots.setflags(write=False)
+            cache["chempots"] = chempots
+        return cache["chempots"]
+
+    def get_facet_pairs(self, nshared):
+        """
+        Returns the pairs of facets sharing exactly a given number of
+        vertices, e.g., nshared = dim - 1 gives all pairs of adjacent facets.
+        The result is cached.
+
+        Args:
+            nshared (int): Number of shared vertices.
+
+        Returns:
+            {(i, j): common qhull entry indices} for all pairs of facet
+            indices i < j sharing nshared vertices.
+        """
+        facet_pairs = self._get_cache()["facet_pairs"]
+        if nshared not in facet_pairs:
+            facets = [set(facet) for facet in self._pd.facets]
+            #Index facets by their vertex subsets.
+            subsets = collections.defaultdict(list)
+            for i, facet in enumerate(self._pd.facets):
+                for sub in itertools.combinations(sorted(facet), nshared):
+                    subsets[sub].append(i)
+            pairs = {}
+            for sub, inds in subsets.items():
+                for i, j in itertools.combinations(inds, 2):
+                    if (i, j) not in pairs and \
+                            len(facets[i].intersection(facets[j])) == nshared:
+                        pairs[(i, j)] = sub
+            facet_pairs[nshared] = pairs
+        return facet_pairs[nshared]
+
     def get_facet_chempots(self, facet):
         """
         Calculates the chemical potentials for each element within a facet.
@@ -209,8 +396,11 @@ class PDAnalyzer(object):
                     comp[el] > Composition.amount_tolerance:
                 raise ValueError('Composition includes element {} which is '
                                  'not in the PhaseDiagram'.format(el))
-        facet = self._get_facet(comp)
-        return self.get_facet_chempots(facet)
+        inds = self._get_facet_indices(comp)
+        if len(inds) == 0:
+            raise RuntimeError("No facet found for comp = {}".format(comp))
+        return dict(zip(self._pd.elements,
+                        self.get_all_facet_chempots()[inds[0]]))
 
     def get_transition_chempots(self, element):
         """
@@ -228,10 +418,8 @@ class PDAnalyzer(object):
             raise ValueError("get_transition_chempots can only be called with "
                              "elements in the phase diagram.")
 
-        critical_chempots = []
-        for facet in self._pd.facets:
-            chempots = self.get_facet_chempots(facet)
-            critical_chempots.append(chempots[element])
+        critical_chempots = self.get_all_facet_chempots()[
+            :, self._pd.elements.index(element)]
 
         clean_pots = []
         for c in sorted(critical_chempots):
@@ -321,34 +509,25 @@ class PDAnalyzer(object):
             simplices are the sides of the N-1 dim polytope bounding the
             allowable chemical potential range of each entry.
         """
-        all_chempots = []
         pd = self._pd
-        facets = pd.facets
-        for facet in facets:
-            chempots = self.get_facet_chempots(facet)
-            all_chempots.append([chempots[el] for el in pd.elements])
+        all_chempots = self.get_all_facet_chempots()
         inds = [pd.elements.index(el) for el in elements]
+        el_energies = np.array([pd.el_refs[el].energy_per_atom
+                                for el in elements])
+        rel_chempots = all_chempots[:, inds] - el_energies
+        facet_pairs = self.get_facet_pairs(len(elements))
 
-        el_energies = {el: pd.el_refs[el].energy_per_atom
-                       for el in elements}
         chempot_ranges = collections.defaultdict(list)
         vertices = [[i for i in range(len(self._pd.elements))]]
         if len(all_chempots) > len(self._pd.elements):
-            vertices = ConvexHull(all_chempots).vertices
+            vertices = ConvexHull(all_chempots.tolist()).vertices
         for ufacet in vertices:
             for combi in itertools.combinations(ufacet, 2):
-                data1 = facets[combi[0]]
-                data2 = facets[combi[1]]
-                common_ent_ind = set(data1).intersection(set(data2))
-                if len(common_ent_ind) == len(elements):
-                    common_entries = [pd.qhull_entries[i]
-                                      for i in common_ent_ind]
-                    data = np.array([[all_chempots[i][j]
-                                      - el_energies[pd.elements[j]]
-                                      for j in inds] for i in combi])
-                    sim = Simplex(data)
-                    for entry in common_entries:
-                        chempot_ranges[entry].append(sim)
+                common_ent_ind = facet_pairs.get(tuple(sorted(combi)))
+                if common_ent_ind is not None:
+                    sim = Simplex(rel_chempots[list(combi)])
+                    for i in common_ent_ind:
+                        chempot_ranges[pd.qhull_entries[i]].append(sim)
 
         return chempot_ranges
 
@@ -106,54 +106,51 @@ class PhaseDiagram (MSONable):
                                   for entry in entries])
         elements = list(elements)
         dim = len(elements)
-        el_refs = {}
-        for el in elements:
-            el_entries = filter(lambda e: e.composition.is_element and
-                                e.composition.elements[0] == el, entries)
-            if len(el_entries) == 0:
+
+        #Composition matrix of atomic fractions, with energies per atom in
+        #the last column.
+        data = get_data_matrix(entries, elements)
+        self.all_entries_hulldata = data[:, 1:]
+        energies = data[:, -1]
+
+        #Elemental references are the lowest energy elemental entries.
+        is_element = np.array([e.composition.is_element for e in entries],
+                              dtype=bool)
+        el_inds = np.where(is_element)[0]
+        ref_inds = {}
+        for i, el in enumerate(elements):
+            cands = el_inds[data[el_inds, i] == 1]
+            if len(cands) == 0:
                 raise PhaseDiagramError(
                     "There are no entries associated with terminal {}."
                     .format(el))
-            el_refs[el] = min(el_entries, key=lambda e: e.energy_per_atom)
-
-        data = []
-        for entry in entries:
-            comp = entry.composition
-            row = map(comp.get_atomic_fraction, elements)
-            row.append(entry.energy_per_atom)
-            data.append(row)
-
-        data = np.array(data)
-        self.all_entries_hulldata = data[:, 1:]
+            ref_inds[el] = cands[np.argmin(energies[cands])]
+        el_refs = {el: entries[i] for el, i in ref_inds.items()}
 
         #use only entries with negative formation energy
         vec = [el_refs[el].energy_per_atom for el in elements] + [-1]
         form_e = -np.dot(data, vec)
+        ind = np.where(form_e <= -self.formation_energy_tol)[0]
 
         #make sure that if there are multiple entries at the same composition
         #within 1e-4 eV/atom of each other, only use the lower energy one.
         #This fixes the precision errors in the convex hull.
-        #This is significantly faster than grouping by composition and then
-        #taking the lowest energy of each group
-        ind = []
-        prev_c = []  # compositions within 1e-4 of current entry
-        prev_e = []  # energies of those compositions
-        for i in np.argsort([e.energy_per_atom for e in entries]):
-            if form_e[i] > -self.formation_energy_tol:
-                continue
-            epa = entries[i].energy_per_atom
-            #trim the front of the lists
-            while prev_e and epa > 1e-4 + prev_e[0]:
-                prev_c.pop(0)
-                prev_e.pop(0)
-            frac_comp = entries[i].composition.get_fractional_composition()
-            if frac_comp not in prev_c:
-                ind.append(i)
-            prev_e.append(epa)
-            prev_c.append(frac_comp)
+        #Entries are grouped by composition by sorting, and an entry is
+        #dropped if the next lower energy entry in its group is within
+        #1e-4 eV/atom.
+        fracs = np.round(data[ind, :-1], 8)
+        order = np.lexsort([energies[ind]] +
+                           [fracs[:, j] for j in xrange(dim - 1, -1, -1)])
+        fracs = fracs[order]
+        same_comp = np.all(fracs[1:] == fracs[:-1], axis=1)
+        close = np.diff(energies[ind][order]) <= 1e-4
+        keep = np.ones(len(ind), dtype=bool)
+        keep[1:] = ~(same_comp & close)
+        ind = ind[order][keep]
+        ind = ind[np.argsort(energies[ind], kind="mergesort")].tolist()
 
         #add the elemental references
-        ind.extend(map(entries.index, el_refs.values()))
+        ind.extend([ref_inds[el] for el in el_refs])
 
         qhull_entries = [entries[i] for i in ind]
         qhull_data = data[ind][:, 1:]
@@ -188,6 +185,30 @@ class PhaseDiagram (MSONable):
         self.el_refs = el_refs
         self.elements = elements
         self.qhull_entries = qhull_entries
+        self._facet_data = None
+
+    def get_facet_data(self):
+        """
+        Returns precomputed data for locating compositions in the facets.
+        The data is computed only once.
+
+        Returns:
+            (facets, inverses, energies). facets is an array of qhull entry
+            indices with shape (nfacets, dim). inverses are the inverse
+            barycentric matrices of the facets, i.e., the barycentric
+            coordinates of a composition in facet f are
+            dot(inverses[f], x + [1]), where x are the atomic fractions of
+            all but the first element. energies are the energies per atom of
+            the facet vertices.
+        """
+        if self._facet_data is None:
+            facets = np.array(self.facets, dtype=int).reshape((-1, self.dim))
+            data = self.qhull_data[facets]
+            m = np.concatenate([data[:, :, :-1],
+                                np.ones(facets.shape + (1,))], axis=2)
+            inverses = np.linalg.inv(np.transpose(m, (0, 2, 1)))
+            self._facet_data = (facets, inverses, data[:, :, -1])
+        return self._facet_data
 
     @property
     def unstable_entries(self):
@@ -443,6 +464,274 @@ class CompoundPhaseDiagram(PhaseDiagram):
                    d["normalize_terminal_compositions"])
 
 
+class IncrementalPhaseDiagram(PhaseDiagram):
+    """
+    A PhaseDiagram that supports adding and removing entries without
+    recomputing the full convex hull each time. The stable entries and
+    facets are always consistent with those of a PhaseDiagram constructed
+    from all_entries, and the phase diagram can be used with PDAnalyzer as
+    usual.
+
+    Adding an entry above the current hull only appends it to all_entries.
+    Adding an entry below the hull replaces the facets that lie above the
+    new point by new facets connecting the point to their horizon. Removing
+    an unstable entry does not change the hull. A full rebuild is only done
+    if elemental references change, a stable entry is removed or the new
+    entry lies within numerical tolerance of the hull.
+
+    .. attribute: num_rebuilds
+
+        Number of full hull rebuilds done since initialization.
+    """
+
+    # Tolerance for determining if an entry is above or below the hull.
+    numerical_tol = 1e-8
+
+    def __init__(self, entries, elements=None):
+        """
+        Args:
+            entries ([PDEntry]): A list of PDEntry-like objects having an
+                energy, energy_per_atom and composition.
+            elements ([Element]): Optional list of elements in the phase
+                diagram. If set to None, the elements are determined from
+                the the entries themselves.
+        """
+        super(IncrementalPhaseDiagram, self).__init__(list(entries),
+                                                      elements)
+        self.num_rebuilds = 0
+
+    def _rebuild(self):
+        PhaseDiagram.__init__(self, self.all_entries, self.elements)
+        self.num_rebuilds += 1
+
+    def _get_state(self):
+        """
+        Snapshot of the attributes, which can be restored with _set_state.
+        The lists modified in place are copied; arrays and facets are always
+        replaced.
+        """
+        state = dict(self.__dict__)
+        state["all_entries"] = list(self.all_entries)
+        state["qhull_entries"] = list(self.qhull_entries)
+        return state
+
+    def _set_state(self, state):
+        self.__dict__.clear()
+        self.__dict__.update(state)
+
+    def _make_row(self, entry):
+        comp = entry.composition
+        for el in comp.elements:
+            if el not in self.elements and \
+                    comp[el] > Composition.amount_tolerance:
+                raise PhaseDiagramError("Entry {} includes element {} which "
+                                        "is not in the phase diagram."
+                                        .format(entry, el))
+        return get_data_matrix([entry], self.elements)[0]
+
+    def _insert(self, entry):
+        """
+        Inserts an entry, updating the facets locally. Returns False if a
+        full rebuild is needed instead.
+        """
+        tol = IncrementalPhaseDiagram.numerical_tol
+        row = self._make_row(entry)
+        self.all_entries.append(entry)
+        self.all_entries_hulldata = np.concatenate(
+            [self.all_entries_hulldata, [row[1:]]])
+        if entry.is_element:
+            el = entry.composition.elements[0]
+            if entry.energy_per_atom < self.el_refs[el].energy_per_atom:
+                return False
+        vec = [self.el_refs[el].energy_per_atom for el in self.elements]
+        if row[-1] - np.dot(row[:-1], vec) > -self.formation_energy_tol:
+            #Positive formation energy entries are not in the hull.
+            return True
+
+        point = row[1:]
+        facets, inverses, energies = self.get_facet_data()
+        bary = np.dot(inverses, np.append(point[:-1], 1))
+        #Energy of the new point relative to the facet hyperplanes.
+        diff = point[-1] - np.sum(bary * energies, axis=1)
+        in_facet = np.all(bary >= -tol, axis=1)
+        if not np.any(in_facet):
+            return False
+        i = np.argmax(in_facet)
+        if diff[i] > tol:
+            return True
+        elif diff[i] >= -tol:
+            #Entries on the hull need a rebuild, unless they are degenerate
+            #with an existing vertex.
+            return np.max(bary[i]) > 1 - tol
+
+        #Replace the facets visible from the new point by new facets
+        #connecting the point to the horizon ridges.
+        ind = len(self.qhull_entries)
+        self.qhull_entries.append(entry)
+        self.qhull_data = np.concatenate([self.qhull_data[:-1], [point],
+                                          self.qhull_data[-1:]])
+        visible = diff < -tol
+        ridges = collections.Counter()
+        for facet in facets[visible]:
+            for i in xrange(self.dim):
+                ridges[tuple(sorted(np.delete(facet, i)))] += 1
+        finalfacets = [list(f) for f in facets[~visible]]
+        for ridge, count in ridges.items():
+            if count == 1:
+                facet = list(ridge) + [ind]
+                m = self.qhull_data[facet]
+                m[:, -1] = 1
+                if abs(np.linalg.det(m)) > 1e-8:
+                    finalfacets.append(facet)
+        self.facets = finalfacets
+        self._facet_data = None
+        return True
+
+    def _delete(self, entry):
+        """
+        Deletes an entry. Returns False if a full rebuild is needed.
+        """
+        i = self.all_entries.index(entry)
+        stable = entry in self.stable_entries or \
+            entry in self.el_refs.values()
+        del self.all_entries[i]
+        self.all_entries_hulldata = np.delete(self.all_entries_hulldata, i,
+                                              axis=0)
+        if stable:
+            return False
+        if entry in self.qhull_entries:
+            i = self.qhull_entries.index(entry)
+            del self.qhull_entries[i]
+            self.qhull_data = np.delete(self.qhull_data, i, axis=0)
+            self.facets = [[j - 1 if j > i else j for j in facet]
+                           for facet in self.facets]
+            self._facet_data = None
+        return True
+
+    def add_entries(self, entries):
+        """
+        Adds entries to the phase diagram.
+
+        Args:
+            entries ([PDEntry]): Entries to add.
+
+        Returns:
+            Whether a full rebuild of the hull was needed.
+        """
+        entries = list(entries)
+        #Check the elements of all entries before modifying anything.
+        for entry in entries:
+            self._make_row(entry)
+        state = self._get_state()
+        try:
+            for i, entry in enumerate(entries):
+                if not self._insert(entry):
+                    self.all_entries.extend(entries[i + 1:])
+                    self._rebuild()
+                    return True
+        except:
+            self._set_state(state)
+            raise
+        return False
+
+    def add_entry(self, entry):
+        """
+        Adds an entry to the phase diagram.
+
+        Args:
+            entry (PDEntry): Entry to add.
+
+        Returns:
+            Whether a full rebuild of the hull was needed.
+        """
+        return self.add_entries([entry])
+
+    def remove_entries(self, entries):
+        """
+        Removes entries from the phase diagram.
+
+        Args:
+            entries ([PDEntry]): Entries to remove.
+
+        Returns:
+            Whether a full rebuild of the hull was needed.
+        """
+        entries = list(entries)
+        for entry in entries:
+            if entry not in self.all_entries:
+                raise PhaseDiagramError("Entry {} is not in the phase "
+                                        "diagram.".format(entry))
+        #Each element must keep an elemental entry.
+        remaining = list(self.all_entries)
+        for entry in entries:
+            remaining.remove(entry)
+        for el in self.elements:
+            if not any(e.is_element and e.composition.elements[0] == el
+                       for e in remaining):
+                raise PhaseDiagramError(
+                    "Removing the entries leaves no entries associated with "
+                    "terminal {}.".format(el))
+        state = self._get_state()
+        try:
+            rebuild = False
+            for entry in entries:
+                if rebuild:
+                    self.all_entries.remove(entry)
+                else:
+                    rebuild = not self._delete(entry)
+            if rebuild:
+                self._rebuild()
+        except:
+            self._set_state(state)
+            raise
+        return rebuild
+
+    def remove_entry(self, entry):
+        """
+        Removes an entry from the phase diagram.
+
+        Args:
+            entry (PDEntry): Entry to remove.
+
+        Returns:
+            Whether a full rebuild of the hull was needed.
+        """
+        return self.remove_entries([entry])
+
+
+def get_data_matrix(entries, elements):
+    """
+    Returns the matrix of atomic fractions of elements for entries, with the
+    energies per atom in the last column.
+
+    Args:
+        entries:
+            Sequence of PDEntry-like objects.
+        elements:
+            Sequence of elements defining the columns.
+
+    Returns:
+        numpy array of shape (len(entries), len(elements) + 1).
+    """
+    el_index = collections.defaultdict(list)
+    for i, el in enumerate(elements):
+        el_index[el].append(i)
+    rows, cols, amts, natoms = [], [], [], []
+    for i, entry in enumerate(entries):
+        comp = entry.composition
+        natoms.append(comp.num_atoms)
+        for el, amt in comp.items():
+            for j in el_index.get(el, []):
+                rows.append(i)
+                cols.append(j)
+                amts.append(amt)
+    data = np.zeros((len(entries), len(elements) + 1))
+    data[rows, cols] = np.abs(amts)
+    data[:, :-1] /= np.array(natoms)[:, None]
+    data[:, -1] = [entry.energy_per_atom for entry in entries]
+    return data
+
+
 class PhaseDiagramError(Exception):
     """
     An exception class for Phase Diagram generation.
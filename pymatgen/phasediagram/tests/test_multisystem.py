@@ -0,0 +1,52 @@
+import unittest
+import os
+
+import numpy as np
+
+from pymatgen.core.composition import Composition
+from pymatgen.phasediagram.entries import PDEntryIO, PDEntry
+from pymatgen.phasediagram.pdmaker import PhaseDiagram
+from pymatgen.phasediagram.pdanalyzer import PDAnalyzer
+from pymatgen.phasediagram.multisystem import get_e_above_hulls, get_chemsys
+
+
+class MultiSystemTest(unittest.TestCase):
+
+    def setUp(self):
+        module_dir = os.path.dirname(os.path.abspath(__file__))
+        (self.elements, self.entries) = PDEntryIO.from_csv(
+            os.path.join(module_dir, "pdentries_test.csv"))
+        self.pd = PhaseDiagram(self.entries)
+        self.analyzer = PDAnalyzer(self.pd)
+
+    def test_get_chemsys(self):
+        self.assertEqual(get_chemsys(Composition("LiFeO2")),
+                         ("Fe", "Li", "O"))
+
+    def test_get_e_above_hulls(self):
+        extra = [PDEntry("Na", -1), PDEntry("NaLi", -10), PDEntry("Co2O", -5)]
+        ehulls, stable = get_e_above_hulls(self.entries + extra)
+        for entry, e_ah in zip(self.entries, ehulls):
+            self.assertAlmostEqual(e_ah, self.analyzer.get_e_above_hull(entry))
+        self.assertAlmostEqual(ehulls[-3], 0)
+        self.assertAlmostEqual(ehulls[-2], 0)
+        #No Co entries.
+        self.assertTrue(np.isnan(ehulls[-1]))
+        self.assertEqual(stable[("Li", "Na")], [extra[1]])
+        self.assertNotIn(("Co", "O"), stable)
+        stable_entries = set()
+        for chemsys, entries in stable.items():
+            if set(chemsys).issubset(["Li", "Fe", "O"]):
+                stable_entries.update(entries)
+        self.assertEqual(
+            set([e.composition.reduced_formula for e in stable_entries]),
+            set([e.composition.reduced_formula
+                 for e in self.pd.stable_entries]))
+
+    def test_parallel(self):
+        ehulls = get_e_above_hulls(self.entries, ncpus=2)[0]
+        self.assertTrue(np.allclose(ehulls, get_e_above_hulls(self.entries)[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,8 @@ import os
 
 from numbers import Number
 
+import numpy as np
+
 from pymatgen.core.composition import Composition
 from pymatgen.core.periodic_table import Element
 from pymatgen.phasediagram.pdmaker import PhaseDiagram
@@ -29,6 +31,30 @@ class PDAnalyzerTest(unittest.TestCase):
                 self.assertGreaterEqual(e_ah, 0)
                 self.assertTrue(isinstance(e_ah, Number))
 
+    def test_get_e_above_hull_batch(self):
+        ehulls = self.analyzer.get_e_above_hull_batch(self.pd.all_entries)
+        self.assertEqual(ehulls.shape, (len(self.pd.all_entries),))
+        for entry, e_ah in zip(self.pd.all_entries, ehulls):
+            self.assertAlmostEqual(e_ah, self.analyzer.get_e_above_hull(entry))
+            if entry in self.pd.stable_entries:
+                self.assertEqual(e_ah, 0)
+        inds, amts, ehulls = self.analyzer.get_decomp_and_e_above_hull_batch(
+            self.pd.all_entries[:10])
+        self.assertEqual(inds.shape, (10, len(self.pd.elements)))
+        self.assertEqual(amts.shape, (10, len(self.pd.elements)))
+
+    def test_get_decomposition_batch(self):
+        comps = [e.composition for e in self.pd.all_entries]
+        comps.append(Composition("Li3Fe7O11"))
+        inds, amts = self.analyzer.get_decomposition_batch(comps)
+        for comp, i, a in zip(comps, inds, amts):
+            decomp = self.analyzer.get_decomposition(comp)
+            self.assertEqual(len(decomp), np.count_nonzero(a))
+            for j, amt in zip(i, a):
+                if amt != 0:
+                    self.assertAlmostEqual(
+                        decomp[self.pd.qhull_entries[j]], amt)
+
     def test_get_equilibrium_reaction_energy(self):
         for entry in self.pd.stable_entries:
             self.assertLessEqual(
@@ -55,6 +81,30 @@ class PDAnalyzerTest(unittest.TestCase):
         for k, v in expected_ans.items():
             self.assertAlmostEqual(ansdict[k], v)
 
+    def test_get_all_facet_chempots(self):
+        chempots = self.analyzer.get_all_facet_chempots()
+        self.assertEqual(chempots.shape, (len(self.pd.facets),
+                                          len(self.pd.elements)))
+        for facet, row in zip(self.pd.facets, chempots):
+            expected = self.analyzer.get_facet_chempots(facet)
+            for el, mu in zip(self.pd.elements, row):
+                self.assertAlmostEqual(mu, expected[el])
+        self.assertIs(self.analyzer.get_all_facet_chempots(), chempots)
+
+    def test_get_facet_pairs(self):
+        pairs = self.analyzer.get_facet_pairs(2)
+        for (i, j), common in pairs.items():
+            self.assertLess(i, j)
+            self.assertEqual(set(self.pd.facets[i]).intersection(
+                self.pd.facets[j]), set(common))
+        #Every facet of a ternary phase diagram has at most 3 neighbors.
+        nneighbors = np.zeros(len(self.pd.facets))
+        for i, j in pairs:
+            nneighbors[i] += 1
+            nneighbors[j] += 1
+        self.assertTrue(np.all(nneighbors <= 3))
+        self.assertTrue(np.all(nneighbors >= 1))
+
     def test_get_transition_chempots(self):
         for el in self.pd.elements:
             self.assertLessEqual(len(self.analyzer.get_transition_chempots(el)),
@@ -4,7 +4,8 @@ import os
 from pymatgen import Element, Composition
 from pymatgen.phasediagram.entries import PDEntryIO, PDEntry
 from pymatgen.phasediagram.pdmaker import PhaseDiagram, \
-    GrandPotentialPhaseDiagram, CompoundPhaseDiagram, PhaseDiagramError
+    GrandPotentialPhaseDiagram, CompoundPhaseDiagram, PhaseDiagramError, \
+    IncrementalPhaseDiagram, get_data_matrix
 
 
 class PhaseDiagramTest(unittest.TestCase):
@@ -51,7 +52,26 @@ class PhaseDiagramTest(unittest.TestCase):
                                    7)
     def test_all_entries_hulldata(self):
         self.assertEqual(len(self.pd.all_entries_hulldata), 492)
+
+    def test_get_data_matrix(self):
+        data = get_data_matrix([PDEntry("Li2O", -14.3)],
+                               [Element("O"), Element("Li")])
+        self.assertEqual(data.shape, (1, 3))
+        self.assertAlmostEqual(data[0, 0], 1.0 / 3)
+        self.assertAlmostEqual(data[0, 1], 2.0 / 3)
+        self.assertAlmostEqual(data[0, 2], -14.3 / 3)
         
+    def test_duplicate_entries(self):
+        #Entries at the same composition within 1e-4 eV/atom of a lower
+        #energy entry are not used in the hull.
+        entries = self.entries + [PDEntry(e.composition, e.energy + 1e-5)
+                                  for e in self.entries]
+        pd = PhaseDiagram(entries)
+        self.assertEqual(len(pd.qhull_entries), len(self.pd.qhull_entries))
+        self.assertEqual(set(pd.stable_entries), set(self.pd.stable_entries))
+        self.assertEqual(len(pd.all_entries_hulldata), 984)
+        self.assertEqual(pd.el_refs, self.pd.el_refs)
+
     def test_planar_inputs(self):
         e1 = PDEntry('H',    0)
         e2 = PDEntry('HLiB', 0)
@@ -139,5 +159,70 @@ class CompoundPhaseDiagramTest(unittest.TestCase):
         self.assertIsNotNone(str(self.pd))
 
 
+class IncrementalPhaseDiagramTest(unittest.TestCase):
+
+    def setUp(self):
+        module_dir = os.path.dirname(os.path.abspath(__file__))
+        (self.elements, self.entries) = PDEntryIO.from_csv(
+            os.path.join(module_dir, "pdentries_test.csv"))
+        el_refs = PhaseDiagram(self.entries).el_refs.values()
+        self.others = [e for e in self.entries if e not in el_refs]
+        self.pd = IncrementalPhaseDiagram(el_refs, self.elements)
+
+    def assert_consistent(self):
+        pd = PhaseDiagram(self.pd.all_entries, self.pd.elements)
+        key = lambda e: (e.composition.reduced_formula,
+                         round(e.energy_per_atom, 6))
+        self.assertEqual(set(map(key, pd.stable_entries)),
+                         set(map(key, self.pd.stable_entries)))
+
+    def test_add_entries(self):
+        for entry in self.others:
+            self.assertFalse(self.pd.add_entry(entry))
+        self.assertEqual(self.pd.num_rebuilds, 0)
+        self.assertEqual(len(self.pd.all_entries), 492)
+        self.assert_consistent()
+        #A new entry above the hull does not change the facets.
+        facets = self.pd.facets
+        self.pd.add_entry(PDEntry("Li2O", 0))
+        self.assertIs(self.pd.facets, facets)
+        self.assertRaises(PhaseDiagramError, self.pd.add_entry,
+                          PDEntry("NaCl", -10))
+        #A lower elemental reference requires a rebuild.
+        self.assertTrue(self.pd.add_entries([PDEntry("Li", -10)]))
+        self.assertEqual(self.pd.num_rebuilds, 1)
+        self.assert_consistent()
+
+    def test_remove_entries(self):
+        self.pd.add_entries(self.others)
+        unstable = self.pd.unstable_entries
+        self.assertFalse(self.pd.remove_entries(unstable[:50]))
+        self.assert_consistent()
+        stable = [e for e in self.pd.stable_entries if not e.is_element]
+        self.assertTrue(self.pd.remove_entry(stable[0]))
+        self.assert_consistent()
+        self.assertRaises(PhaseDiagramError, self.pd.remove_entry, stable[0])
+
+    def test_failed_updates(self):
+        self.pd.add_entries(self.others)
+        nentries = len(self.pd.all_entries)
+        stable = self.pd.stable_entries
+        #Removing all elemental Li entries leaves the diagram unchanged.
+        li = [e for e in self.pd.all_entries
+              if e.composition.reduced_formula == "Li"]
+        self.assertRaises(PhaseDiagramError, self.pd.remove_entries,
+                          [self.pd.unstable_entries[0]] + li)
+        self.assertEqual(len(self.pd.all_entries), nentries)
+        self.assertTrue(all(e in self.pd.all_entries for e in li))
+        self.assertEqual(set(self.pd.stable_entries), set(stable))
+        #An invalid entry is rejected before any entry is added.
+        self.assertRaises(PhaseDiagramError, self.pd.add_entries,
+                          [PDEntry("Li2O", -100), PDEntry("NaCl", -10)])
+        self.assertEqual(len(self.pd.all_entries), nentries)
+        self.assertEqual(set(self.pd.stable_entries), set(stable))
+        self.assertEqual(self.pd.num_rebuilds, 0)
+        self.assert_consistent()
+
+
 if __name__ == '__main__':
     unittest.main()
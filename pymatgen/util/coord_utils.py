@@ -15,9 +15,13 @@ __maintainer__ = "Shyue Ping Ong"
 __email__ = "shyuep@gmail.com"
 __date__ = "Nov 27, 2011"
 
-import numpy as np
+import itertools
 import math
 
+import numpy as np
+
+from pymatgen.util.decorators import lru_cache
+
 
 def find_in_coord_list(coord_list, coord, atol=1e-8):
     """
@@ -195,6 +199,123 @@ def pbc_diff(fcoords1, fcoords2):
     return fdist - np.round(fdist)
 
 
+@lru_cache(maxsize=1024)
+def _get_min_image_data(matrix_string):
+    """
+    Precomputes the data needed for exact minimum image searches in a
+    lattice. The lattice is first LLL-reduced. For fractional coordinate
+    differences wrapped into [-0.5, 0.5] in the reduced basis, the minimum
+    image is guaranteed to be at most the covering radius of the lattice
+    away. The covering radius is bounded by half the norm of the
+    Gram-Schmidt vectors of the reduced basis, which in turn bounds the
+    lattice translations that need to be tested. Results are cached per
+    lattice matrix.
+
+    Args:
+        matrix_string (str): Lattice matrix as a string of float64, i.e.,
+            lattice.matrix.tostring(). Used as an exact cache key.
+
+    Returns:
+        (reduced_matrix, transform, inv_transform, images, cart_images),
+        where reduced_matrix = transform . matrix, images are the lattice
+        translations to be tested in the reduced basis (sorted by length)
+        and cart_images are their cartesian offsets.
+    """
+    from pymatgen.core.lattice import Lattice
+    matrix = np.fromstring(matrix_string).reshape((3, 3))
+    lengths = np.sqrt(np.sum(matrix ** 2, axis=1))
+    if abs(np.linalg.det(matrix)) <= 1e-10 * np.prod(lengths):
+        #Degenerate lattice (zero volume), for which minimum images are not
+        #defined. Fall back to the 27 neighboring images.
+        reduced, transform = matrix, np.eye(3)
+        nmax, max_r = np.ones(3), float("inf")
+    else:
+        reduced = Lattice(matrix).get_lll_reduced_lattice().matrix
+        transform = np.round(np.dot(reduced, np.linalg.inv(matrix)))
+        if abs(abs(np.linalg.det(transform)) - 1) > 1e-8 or \
+                not np.allclose(np.dot(transform, matrix), reduced):
+            #The search below is still exact in the unreduced basis, only
+            #with more translations to test.
+            reduced, transform = matrix, np.eye(3)
+        #Upper bound to the covering radius from the Gram-Schmidt vectors.
+        gs_norms = np.abs(np.diag(np.linalg.qr(reduced.T)[1]))
+        max_r = 0.5 * np.sqrt(np.sum(gs_norms ** 2)) * (1 + 1e-8) + 1e-8
+        #Interplanar spacings bound the translations along each axis. Cells
+        #with very different spacings, e.g., slabs with a long vacuum axis,
+        #need more translations along the short axes.
+        spacings = 1 / np.sqrt(np.sum(np.linalg.inv(reduced) ** 2, axis=0))
+        nmax = np.floor(max_r / spacings + 0.5)
+    inv_transform = np.round(np.linalg.inv(transform))
+    ranges = [np.arange(-n, n + 1) for n in nmax.astype(int)]
+    images = np.array(np.meshgrid(*ranges, indexing="ij")).reshape((3, -1)).T
+    cart_images = np.dot(images, reduced)
+    lengths = np.sqrt(np.sum(cart_images ** 2, axis=1))
+    max_f = 0.5 * np.sum(np.sqrt(np.sum(reduced ** 2, axis=1)))
+    order = np.argsort(lengths, kind="mergesort")
+    order = order[lengths[order] <= max_r + max_f]
+    data = (reduced, transform, inv_transform, images[order],
+            cart_images[order])
+    for arr in data:
+        arr.setflags(write=False)
+    return data
+
+
+def get_min_image_data(lattice):
+    """
+    Returns the precomputed minimum image data for a lattice, i.e., the
+    LLL-reduced lattice matrix, the transformation to it and the set of
+    lattice translations needed for exact minimum image searches. The data
+    is computed once per lattice and cached.
+
+    Args:
+        lattice: Lattice (or 3x3 lattice matrix).
+
+    Returns:
+        (reduced_matrix, transform, inv_transform, images, cart_images). See
+        _get_min_image_data.
+    """
+    matrix = np.ascontiguousarray(getattr(lattice, "matrix", lattice),
+                                  dtype=np.float64)
+    return _get_min_image_data(matrix.tostring())
+
+
+def _pbc_min_images(lattice, fcoords1, fcoords2):
+    """
+    Exact minimum image search between two lists of fractional coords.
+
+    Returns:
+        (vectors, d_2, jimages) for all pairs, where vectors are the
+        shortest cartesian vectors from fcoords1 to fcoords2, d_2 the
+        squared distances and jimages the corresponding lattice
+        translations of fcoords2 (in the original basis).
+    """
+    fcoords1, fcoords2 = np.atleast_2d(fcoords1, fcoords2)
+    matrix, transform, inv_transform, images, cart_images = \
+        get_min_image_data(lattice)
+
+    #Work in the reduced basis, with differences wrapped into [-0.5, 0.5].
+    fdiff = np.dot(fcoords2, inv_transform)[None, :, :] - \
+        np.dot(fcoords1, inv_transform)[:, None, :]
+    shift = -np.round(fdiff)
+    fdiff += shift
+
+    #Squared lengths of all image vectors, |v + t|^2 = |v|^2 + 2 v.t + |t|^2,
+    #without creating the full array of image vectors. Rows are processed
+    #in chunks, since skewed or slab cells may need many images.
+    cart = np.dot(fdiff, matrix)
+    image_d_2 = np.sum(cart_images ** 2, axis=1)
+    nrows = max(1, BATCH_MAX_MEMORY // (8 * len(images) *
+                                        max(1, len(fcoords2))))
+    inds = np.empty(cart.shape[:2], dtype=int)
+    for i in xrange(0, len(cart), nrows):
+        all_d_2 = np.dot(cart[i:i + nrows], 2 * cart_images.T) + image_d_2
+        inds[i:i + nrows] = np.argmin(all_d_2, axis=2)
+    vectors = cart + cart_images[inds]
+    d_2 = np.sum(vectors ** 2, axis=2)
+    jimages = np.round(np.dot(shift + images[inds], transform))
+    return vectors, d_2, jimages
+
+
 def pbc_all_distances(lattice, fcoords1, fcoords2):
     """
     Returns the distances between two lists of coordinates taking into
@@ -203,6 +324,9 @@ def pbc_all_distances(lattice, fcoords1, fcoords2):
     point in fcoords1 and every coordinate in fcoords2). This is
     different functionality from pbc_diff.
 
+    Minimum images are exact, even for highly skewed lattices. See
+    get_min_image_data.
+
     Args:
         lattice: lattice to use
         fcoords1: First set of fractional coordinates. e.g., [0.5, 0.6,
@@ -214,82 +338,37 @@ def pbc_all_distances(lattice, fcoords1, fcoords2):
         2d array of cartesian distances. E.g the distance between
         fcoords1[i] and fcoords2[j] is distances[i,j]
     """
-    #ensure correct shape
-    fcoords1, fcoords2 = np.atleast_2d(fcoords1, fcoords2)
-
-    #ensure that all points are in the unit cell
-    fcoords1 = np.mod(fcoords1, 1)
-    fcoords2 = np.mod(fcoords2, 1)
-
-    #create images, 2d array of all length 3 combinations of [-1,0,1]
-    r = np.arange(-1, 2)
-    arange = r[:, None] * np.array([1, 0, 0])[None, :]
-    brange = r[:, None] * np.array([0, 1, 0])[None, :]
-    crange = r[:, None] * np.array([0, 0, 1])[None, :]
-    images = arange[:, None, None] + brange[None, :, None] +\
-        crange[None, None, :]
-    images = images.reshape((27, 3))
-
-    #create images of f2
-    shifted_f2 = fcoords2[:, None, :] + images[None, :, :]
-
-    cart_f1 = lattice.get_cartesian_coords(fcoords1)
-    cart_f2 = lattice.get_cartesian_coords(shifted_f2)
-
-    #all vectors from f1 to f2
-    vectors = cart_f2[None, :, :, :] - cart_f1[:, None, None, :]
-
-    d_2 = np.sum(vectors ** 2, axis=3)
-
-    distances = np.min(d_2, axis=2) ** 0.5
+    return _pbc_min_images(lattice, fcoords1, fcoords2)[1] ** 0.5
 
-    return distances
 
-
-def pbc_shortest_vectors(lattice, fcoords1, fcoords2):
+def pbc_shortest_vectors(lattice, fcoords1, fcoords2, return_images=False):
     """
     Returns the shortest vectors between two lists of coordinates taking into
     account periodic boundary conditions and the lattice.
 
+    Minimum images are exact, even for highly skewed lattices. See
+    get_min_image_data.
+
     Args:
         lattice: lattice to use
         fcoords1: First set of fractional coordinates. e.g., [0.5, 0.6, 0.7]
             or [[1.1, 1.2, 4.3], [0.5, 0.6, 0.7]]. It can be a single
             coord or any array of coords.
         fcoords2: Second set of fractional coordinates.
+        return_images (bool): Whether to also return the lattice
+            translations of fcoords2 giving the shortest vectors.
 
     Returns:
         array of displacement vectors from fcoords1 to fcoords2
-        first index is fcoords1 index, second is fcoords2 index
+        first index is fcoords1 index, second is fcoords2 index. If
+        return_images is True, (vectors, images) is returned, where
+        vectors[i, j] is the cartesian vector for
+        fcoords2[j] + images[i, j] - fcoords1[i].
     """
-    #ensure correct shape
-    fcoords1, fcoords2 = np.atleast_2d(fcoords1, fcoords2)
-
-    #ensure that all points are in the unit cell
-    fcoords1 = np.mod(fcoords1, 1)
-    fcoords2 = np.mod(fcoords2, 1)
-
-    #create images, 2d array of all length 3 combinations of [-1,0,1]
-    r = np.arange(-1, 2)
-    arange = r[:, None] * np.array([1, 0, 0])[None, :]
-    brange = r[:, None] * np.array([0, 1, 0])[None, :]
-    crange = r[:, None] * np.array([0, 0, 1])[None, :]
-    images = arange[:, None, None] + brange[None, :, None] + \
-        crange[None, None, :]
-    images = images.reshape((27, 3))
-
-    #create images of f2
-    shifted_f2 = fcoords2[:, None, :] + images[None, :, :]
-
-    cart_f1 = lattice.get_cartesian_coords(fcoords1)
-    cart_f2 = lattice.get_cartesian_coords(shifted_f2)
-
-    #all vectors from f1 to f2
-    vectors = cart_f2[None, :, :, :] - cart_f1[:, None, None, :]
-
-    d_2 = np.sum(vectors ** 2, axis=3)
-    a, b = np.indices([len(fcoords1), len(fcoords2)])
-    return vectors[a, b, np.argmin(d_2, axis=2)]
+    vectors, d_2, images = _pbc_min_images(lattice, fcoords1, fcoords2)
+    if return_images:
+        return vectors, images
+    return vectors
 
 
 def find_in_coord_list_pbc(fcoord_list, fcoord, atol=1e-8):
@@ -411,6 +490,58 @@ def get_points_in_sphere_pbc(lattice, frac_points, center, r):
     return np.transpose(d)
 
 
+def get_points_in_spheres_pbc(lattice, frac_points, centers, r,
+                              max_memory=None):
+    """
+    Find all points within spheres of radius r around several centers,
+    taking into account periodic boundary conditions. Equivalent to calling
+    get_points_in_sphere_pbc for each center, but all centers share a single
+    set of lattice images and the distances are computed in vectorized
+    chunks.
+
+    Args:
+        lattice: The lattice/basis for the periodic boundary conditions.
+        frac_points: All points in the lattice in fractional coordinates.
+        centers: Cartesian coordinates of the centers of the spheres.
+        r: radius of spheres.
+        max_memory: Maximum size in bytes of the temporary arrays. Defaults
+            to BATCH_MAX_MEMORY.
+
+    Returns:
+        (center_indices, point_indices, fcoords, dists), where fcoords are the
+        fractional coordinates of the periodic images of the points found,
+        point_indices the indices of these points in frac_points and
+        center_indices the indices of the centers they are close to. Pairs
+        are ordered by center.
+    """
+    fcoords = np.array(frac_points, dtype=np.float64).reshape((-1, 3))
+    centers = np.array(centers, dtype=np.float64).reshape((-1, 3))
+    recp_len = np.array(lattice.reciprocal_lattice.abc)
+    nmax = (r + 0.15) * recp_len / (2 * math.pi)
+    pcoords = lattice.get_fractional_coords(centers).reshape((-1, 3))
+    if len(fcoords) == 0 or len(centers) == 0:
+        return (np.zeros(0, dtype=np.int), np.zeros(0, dtype=np.int),
+                np.zeros((0, 3)), np.zeros(0))
+
+    #Union of the images needed by each of the centers.
+    nmin = np.floor(np.min(pcoords, axis=0) - nmax).astype(np.int)
+    nmaxs = np.floor(np.max(pcoords, axis=0) + nmax).astype(np.int)
+    images = np.array([[i, j, k] for i in xrange(nmin[0], nmaxs[0] + 1)
+                       for j in xrange(nmin[1], nmaxs[1] + 1)
+                       for k in xrange(nmin[2], nmaxs[2] + 1)])
+    shifted = fcoords[:, None, :] + images[None, :, :]
+    cart = lattice.get_cartesian_coords(shifted)
+
+    results = []
+    for chunk in _batch_chunks(len(centers), cart.size * 8 * 2, max_memory):
+        dists = np.sqrt(np.sum((cart[None, :, :, :] -
+                                centers[chunk, None, None, :]) ** 2, axis=-1))
+        ic, ip, im = np.nonzero(dists <= r)
+        results.append((ic + chunk.start, ip, shifted[ip, im],
+                        dists[ic, ip, im]))
+    return tuple(np.concatenate(a) for a in zip(*results))
+
+
 def lattice_points_in_supercell(supercell_matrix):
     """
     Returns the list of points on the original lattice contained in the
@@ -492,3 +623,295 @@ def get_angle(v1, v2, units="degrees"):
         return angle
     else:
         raise ValueError("Invalid units {}".format(units))
+
+
+def get_close_pairs(coords, r):
+    """
+    Finds all pairs of points within a distance r of each other. The points
+    are hashed into a grid of cubic cells of side r, so that only points in
+    the same or adjacent cells are compared, i.e., the cost scales linearly
+    with the number of points for a bounded density instead of
+    quadratically.
+
+    Args:
+        coords: Cartesian coordinates with shape (N, 3).
+        r (float): Maximum distance.
+
+    Returns:
+        (i, j, dists) arrays of the pairs of indices with i < j and their
+        distances (<= r), sorted by i and then j.
+    """
+    coords = np.array(coords, dtype=np.float64).reshape((-1, 3))
+    if len(coords) < 2 or r < 0:
+        return np.zeros(0, dtype=np.int), np.zeros(0, dtype=np.int), \
+            np.zeros(0)
+    #Cell indices, padded by one cell so that adjacent cells never wrap.
+    #Cells can be larger than r, which bounds the number of cells.
+    extent = np.max(coords, axis=0) - np.min(coords, axis=0)
+    size = max(r, np.max(extent) / 1e5, 1e-8)
+    cells = np.floor((coords - np.min(coords, axis=0)) / size)
+    cells = cells.astype(np.int) + 1
+    dims = np.max(cells, axis=0) + 2
+    keys = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+    order = np.argsort(keys, kind="mergesort")
+    sorted_keys = keys[order]
+    cell_keys, starts = np.unique(sorted_keys, return_index=True)
+    counts = np.diff(np.append(starts, len(keys)))
+    #Cell of each point, as an index in cell_keys.
+    point_cells = np.searchsorted(cell_keys, sorted_keys)
+
+    all_i, all_j = [], []
+    #The own cell and half of the 26 adjacent cells, so that each pair of
+    #cells is visited once.
+    for offset in itertools.product([-1, 0, 1], repeat=3):
+        if offset < (0, 0, 0):
+            continue
+        nkeys = cell_keys + (offset[0] * dims[1] + offset[1]) * dims[2] + \
+            offset[2]
+        inds = np.minimum(np.searchsorted(cell_keys, nkeys),
+                          len(cell_keys) - 1)
+        found = cell_keys[inds] == nkeys
+        ncells = inds[point_cells]
+        n = np.where(found[point_cells], counts[ncells], 0)
+        #All pairs of a point with the points of the adjacent cell.
+        pi = np.repeat(np.arange(len(keys)), n)
+        pj = np.repeat(starts[ncells], n) + np.arange(np.sum(n)) - \
+            np.repeat(np.cumsum(n) - n, n)
+        if offset == (0, 0, 0):
+            pi, pj = pi[pj > pi], pj[pj > pi]
+        all_i.append(order[pi])
+        all_j.append(order[pj])
+    i = np.concatenate(all_i)
+    j = np.concatenate(all_j)
+    dists = np.sum((coords[i] - coords[j]) ** 2, axis=1) ** 0.5
+    mask = dists <= r
+    i, j, dists = np.minimum(i, j)[mask], np.maximum(i, j)[mask], dists[mask]
+    inds = np.lexsort((j, i))
+    return i[inds], j[inds], dists[inds]
+
+
+#Default upper bound (in bytes) on the size of the largest temporary array
+#created by the batched functions below. Batches are processed in chunks of
+#structures so that this bound is respected (at least one structure is always
+#processed at a time).
+BATCH_MAX_MEMORY = 2 ** 28
+
+
+def _get_batch_matrices(lattices, nbatch):
+    """
+    Returns a (nbatch, 3, 3) array of lattice matrices from either a single
+    Lattice (shared by all structures in the batch), a sequence of Lattices
+    or an array of lattice matrices.
+    """
+    if hasattr(lattices, "matrix"):
+        return np.tile(lattices.matrix, (nbatch, 1, 1))
+    matrices = np.array([getattr(l, "matrix", l) for l in lattices],
+                        dtype=np.float64).reshape((-1, 3, 3))
+    if len(matrices) != nbatch:
+        raise ValueError("Number of lattices does not match the number of "
+                         "coordinate sets!")
+    return matrices
+
+
+def _get_batch_coords(fcoords, mask):
+    """
+    Returns stacked fractional coords with padded entries zeroed (so that
+    arbitrary padding values do not propagate), and the corresponding
+    boolean mask.
+    """
+    fcoords = np.array(fcoords, dtype=np.float64)
+    if mask is None:
+        return fcoords, np.ones(fcoords.shape[:2], dtype=bool)
+    mask = np.array(mask, dtype=bool)
+    return np.where(mask[:, :, None], fcoords, 0), mask
+
+
+def _batch_chunks(nbatch, item_size, max_memory):
+    """
+    Generates slices over a batch such that each chunk has at most
+    max_memory bytes of temporaries, given item_size bytes per structure.
+    """
+    max_memory = BATCH_MAX_MEMORY if max_memory is None else max_memory
+    chunk = int(max(1, max_memory // max(item_size, 1)))
+    for i in xrange(0, nbatch, chunk):
+        yield slice(i, min(i + chunk, nbatch))
+
+
+def pbc_shortest_vectors_batch(lattices, fcoords1, fcoords2, mask1=None,
+                               mask2=None, max_memory=None):
+    """
+    Batched version of pbc_shortest_vectors for many structures at once.
+    Coordinate sets of different sizes are padded to a common size and
+    the padded entries indicated by masks.
+
+    Args:
+        lattices: A single Lattice shared by all structures, a sequence of
+            Lattices, or an array of lattice matrices with shape (B, 3, 3).
+        fcoords1: Stacked fractional coordinates with shape (B, N, 3).
+        fcoords2: Stacked fractional coordinates with shape (B, M, 3).
+        mask1: Boolean array with shape (B, N). True for real (non-padded)
+            entries in fcoords1. Defaults to all True.
+        mask2: Boolean array with shape (B, M), as for mask1.
+        max_memory: Upper bound in bytes for temporary arrays. Defaults to
+            BATCH_MAX_MEMORY.
+
+    Returns:
+        Array of shortest displacement vectors with shape (B, N, M, 3).
+        vectors[b, i, j] is the vector from fcoords1[b, i] to
+        fcoords2[b, j]. Entries involving padded coordinates are nan.
+    """
+    fcoords1, mask1 = _get_batch_coords(fcoords1, mask1)
+    fcoords2, mask2 = _get_batch_coords(fcoords2, mask2)
+    (nbatch, n1), n2 = fcoords1.shape[:2], fcoords2.shape[1]
+    matrices = _get_batch_matrices(lattices, nbatch)
+
+    #Minimum image data for each lattice. Image sets are padded to a common
+    #size by repeating the first (shortest) image.
+    data = [get_min_image_data(m) for m in matrices]
+    reduced = np.array([d[0] for d in data])
+    inv_transforms = np.array([d[2] for d in data])
+    nimages = max([len(d[4]) for d in data])
+    cart_images = np.array([np.concatenate(
+        [d[4], np.tile(d[4][:1], (nimages - len(d[4]), 1))]) for d in data])
+
+    fcoords1 = np.einsum("bni,bij->bnj", fcoords1, inv_transforms)
+    fcoords2 = np.einsum("bni,bij->bnj", fcoords2, inv_transforms)
+    vectors = np.empty((nbatch, n1, n2, 3))
+    item_size = n1 * n2 * nimages * 3 * 8
+    for s in _batch_chunks(nbatch, item_size, max_memory):
+        fdiff = fcoords2[s][:, None, :, :] - fcoords1[s][:, :, None, :]
+        fdiff -= np.round(fdiff)
+        cart = np.einsum("bnmi,bij->bnmj", fdiff, reduced[s])
+        #all vectors from f1 to images of f2
+        v = cart[:, :, :, None, :] + cart_images[s][:, None, None, :, :]
+        v = v.reshape((-1, nimages, 3))
+        inds = np.argmin(np.sum(v ** 2, axis=-1), axis=-1)
+        vectors[s] = v[np.arange(len(v)), inds].reshape((-1, n1, n2, 3))
+
+    vectors[~(mask1[:, :, None] & mask2[:, None, :])] = np.nan
+    return vectors
+
+
+def pbc_all_distances_batch(lattices, fcoords1, fcoords2, mask1=None,
+                            mask2=None, max_memory=None):
+    """
+    Batched version of pbc_all_distances for many structures at once. See
+    pbc_shortest_vectors_batch for the arguments.
+
+    Returns:
+        Array of cartesian distances with shape (B, N, M). distances[b, i, j]
+        is the distance between fcoords1[b, i] and fcoords2[b, j]. Entries
+        involving padded coordinates are nan.
+    """
+    vectors = pbc_shortest_vectors_batch(lattices, fcoords1, fcoords2,
+                                         mask1=mask1, mask2=mask2,
+                                         max_memory=max_memory)
+    return np.sum(vectors ** 2, axis=-1) ** 0.5
+
+
+def find_in_coord_list_pbc_batch(fcoord_lists, fcoords, atol=1e-8,
+                                 mask=None):
+    """
+    Batched version of find_in_coord_list_pbc. Since the number of matches
+    differs between structures, matches are returned as a boolean array
+    rather than lists of indices.
+
+    Args:
+        fcoord_lists: Stacked lists of fractional coords with shape
+            (B, N, 3).
+        fcoords: One fractional coord to test for each list, with shape
+            (B, 3).
+        atol: Absolute tolerance. Defaults to 1e-8.
+        mask: Boolean array with shape (B, N). True for real (non-padded)
+            entries in fcoord_lists. Defaults to all True.
+
+    Returns:
+        Boolean array with shape (B, N), which is True where
+        fcoord_lists[b, i] is equal to fcoords[b]. The indices of matches
+        for structure b are np.where(matches[b])[0].
+    """
+    fcoord_lists, mask = _get_batch_coords(fcoord_lists, mask)
+    fdist = fcoord_lists - np.array(fcoords)[:, None, :]
+    fdist -= np.round(fdist)
+    return np.all(np.abs(fdist) < atol, axis=-1) & mask
+
+
+def is_coord_subset_pbc_batch(subsets, supersets, atol=1e-8,
+                              subset_mask=None, superset_mask=None,
+                              max_memory=None):
+    """
+    Batched version of is_coord_subset_pbc.
+
+    Args:
+        subsets: Stacked fractional coords with shape (B, N, 3).
+        supersets: Stacked fractional coords with shape (B, M, 3).
+        atol: Absolute tolerance. Defaults to 1e-8.
+        subset_mask: Boolean array with shape (B, N). True for real
+            (non-padded) entries in subsets. Padded entries are ignored.
+        superset_mask: Boolean array with shape (B, M). True for real
+            (non-padded) entries in supersets. Padded entries never match.
+        max_memory: Upper bound in bytes for temporary arrays. Defaults to
+            BATCH_MAX_MEMORY.
+
+    Returns:
+        Boolean array with shape (B,), which is True where all of subsets[b]
+        is in supersets[b].
+    """
+    c1, mask1 = _get_batch_coords(subsets, subset_mask)
+    c2, mask2 = _get_batch_coords(supersets, superset_mask)
+    nbatch = len(c1)
+    result = np.empty(nbatch, dtype=bool)
+    item_size = c1.shape[1] * c2.shape[1] * 3 * 8
+    for s in _batch_chunks(nbatch, item_size, max_memory):
+        dist = c1[s][:, :, None, :] - c2[s][:, None, :, :]
+        dist -= np.round(dist)
+        is_close = np.all(np.abs(dist) < atol, axis=-1) & \
+            mask2[s][:, None, :]
+        any_close = np.any(is_close, axis=-1) | ~mask1[s]
+        result[s] = np.all(any_close, axis=-1)
+    return result
+
+
+def kabsch_rmsd_batch(ref_coords, coords, max_memory=None):
+    """
+    Root mean square deviations of many sets of points from reference sets
+    of points after their optimal superposition (translation and proper
+    rotation), computed with the Kabsch algorithm for all sets at once,
+    i.e., with a single stacked SVD of the 3x3 covariance matrices. The
+    points must already be in corresponding order.
+
+    Args:
+        ref_coords: Reference cartesian coordinates with shape (N, 3),
+            shared by all sets, or with shape (B, N, 3).
+        coords: Stacked cartesian coordinates with shape (B, N, 3).
+        max_memory: Upper bound in bytes of the temporary arrays. Defaults
+            to BATCH_MAX_MEMORY.
+
+    Returns:
+        Array of the B RMSDs.
+    """
+    coords = np.array(coords, dtype=np.float64).reshape((-1,) +
+                                                        np.shape(coords)[-2:])
+    ref_coords = np.array(ref_coords, dtype=np.float64)
+    if ref_coords.shape[-2:] != coords.shape[1:]:
+        raise ValueError("Coordinate sets have different shapes!")
+    nbatch, npoints = coords.shape[:2]
+    rmsds = np.zeros(nbatch)
+    if npoints == 0:
+        return rmsds
+    for s in _batch_chunks(nbatch, 8 * 8 * npoints * 3, max_memory):
+        c = coords[s] - np.average(coords[s], axis=1)[:, None, :]
+        ref = ref_coords[s] if ref_coords.ndim == 3 \
+            else ref_coords[None, :, :]
+        ref = ref - np.average(ref, axis=1)[:, None, :]
+        ref = np.broadcast_arrays(ref, c)[0]
+        #Covariance matrices and their stacked SVD.
+        cov = np.einsum("bni,bnj->bij", c, ref)
+        u, sv, vt = np.linalg.svd(cov)
+        #Proper rotations only, i.e., no reflections.
+        d = np.sign(np.linalg.det(u) * np.linalg.det(vt))
+        u[:, :, 2] *= np.where(d == 0, 1, d)[:, None]
+        rot = np.einsum("bij,bjk->bik", u, vt)
+        diff = np.einsum("bni,bij->bnj", c, rot) - ref
+        rmsds[s] = np.sqrt(np.sum(diff ** 2, axis=(1, 2)) / npoints)
+    return rmsds
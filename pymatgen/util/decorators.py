@@ -12,6 +12,7 @@ __maintainer__ = "Shyue Ping Ong"
 __email__ = "shyuep@gmail.com"
 __date__ = "Dec 31, 2011"
 
+import collections
 import logging
 
 from functools import wraps
@@ -51,3 +52,33 @@ def enable_logging(main):
 
 
 
+
+
+def lru_cache(maxsize=128):
+    """
+    Least-recently-used cache decorator, similar to functools.lru_cache in
+    Python 3.2+. Only positional arguments are supported, and they must be
+    hashable. The decorated function gains a cache_clear() method.
+
+    Args:
+        maxsize (int): Maximum number of results to keep. None means that
+            the cache is allowed to grow without bound.
+    """
+    def decorator(func):
+        cache = collections.OrderedDict()
+
+        @wraps(func)
+        def wrapper(*args):
+            try:
+                result = cache.pop(args)
+            except KeyError:
+                result = func(*args)
+                if maxsize is not None and len(cache) >= maxsize:
+                    cache.popitem(last=False)
+            cache[args] = result
+            return result
+
+        wrapper.cache_clear = cache.clear
+        return wrapper
+
+    return decorator
@@ -22,7 +22,10 @@ from pymatgen.util.coord_utils import get_linear_interpolated_value,\
     get_points_in_sphere_pbc, find_in_coord_list, find_in_coord_list_pbc,\
     pbc_all_distances, barycentric_coords, pbc_shortest_vectors,\
     lattice_points_in_supercell, coord_list_mapping, all_distances,\
-    is_coord_subset_pbc, coord_list_mapping_pbc
+    is_coord_subset_pbc, coord_list_mapping_pbc, pbc_shortest_vectors_batch,\
+    pbc_all_distances_batch, find_in_coord_list_pbc_batch,\
+    is_coord_subset_pbc_batch, get_min_image_data,\
+    get_points_in_spheres_pbc, kabsch_rmsd_batch, get_close_pairs
 from pymatgen.util.testing import PymatgenTest
 
 
@@ -180,6 +183,26 @@ class CoordUtilsTest(PymatgenTest):
                                                       [0.5, 0.5, 0.5],
                                                       0.5)), 515)
  
+    def test_get_points_in_spheres_pbc(self):
+        latt = Lattice.monoclinic(3, 4, 5, 100)
+        pts = np.random.rand(10, 3)
+        centers = latt.get_cartesian_coords(np.random.rand(4, 3) * 3 - 1)
+        ic, ip, fcoords, dists = get_points_in_spheres_pbc(latt, pts,
+                                                           centers, 4)
+        for i, center in enumerate(centers):
+            nn = get_points_in_sphere_pbc(latt, pts, center, 4)
+            self.assertEqual(np.sum(ic == i), len(nn))
+            self.assertArrayAlmostEqual(sorted(dists[ic == i]),
+                                        sorted(nn[:, 1]))
+        self.assertArrayAlmostEqual(
+            np.sqrt(np.sum((latt.get_cartesian_coords(fcoords) -
+                            centers[ic]) ** 2, axis=1)), dists)
+        self.assertArrayAlmostEqual(np.floor(fcoords) + pts[ip], fcoords)
+        #Small chunks give the same results.
+        small = get_points_in_spheres_pbc(latt, pts, centers, 4,
+                                          max_memory=1)
+        self.assertArrayAlmostEqual(small[3], dists)
+
     def test_lattice_points_in_supercell(self):
         supercell = np.array([[1,3,5], [-3,2,3], [-5,3,1]])
         points = lattice_points_in_supercell(supercell)
@@ -229,7 +252,163 @@ class CoordUtilsTest(PymatgenTest):
         vectors = pbc_shortest_vectors(lattice, fcoords[:-1], fcoords)
         dists = np.sum(vectors**2, axis = -1)**0.5
         self.assertArrayAlmostEqual(dists, expected, 3)
+
+        vectors, images = pbc_shortest_vectors(lattice, fcoords[:-1], fcoords,
+                                               return_images=True)
+        fdiff = fcoords[None, :, :] + images - fcoords[:-1, None, :]
+        self.assertArrayAlmostEqual(lattice.get_cartesian_coords(fdiff),
+                                    vectors)
+
+    def test_pbc_shortest_vectors_skewed(self):
+        #Highly skewed cell, where the 27 neighboring images are not enough.
+        lattice = Lattice(np.dot([[1, 3, 0], [0, 1, 2], [0, 0, 1]],
+                                 Lattice.cubic(3).matrix))
+        fcoords = np.random.random_sample((10, 3))
+        vectors = pbc_shortest_vectors(lattice, fcoords, fcoords[::-1])
+        dists = np.sum(vectors ** 2, axis=-1) ** 0.5
+        #Brute force in the (equivalent) cubic lattice.
+        cubic = Lattice.cubic(3)
+        cfcoords = cubic.get_fractional_coords(
+            lattice.get_cartesian_coords(fcoords))
+        r = np.arange(-1, 2)
+        images = np.array(list(itertools.product(r, r, r)))
+        fdiff = cfcoords[::-1][None, :, None, :] + images[None, None, :, :] \
+            - cfcoords[:, None, None, :]
+        fdiff -= np.round(fdiff[:, :, 13:14, :])
+        expected = np.min(np.sum(cubic.get_cartesian_coords(fdiff) ** 2,
+                                 axis=-1), axis=-1) ** 0.5
+        self.assertArrayAlmostEqual(dists, expected)
+        self.assertArrayAlmostEqual(pbc_all_distances(lattice, fcoords,
+                                                      fcoords[::-1]), expected)
+        self.assertTrue(np.all(dists <= 3 * 3 ** 0.5 / 2 + 1e-8))
+
+    def test_pbc_all_distances_slab(self):
+        #Skewed slab, where the long vacuum axis requires more images along
+        #the short in-plane axes.
+        lattice = Lattice([[2.5, 0, 0], [8.75, 2.165, 0], [0, 0, 50]])
+        fcoords = np.random.random_sample((10, 3))
+        fcoords2 = np.random.random_sample((8, 3))
+        #Brute force search of the images.
+        r = np.arange(-8, 9)
+        images = np.array(list(itertools.product(r, r, r)))
+        fdiff = pbc_diff(fcoords2[None, :, :], fcoords[:, None, :])
+        cart = lattice.get_cartesian_coords(fdiff[:, :, None, :] + images)
+        expected = np.min(np.sum(cart ** 2, axis=-1), axis=-1) ** 0.5
+        self.assertArrayAlmostEqual(
+            pbc_all_distances(lattice, fcoords, fcoords2), expected)
+        vectors = pbc_shortest_vectors(lattice, fcoords, fcoords2)
+        self.assertArrayAlmostEqual(np.sum(vectors ** 2, axis=-1) ** 0.5,
+                                    expected)
+        #Degenerate lattices fall back to the 27 neighboring images.
+        self.assertEqual(
+            len(get_min_image_data([[1, 0, 0], [0, 1, 0], [1, 1, 0]])[3]), 27)
+
+    def test_get_min_image_data(self):
+        reduced, transform, inv_transform, images, cart_images = \
+            get_min_image_data(Lattice.cubic(3))
+        self.assertArrayAlmostEqual(reduced, Lattice.cubic(3).matrix)
+        self.assertEqual(len(images), 27)
+        self.assertArrayEqual(images[0], [0, 0, 0])
+        self.assertIs(get_min_image_data(Lattice.cubic(3))[3], images)
+        m = np.dot([[1, 3, 0], [0, 1, 2], [0, 0, 1]], Lattice.cubic(3).matrix)
+        reduced, transform = get_min_image_data(m)[:2]
+        self.assertArrayAlmostEqual(np.dot(transform, m), reduced)
+        self.assertAlmostEqual(abs(np.linalg.det(transform)), 1)
+        self.assertArrayAlmostEqual(
+            sorted(Lattice(reduced).abc), [3, 3, 3])
         
+    def test_pbc_shortest_vectors_batch(self):
+        lattices = [Lattice.from_lengths_and_angles([8, 8, 4],
+                                                    [90, 76, 58]),
+                    Lattice.cubic(3), Lattice.hexagonal(4, 6)]
+        fcoords = np.random.random_sample((3, 5, 3))
+        mask = np.ones((3, 5), dtype=bool)
+        mask[1, 3:] = False
+        fcoords[1, 3:] = 100
+        vectors = pbc_shortest_vectors_batch(lattices, fcoords, fcoords,
+                                             mask, mask, max_memory=1)
+        dists = pbc_all_distances_batch(lattices, fcoords, fcoords, mask,
+                                        mask)
+        self.assertEqual(vectors.shape, (3, 5, 5, 3))
+        for i, l in enumerate(lattices):
+            n = np.sum(mask[i])
+            self.assertArrayAlmostEqual(
+                vectors[i, :n, :n],
+                pbc_shortest_vectors(l, fcoords[i, :n], fcoords[i, :n]))
+            self.assertArrayAlmostEqual(
+                dists[i, :n, :n],
+                pbc_all_distances(l, fcoords[i, :n], fcoords[i, :n]))
+        self.assertTrue(np.all(np.isnan(dists[1, 3:])))
+        self.assertTrue(np.all(np.isnan(dists[1, :, 3:])))
+        # A single lattice is shared by all structures.
+        dists = pbc_all_distances_batch(lattices[0], fcoords[:, :2],
+                                        fcoords[:, 2:])
+        self.assertArrayAlmostEqual(
+            dists[2], pbc_all_distances(lattices[0], fcoords[2, :2],
+                                        fcoords[2, 2:]))
+
+    def test_find_in_coord_list_pbc_batch(self):
+        coords = [[[0, 0, 0], [0.5, 0.5, 0.5]], [[0.5, 0.5, 0.5], [0, 0, 0]]]
+        test_coords = [[0.99, 0.99, 0.99], [-0.499, -0.499, -0.499]]
+        matches = find_in_coord_list_pbc_batch(coords, test_coords, atol=0.02)
+        self.assertArrayEqual(matches, [[True, False], [True, False]])
+        matches = find_in_coord_list_pbc_batch(coords, test_coords, atol=0.02,
+                                               mask=[[False, True],
+                                                     [True, True]])
+        self.assertArrayEqual(matches, [[False, False], [True, False]])
+
+    def test_is_coord_subset_pbc_batch(self):
+        c1 = [0, 0, 0]
+        c2 = [0, 1.2, -1]
+        c3 = [2.3, 0, 1]
+        c4 = [1.3 - 9e-9, -1 - 9e-9, 1 - 9e-9]
+        subsets = [[c1, c2, c3], [c1, c2, c3], [c1, c2, c3]]
+        supersets = [[c1, c4, c2], [c2, c3, c3], [c1, c4, c2]]
+        self.assertArrayEqual(
+            is_coord_subset_pbc_batch(subsets, supersets, max_memory=1),
+            [True, False, True])
+        self.assertArrayEqual(
+            is_coord_subset_pbc_batch(
+                subsets, supersets,
+                subset_mask=[[True] * 3, [False, True, True], [True] * 3],
+                superset_mask=[[True] * 3, [True] * 3, [True, False, True]]),
+            [True, True, False])
+
+    def test_get_close_pairs(self):
+        coords = np.random.uniform(-3, 7, (100, 3))
+        i, j, dists = get_close_pairs(coords, 1.7)
+        all_i, all_j = np.triu_indices(100, 1)
+        all_dists = np.sum((coords[all_i] - coords[all_j]) ** 2,
+                           axis=1) ** 0.5
+        mask = all_dists <= 1.7
+        self.assertArrayEqual(i, all_i[mask])
+        self.assertArrayEqual(j, all_j[mask])
+        self.assertArrayAlmostEqual(dists, all_dists[mask])
+        self.assertEqual(len(get_close_pairs(coords[:1], 1.7)[0]), 0)
+        i, j, dists = get_close_pairs([[0, 0, 0], [0, 0, 0], [0, 0, 1]], 0)
+        self.assertArrayEqual(i, [0])
+        self.assertArrayEqual(j, [1])
+
+    def test_kabsch_rmsd_batch(self):
+        coords = np.array([[0, 0, 0], [1.2, 0, 0], [0, 1.5, 0], [0, 0, 0.9],
+                           [1, 1, 1]])
+        #Rotation of 90 degrees around z followed by a translation.
+        rot = np.array([[0, 1, 0], [-1, 0, 0], [0, 0, 1]])
+        moved = np.dot(coords, rot) + [1, 2, 3]
+        noisy = coords.copy()
+        noisy[0, 0] += 0.5
+        rmsds = kabsch_rmsd_batch(coords, [moved, noisy, -coords],
+                                  max_memory=1)
+        self.assertAlmostEqual(rmsds[0], 0)
+        self.assertTrue(0 < rmsds[1] < 0.5 / 5 ** 0.5)
+        #Mirror images are not superposable with proper rotations.
+        self.assertGreater(rmsds[2], 0.1)
+        self.assertArrayAlmostEqual(
+            kabsch_rmsd_batch([moved, noisy], [coords, coords]),
+            rmsds[:2])
+        self.assertRaises(ValueError, kabsch_rmsd_batch, coords[:4],
+                          [coords])
+
 
 if __name__ == "__main__":
     import unittest